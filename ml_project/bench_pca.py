@@ -0,0 +1,72 @@
+from time import perf_counter
+import tracemalloc
+
+import click
+import numpy as np
+
+from src.features.process import numeric_features_transform
+
+
+# (kernel, solver) pairs to compare
+CASES = [
+    ("linear", "kernel"),
+    ("linear", "full"),
+    ("linear", "randomized"),
+    ("linear", "incremental"),
+    ("rbf", "kernel"),
+    ("rbf", "nystroem"),
+]
+
+
+def measure(data: np.ndarray, kernel: str, solver: str, components: int):
+    pipeline = numeric_features_transform(
+        "standard",
+        components,
+        kernel,
+        solver,
+        pca_batch_size=1000,
+        random_state=0,
+    )
+    tracemalloc.start()
+    started = perf_counter()
+    pipeline.fit(data)
+    fit_time = perf_counter() - started
+    started = perf_counter()
+    pipeline.transform(data)
+    transform_time = perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return fit_time, transform_time, peak
+
+
+@click.command()
+@click.option("-n", "--samples", multiple=True, type=int)
+@click.option("-f", "--features", default=30)
+@click.option("-c", "--components", default=10)
+@click.option("--max-kernel-samples", default=5000)
+def main(
+    samples: tuple, features: int, components: int, max_kernel_samples: int
+) -> None:
+    rng = np.random.default_rng(0)
+    click.secho(
+        f"{'n':>8} {'kernel':>7} {'solver':>12} "
+        f"{'fit, s':>8} {'transform, s':>12} {'peak, MiB':>10}",
+        fg="green",
+    )
+    for n in samples or (1000, 4000, 16000, 64000):
+        data = rng.normal(size=(n, features))
+        for kernel, solver in CASES:
+            # exact kernel PCA is quadratic in memory
+            if solver == "kernel" and n > max_kernel_samples:
+                continue
+            fit_time, transform_time, peak = measure(
+                data, kernel, solver, components
+            )
+            click.echo(
+                f"{n:>8} {kernel:>7} {solver:>12} {fit_time:>8.3f} "
+                f"{transform_time:>12.3f} {peak / 2**20:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
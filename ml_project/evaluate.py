@@ -5,8 +5,8 @@ import hydra
 from hydra.utils import instantiate
 from omegaconf import OmegaConf
 
-from src.models import load_pipeline, dump_prediction
-from src.data import read_inference_data
+from src.models import predict_chunks, make_writer
+from src.data import read_inference_chunks
 
 
 log = logging.getLogger(__name__)
@@ -19,12 +19,22 @@ def main(cfg: OmegaConf) -> None:
     log.debug(msg=f"Actual CWD: {getcwd()}")
 
     inf_config = instantiate(cfg.inference)
-    pipeline = load_pipeline(inf_config.artifact)
-    log.info(msg=f"Loaded pipeline: {pipeline}")
-
-    features = read_inference_data(inf_config.input_features)
-    prediction = pipeline.predict(features)
-    dump_prediction(prediction, inf_config.output_target)
+    chunks = read_inference_chunks(
+        inf_config.input_features, inf_config.chunk_size
+    )
+    predictions = predict_chunks(
+        inf_config.artifact,
+        chunks,
+        inf_config.workers,
+        id_column=inf_config.id_column,
+        proba=inf_config.probabilities,
+    )
+    with make_writer(
+        inf_config.output_target, inf_config.id_column
+    ) as writer:
+        for scored in predictions:
+            writer.write(scored)
+    log.info(msg=f"Predictions made: {writer.written}")
 
     log.info(msg="Inference pipeline finished")
 
@@ -6,19 +6,15 @@ from hydra.utils import instantiate
 from omegaconf import OmegaConf
 
 from src.settings.params import RootConfig
-from src.data import read_dataset, create_dataset
-
-from src.features import (
-    extract_target,
-    extract_feature_columns,
-    split_data,
-    Preprocessor
-)
+from src.data import create_dataset
+from src.features import prepare_data
 from src.models import (
     make_estimator,
     make_inference_pipeline,
     get_metrics,
     dump_pipeline,
+    compile_pipeline,
+    train_incremental,
 )
 
 
@@ -39,43 +35,46 @@ def main(cfg: OmegaConf):
     estimator = root_cfg.estimator
 
     create_dataset(dataset)
-    raw_data = read_dataset(dataset)
-    log.info(msg=f"Loaded dataset: {raw_data.shape}")
-    log.debug(msg=f"Dataset columns: {raw_data.columns.to_list()}")
-
-    feature_columns = feature.numeric_features + feature.categorical_features
-
-    target = extract_target(raw_data, feature.target)
-    features = extract_feature_columns(raw_data, feature_columns)
-
-    log.info(msg="Splitting the dataset")
-    train_features, val_features, train_y, val_y = split_data(
-        features, target, splitter
-    )
-    log.debug(msg=f"Train set: {train_features.shape}: {train_y.shape}")
-    log.debug(msg=f"Val set: {val_features.shape}: {val_y.shape}")
-
-    preprocessor = Preprocessor(feature)
-
-    log.info(msg="Built preprocessor")
-    log.debug(msg=f"\n{preprocessor}")
-
-    train_features_processed = preprocessor.fit_transform(train_features)
-
-    end_to_end_pipeline = make_inference_pipeline(
-        preprocessor,
-        make_estimator(train_features_processed, train_y, estimator),
-    )
-    log.info(msg="Created end-to-end inference pipeline")
-
-    metrics = get_metrics(
-        val_y, end_to_end_pipeline.predict(val_features), estimator
-    )
+    if dataset.chunk_size:
+        # out-of-core mode: the dataset is never loaded as a whole
+        end_to_end_pipeline, metrics, bundle = train_incremental(
+            dataset, splitter, feature, estimator
+        )
+        log.info(msg="Created end-to-end inference pipeline")
+    else:
+        prepared = prepare_data(
+            dataset,
+            splitter,
+            feature,
+            dataset.cache_dir,
+            dataset.prepared_cache_max_size,
+        )
+        bundle = prepared.bundle
+        end_to_end_pipeline = make_inference_pipeline(
+            prepared.preprocessor,
+            make_estimator(
+                prepared.train_features, prepared.train_target, estimator
+            ),
+        )
+        log.info(msg="Created end-to-end inference pipeline")
+
+        metrics = get_metrics(
+            prepared.val_target,
+            end_to_end_pipeline.predict(prepared.val_raw_features),
+            estimator,
+        )
     log.info(msg=f"Collected metrics: {metrics}")
     metrics.dump(estimator.metrics_path)
 
     log.info(msg=f"Dumps artifact to {estimator.model_artifact_path}")
-    dump_pipeline(end_to_end_pipeline, estimator.model_artifact_path)
+    # schema and stats of the train data travel with the model
+    dump_pipeline(end_to_end_pipeline, estimator.model_artifact_path, bundle)
+
+    compiled_path = estimator.compiled_artifact_path
+    if compiled_path:
+        compiled_pipeline = compile_pipeline(end_to_end_pipeline)
+        log.info(msg=f"Dumps compiled artifact to {compiled_path}")
+        dump_pipeline(compiled_pipeline, compiled_path, bundle)
 
     log.info(msg="Training pipeline finished")
 
@@ -1,3 +1,15 @@
-from .datautils import create_dataset, read_dataset, read_inference_data
+from .datautils import (
+    create_dataset,
+    read_dataset,
+    read_dataset_chunks,
+    read_inference_data,
+    read_inference_chunks,
+)
 
-__all__ = ["create_dataset", "read_dataset", "read_inference_data"]
+__all__ = [
+    "create_dataset",
+    "read_dataset",
+    "read_dataset_chunks",
+    "read_inference_data",
+    "read_inference_chunks",
+]
@@ -1,28 +1,76 @@
-from os import mkdir
-from os.path import isfile, isdir
+from concurrent.futures import ThreadPoolExecutor
+from glob import escape, glob
+from os import makedirs, mkdir, remove, replace
+from os.path import basename, dirname, getsize, isfile, isdir, join
+from shutil import copyfileobj
+from time import sleep
+from typing import Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
 import logging
 import requests
 
 import pandas as pd
 
-from ..settings.params import DatasetConfig
+from ..settings.params import DatasetConfig, FeaturesConfig
 
 log = logging.getLogger(__name__)
 
+CACHE_FORMATS = ("parquet", "feather")
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+RETRIABLE_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class RemoteFileChanged(ValueError):
+    """
+    Partial files of a download do not match the remote file anymore
+    """
+
 
 def download_file(
-    url: str, local_filename: str = None, overwrite: bool = False
+    url: str,
+    local_filename: str = None,
+    overwrite: bool = False,
+    checksum: Optional[str] = None,
+    segments: int = 1,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    retries: int = 3,
+    timeout: float = 30.0,
+    backoff: float = 0.5,
 ) -> str:
     """
     Downloads file from given url.
     Check if such file is present before requesting
 
+    Data is written to `<local_filename>.part` (or `.part.<i>` files
+    of the parallel segments), interrupted downloads are resumed
+    from the partial files with HTTP Range requests (`If-Range` makes
+    the server send the whole file if it has changed since).
+    Partial files of a remote file changed since are discarded and
+    the download starts over. The complete file is verified against
+    the size reported by the server and `checksum`, then renamed
+    to `local_filename`
+
     :param url, str - web resource to fetch the file from
     :param local_filename, str (default None) -
     filename to save the file to.
     If not specified, the filename is deduced from the url
     :param overwrite, bool (default False) - whether to override the
     existing file
+    :param checksum, str (default None) - expected digest of the file
+    as `<algorithm>:<hex digest>` or a SHA-256 hex digest
+    :param segments, int (default 1) - number of byte ranges fetched
+    in parallel, if the server supports ranges
+    :param chunk_size, int - size of the chunks written to disk
+    :param retries, int (default 3) - number of attempts to resume
+    the download after a networking error
+    :param timeout, float (default 30) - connect/read timeout, seconds
+    :param backoff, float (default 0.5) - delay before the first retry,
+    doubled for each next one, seconds
 
     :rtype str, local filename of the obtained resource
     """
@@ -34,16 +82,255 @@ def download_file(
         log.warning(msg=f"File already exists: {local_filename}")
         return local_filename
 
-    with requests.get(url, stream=True) as r:
-        r.raise_for_status()
-        with open(local_filename, "wb+") as f:
-            for chunk in r.iter_content():
-                f.write(chunk)
+    partial = f"{local_filename}.part"
+    options = dict(
+        chunk_size=chunk_size,
+        retries=retries,
+        timeout=timeout,
+        backoff=backoff,
+    )
+    try:
+        paths, sizes = _fetch_parts(url, partial, segments, **options)
+    except RemoteFileChanged as e:
+        log.warning(msg=f"{e}, restarting the download")
+        _remove_parts(partial)
+        paths, sizes = _fetch_parts(url, partial, segments, **options)
+
+    _join_parts(partial, paths, chunk_size)
+    _verify_size(partial, sizes)
+    if checksum is not None:
+        _verify_checksum(partial, checksum)
+    replace(partial, local_filename)
 
     log.info(msg=f"File saved at {local_filename}")
     return local_filename
 
 
+def _fetch_parts(
+    url: str,
+    partial: str,
+    segments: int,
+    chunk_size: int,
+    retries: int,
+    timeout: float,
+    backoff: float,
+) -> Tuple[List[str], List[Optional[int]]]:
+    # returns the partial files and the remote sizes reported for them
+    ranges, remote = [(0, None)], {}
+    if segments > 1:
+        ranges, remote = _split_ranges(url, segments, timeout)
+
+    paths = [partial]
+    if len(ranges) > 1:
+        # segment files are named by their ranges, so that parts
+        # of the downloads split in another way are never mixed up
+        paths = [f"{partial}.{start}-{end}" for start, end in ranges]
+        # finished segments are not requested again, thus all of them
+        # are checked against the current remote file
+        if any(_read_meta(path) not in ({}, remote) for path in paths):
+            log.warning(msg="Remote file has changed, restarting")
+            _remove_parts(partial)
+
+    def fetch(segment: int) -> Optional[int]:
+        start, end = ranges[segment]
+        for attempt in range(retries + 1):
+            try:
+                return _fetch_range(
+                    url,
+                    paths[segment],
+                    start,
+                    end,
+                    chunk_size,
+                    timeout,
+                    remote.get("validator"),
+                )
+            except RETRIABLE_ERRORS as e:
+                if attempt == retries:
+                    raise e
+                delay = backoff * 2**attempt
+                log.warning(msg=f"Download interrupted, retry in {delay}s")
+                log.warning(msg=f"{e}")
+                sleep(delay)
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        # `list` re-raises the errors of the segments
+        sizes = list(executor.map(fetch, range(len(ranges))))
+    return paths, sizes
+
+
+def _split_ranges(
+    url: str, segments: int, timeout: float
+) -> Tuple[List[Tuple[int, Optional[int]]], Dict]:
+    # returns the ranges and the validator and size of the remote file
+    with requests.head(url, allow_redirects=True, timeout=timeout) as r:
+        r.raise_for_status()
+        size = int(r.headers.get("Content-Length", 0))
+        accepts_ranges = r.headers.get("Accept-Ranges") == "bytes"
+        remote = dict(validator=_validator(r), size=size)
+
+    if not accepts_ranges or size < segments:
+        log.warning(msg="Server does not support ranges, using 1 segment")
+        return [(0, None)], {}
+
+    bounds = [size * i // segments for i in range(segments + 1)]
+    log.debug(msg=f"Downloading {size} bytes in {segments} segments")
+    return [(lo, hi - 1) for lo, hi in zip(bounds, bounds[1:])], remote
+
+
+def _fetch_range(
+    url: str,
+    path: str,
+    start: int,
+    end: Optional[int],
+    chunk_size: int,
+    timeout: float,
+    validator: Optional[str] = None,
+) -> Optional[int]:
+    # returns the size of the remote file, if the server reports it
+    meta, done = _resumable(path)
+    if end is not None and start + done > end:
+        return meta.get("size")
+
+    headers = {}
+    if start + done > 0 or end is not None:
+        headers["Range"] = f"bytes={start + done}-{'' if end is None else end}"
+        log.debug(msg=f"Requesting {headers['Range']} for {path}")
+    if done:
+        validator = meta.get("validator")
+    if validator and "Range" in headers:
+        # the server sends the whole file if it has changed since
+        headers["If-Range"] = validator
+
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as r:
+        size = _remote_size(r)
+        if r.status_code == 416 and end is None:
+            _check_complete(path, done, size or meta.get("size"))
+            return done
+        r.raise_for_status()
+        done = _resumed_size(r, path, done, end, meta.get("size"), size)
+
+        if not done:
+            _write_meta(path, r, size)
+        with open(path, "ab" if done else "wb") as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+        expected = r.headers.get("Content-Length", "")
+        if expected.isdigit() and r.raw.tell() < int(expected):
+            raise requests.ConnectionError(
+                f"Connection closed after {r.raw.tell()} bytes"
+            )
+        return size
+
+
+def _resumable(path: str) -> Tuple[Dict, int]:
+    # partial files without the validator of the remote are not resumed
+    meta = _read_meta(path)
+    if not isfile(path):
+        return meta, 0
+    if not meta:
+        log.warning(msg=f"Origin of {path} is unknown, restarting")
+        return meta, 0
+    return meta, getsize(path)
+
+
+def _check_complete(path: str, done: int, size: Optional[int]) -> None:
+    # requested range starts after the end of the remote file
+    if not done or done != size:
+        raise RemoteFileChanged(f"Partial file {path} is not complete")
+
+
+def _resumed_size(
+    response: requests.Response,
+    path: str,
+    done: int,
+    end: Optional[int],
+    expected: Optional[int],
+    size: Optional[int],
+) -> int:
+    # returns the number of bytes the response continues
+    if response.request.headers.get("Range") and response.status_code != 206:
+        if end is not None:
+            raise RemoteFileChanged(
+                "Server ignored the range request or the file has changed"
+            )
+        log.warning(msg="Server ignored the range request, restarting")
+        return 0
+    if done and expected not in (None, size):
+        raise RemoteFileChanged(f"Remote file of {path} has changed")
+    return done
+
+
+def _remote_size(response: requests.Response) -> Optional[int]:
+    # `Content-Range: bytes <first>-<last>/<size>` or `bytes */<size>`
+    *_, size = response.headers.get("Content-Range", "").rpartition("/")
+    if not size and response.status_code == 200:
+        if "Content-Encoding" not in response.headers:
+            size = response.headers.get("Content-Length", "")
+    return int(size) if size.isdigit() else None
+
+
+def _validator(response: requests.Response) -> Optional[str]:
+    # weak ETags can not be used with `If-Range`
+    etag = response.headers.get("ETag")
+    if not etag or etag.startswith("W/"):
+        etag = None
+    return etag or response.headers.get("Last-Modified")
+
+
+def _read_meta(path: str) -> Dict:
+    try:
+        with open(f"{path}.json", "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(
+    path: str, response: requests.Response, size: Optional[int]
+) -> None:
+    # validator of the partial file is sent with `If-Range` on resume
+    with open(f"{path}.json", "w") as f:
+        json.dump(dict(validator=_validator(response), size=size), f)
+
+
+def _join_parts(partial: str, paths: List[str], chunk_size: int) -> None:
+    if paths != [partial]:
+        with open(partial, "wb") as f:
+            for path in paths:
+                with open(path, "rb") as part:
+                    copyfileobj(part, f, chunk_size)
+                remove(path)
+    for path in paths:
+        remove(f"{path}.json") if isfile(f"{path}.json") else None
+
+
+def _remove_parts(partial: str) -> None:
+    # partial file, segments of any split and their validators
+    for path in [partial, *glob(f"{escape(partial)}.*")]:
+        remove(path) if isfile(path) else None
+
+
+def _verify_size(path: str, sizes: List[Optional[int]]) -> None:
+    expected = {size for size in sizes if size is not None}
+    actual = getsize(path)
+    if expected and expected != {actual}:
+        remove(path)
+        error_message = f"Size mismatch for {path}: {actual}, not {expected}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+
+def _verify_checksum(path: str, checksum: str) -> None:
+    algorithm, _, expected = checksum.rpartition(":")
+    actual = file_digest(path, algorithm=algorithm or "sha256")
+    if actual != expected.lower():
+        remove(path)
+        error_message = f"Checksum mismatch for {path}: {actual}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    log.debug(msg=f"Checksum verified: {checksum}")
+
+
 def create_dataset(params: DatasetConfig) -> None:
     """
     Check whether the dataset file is present,
@@ -58,10 +345,34 @@ def create_dataset(params: DatasetConfig) -> None:
     dataset_filename = f"{params.dataset_dir}/{params.dataset_filename}"
     if not params.download:
         return
-    download_file(params.source_url, dataset_filename, overwrite=False)
+    download_file(
+        params.source_url,
+        dataset_filename,
+        overwrite=False,
+        checksum=params.checksum,
+        segments=params.download_segments,
+    )
+
+
+def read_dataset(
+    params: DatasetConfig,
+    features: Optional[FeaturesConfig] = None,
+    digest: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Reads the raw dataset with explicit dtypes of the feature columns
+    (see `dataset_dtypes`). If `params.cache_dir` is set, parsed data
+    is cached in a binary format, keyed by the file contents and
+    the schema, and subsequent reads skip CSV parsing
 
+    :param params, DatasetConfig - dataset location and schema
+    :param features, FeaturesConfig (default None) - numeric and
+    categorical columns to set dtypes for
+    :param digest, str (default None) - SHA-256 of the dataset file,
+    if already computed
 
-def read_dataset(params: DatasetConfig) -> pd.DataFrame:
+    :rtype pd.DataFrame
+    """
     dataset_path = f"{params.dataset_dir}/{params.dataset_filename}"
     log.debug(msg=f"Trying to open dataset at {dataset_path}")
 
@@ -75,10 +386,143 @@ def read_dataset(params: DatasetConfig) -> pd.DataFrame:
         )
         raise TypeError("Column names not provided")
 
+    dtypes = dataset_dtypes(params, features)
+    cache_path = _cache_path(dataset_path, params, dtypes, digest)
+    if cache_path is not None and isfile(cache_path):
+        log.debug(msg=f"Reading cached dataset from {cache_path}")
+        return _read_cache(cache_path, params.cache_format)
+
     log.debug(msg=f"Reading dataset from {dataset_path}")
-    return pd.read_csv(
-        dataset_path, header=params.header, names=params.column_names
+    data = pd.read_csv(
+        dataset_path,
+        header=params.header,
+        names=params.column_names,
+        dtype=dtypes,
+    )
+    if cache_path is not None:
+        _write_cache(data, cache_path, params.cache_format)
+    return data
+
+
+def read_dataset_chunks(
+    params: DatasetConfig,
+    features: Optional[FeaturesConfig] = None,
+    chunk_size: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads the raw dataset lazily, `chunk_size` rows at a time with
+    the same dtypes as `read_dataset`, so that memory usage does not
+    depend on the dataset size. The cache is neither read nor written
+
+    :param params, DatasetConfig - dataset location and schema
+    :param features, FeaturesConfig (default None) - numeric and
+    categorical columns to set dtypes for
+    :param chunk_size, int (default `params.chunk_size`) - rows per chunk
+
+    :rtype Iterator[pd.DataFrame], chunks of the dataset
+    """
+    chunk_size = chunk_size or params.chunk_size
+    if chunk_size is None or chunk_size <= 0:
+        error_message = f"Invalid chunk size: {chunk_size}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    dataset_path = f"{params.dataset_dir}/{params.dataset_filename}"
+    if not isfile(dataset_path):
+        log.error(msg=f"Dataset File not found: {dataset_path}")
+        raise FileNotFoundError()
+
+    log.debug(msg=f"Reading dataset from {dataset_path} by {chunk_size} rows")
+    with pd.read_csv(
+        dataset_path,
+        header=params.header,
+        names=params.column_names,
+        dtype=dataset_dtypes(params, features),
+        chunksize=chunk_size,
+    ) as reader:
+        yield from reader
+
+
+def dataset_dtypes(
+    params: DatasetConfig, features: Optional[FeaturesConfig] = None
+) -> Dict[str, str]:
+    """
+    Dtypes of the feature columns: `params.float_dtype` for numeric
+    and `category` for categorical ones, the rest are inferred
+    """
+    if features is None:
+        return {}
+    dtypes = {
+        column: params.float_dtype for column in features.numeric_features
+    }
+    dtypes.update((c, "category") for c in features.categorical_features)
+    if params.column_names is not None:
+        # explicit names are known: keep the dtypes of the listed columns,
+        # with a header row all of them are passed to read_csv
+        dtypes = {
+            c: dtype for c, dtype in dtypes.items() if c in params.column_names
+        }
+    return dtypes
+
+
+def file_digest(
+    path: str, block_size: int = 1 << 20, algorithm: str = "sha256"
+) -> str:
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _cache_path(
+    dataset_path: str,
+    params: DatasetConfig,
+    dtypes: Dict[str, str],
+    digest: Optional[str] = None,
+) -> Optional[str]:
+    if params.cache_dir is None:
+        return None
+    if params.cache_format not in CACHE_FORMATS:
+        error_message = f"Invalid cache format: {params.cache_format}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        log.warning(msg="pyarrow is not installed, dataset is not cached")
+        return None
+
+    schema = json.dumps(
+        dict(
+            header=params.header,
+            column_names=params.column_names,
+            dtypes=dtypes,
+        ),
+        sort_keys=True,
     )
+    digest = digest or file_digest(dataset_path)
+    key = hashlib.sha256((digest + schema).encode()).hexdigest()
+    filename = f"{basename(dataset_path)}.{key[:16]}.{params.cache_format}"
+    return join(params.cache_dir, filename)
+
+
+def _read_cache(path: str, cache_format: str) -> pd.DataFrame:
+    if cache_format == "feather":
+        return pd.read_feather(path)
+    return pd.read_parquet(path)
+
+
+def _write_cache(data: pd.DataFrame, path: str, cache_format: str) -> None:
+    makedirs(dirname(path) or ".", exist_ok=True)
+    # readers should never see a partially written file
+    partial = f"{path}.part"
+    if cache_format == "feather":
+        data.to_feather(partial)
+    else:
+        data.to_parquet(partial, index=False)
+    replace(partial, path)
+    log.info(msg=f"Dataset cached at {path}")
 
 
 def read_inference_data(path: str) -> pd.DataFrame:
@@ -94,3 +538,36 @@ def read_inference_data(path: str) -> pd.DataFrame:
 
     log.debug(msg="Data loaded")
     return data
+
+
+def read_inference_chunks(
+    path: str, chunk_size: Optional[int] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Reads inference data lazily, `chunk_size` rows at a time,
+    so that memory usage does not depend on the file size
+
+    :param path, str - path to the `.csv` file with features
+    :param chunk_size, int (default None) - number of rows per chunk,
+    the whole file is read at once if not specified
+
+    :rtype Iterator[pd.DataFrame], chunks of the data
+    """
+    if not chunk_size:
+        yield read_inference_data(path)
+        return
+
+    if chunk_size < 0:
+        error_message = f"Invalid chunk size: {chunk_size}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    log.debug(msg=f"Reading inference data from {path} by {chunk_size} rows")
+    try:
+        with pd.read_csv(path, chunksize=chunk_size) as reader:
+            yield from reader
+    except FileNotFoundError as e:
+        log.error(msg="File missing")
+        raise e
+
+    log.debug(msg="Data loaded")
@@ -1,9 +1,20 @@
+from .bundle import BUNDLE_VERSION, bundle_metadata, read_bundle
 from .extract import extract_feature_columns, extract_target, split_data
 from .preprocessing import Preprocessor
+from .prepared import PreparedData, data_fingerprint, prepare_data
+from .incremental import fit_incremental_preprocessor, stream_split
 
 __all__ = [
+    "BUNDLE_VERSION",
+    "bundle_metadata",
+    "read_bundle",
     "extract_feature_columns",
     "extract_target",
     "split_data",
     "Preprocessor",
+    "PreparedData",
+    "data_fingerprint",
+    "prepare_data",
+    "fit_incremental_preprocessor",
+    "stream_split",
 ]
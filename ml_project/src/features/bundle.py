@@ -0,0 +1,98 @@
+from typing import Any, Dict, Iterable, List, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from ..settings.params import FeaturesConfig
+
+
+log = logging.getLogger(__name__)
+
+# bumped on incompatible changes of the metadata layout
+BUNDLE_VERSION = 1
+
+
+def bundle_metadata(
+    chunks: Iterable[pd.DataFrame], feature: FeaturesConfig
+) -> Dict[str, Any]:
+    """
+    Collects what the inference service needs along with the model:
+    the input schema and the mean/std of numeric features used by
+    its outlier check. Statistics are accumulated chunk by chunk
+    (population std, missing values skipped), so the training data
+    may be streamed
+
+    :param chunks, Iterable[pd.DataFrame] - raw train features
+    :param feature, FeaturesConfig - numeric and categorical columns
+
+    :rtype Dict, metadata to embed into the artifact header
+    """
+    columns, count, mean, m2 = None, 0, 0, 0
+    for chunk in chunks:
+        columns = list(chunk.columns) if columns is None else columns
+        numeric = [c for c in columns if c in feature.numeric_features]
+        values = chunk[numeric].to_numpy(dtype=np.float64)
+
+        # merge the moments of the chunk (Chan et al.)
+        chunk_count = np.count_nonzero(~np.isnan(values), axis=0)
+        chunk_mean = np.nansum(values, axis=0) / np.maximum(chunk_count, 1)
+        chunk_m2 = np.nansum((values - chunk_mean) ** 2, axis=0)
+        total = np.maximum(count + chunk_count, 1)
+        delta = chunk_mean - mean
+        mean = mean + delta * chunk_count / total
+        m2 = m2 + chunk_m2 + delta**2 * count * chunk_count / total
+        count = count + chunk_count
+
+    if columns is None:
+        error_message = "No data to collect the statistics from"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    numeric = [c for c in columns if c in feature.numeric_features]
+    if np.any(np.broadcast_to(count, len(numeric)) == 0):
+        error_message = "Some numeric features have no values"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    mean = np.broadcast_to(mean, len(numeric))
+    std = np.broadcast_to(np.sqrt(m2 / np.maximum(count, 1)), len(numeric))
+    return dict(
+        bundle=BUNDLE_VERSION,
+        schema=dict(
+            columns=columns,
+            numeric_columns=numeric,
+            categorical_columns=[
+                c for c in columns if c in feature.categorical_features
+            ],
+        ),
+        stats=dict(
+            mean=mean.tolist(),
+            std=std.tolist(),
+        ),
+    )
+
+
+def read_bundle(
+    metadata: Dict[str, Any]
+) -> Tuple[Dict[str, List[str]], np.ndarray, np.ndarray]:
+    """
+    Extracts the schema and statistics stored by `bundle_metadata`.
+    Raises `KeyError` if the metadata has no bundle and `ValueError`
+    if the bundle is of unsupported version or inconsistent
+
+    :rtype Tuple, schema kwargs, mean and std of numeric features
+    """
+    version = metadata["bundle"]
+    if version != BUNDLE_VERSION:
+        error_message = f"Unsupported bundle version: {version}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    schema, stats = metadata["schema"], metadata["stats"]
+    mean, std = np.array(stats["mean"]), np.array(stats["std"])
+    if not len(mean) == len(std) == len(schema["numeric_columns"]):
+        error_message = "Statistics do not match the schema"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    return schema, mean, std
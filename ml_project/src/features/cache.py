@@ -0,0 +1,154 @@
+from dataclasses import asdict
+from os import getpid, listdir, makedirs, remove, replace, stat, utime
+from os.path import isfile, join
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import pickle
+import platform
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+from ..settings.params import FeaturesConfig
+
+
+log = logging.getLogger(__name__)
+
+# settings of the cache itself do not affect the fitted state
+UNKEYED_FIELDS = ("cache_dir", "cache_max_size")
+
+
+def library_versions() -> Dict[str, str]:
+    # pickles are only reused with the libraries that wrote them
+    return dict(
+        python=platform.python_version(),
+        numpy=np.__version__,
+        pandas=pd.__version__,
+        sklearn=sklearn.__version__,
+    )
+
+
+class PickleCache:
+    """
+    On-disk cache of pickled objects stored as `<prefix>.<key>.pkl`
+    files. When the total size of the entries with the same prefix
+    exceeds `max_size`, least recently used ones are evicted
+
+    :param directory, str - directory to store the entries in
+    :param max_size, int - max total size of the entries, bytes
+    :param prefix, str - name prefix of the entry files
+    """
+
+    def __init__(self, directory: str, max_size: int, prefix: str) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.prefix = prefix
+
+    def load(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        if not isfile(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                obj = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            log.warning(msg=f"Failed to load cached {self.prefix}: {e}")
+            return None
+        # access time is not reliable on most mounts
+        try:
+            utime(path)
+        except FileNotFoundError:
+            pass
+        log.debug(msg=f"Loaded cached {self.prefix} {key}")
+        return obj
+
+    def store(self, key: str, obj: Any) -> None:
+        makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        partial = f"{path}.{getpid()}.part"
+        with open(partial, "wb") as f:
+            pickle.dump(obj, f)
+        replace(partial, path)
+        log.debug(msg=f"Cached {self.prefix} {key}")
+        self.evict()
+
+    def evict(self) -> None:
+        # entries may be evicted by concurrent runs sharing the directory
+        names = [
+            name
+            for name in listdir(self.directory)
+            if name.startswith(f"{self.prefix}.") and name.endswith(".pkl")
+        ]
+        entries = []
+        for name in names:
+            path = join(self.directory, name)
+            try:
+                info = stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            total -= size
+            try:
+                remove(path)
+            except FileNotFoundError:
+                continue
+            log.info(msg=f"Evicted cached {self.prefix} {path}")
+
+    def _path(self, key: str) -> str:
+        return join(self.directory, f"{self.prefix}.{key[:32]}.pkl")
+
+
+class TransformerCache(PickleCache):
+    """
+    Content-addressed on-disk cache of fitted transformers.
+    Entries are keyed by the features config, the training data and
+    the library versions. When the total size exceeds `max_size`,
+    least recently used entries are evicted
+
+    :param directory, str - directory to store the entries in
+    :param max_size, int - max total size of the entries, bytes
+    """
+
+    def __init__(self, directory: str, max_size: int) -> None:
+        super().__init__(directory, max_size, prefix="transformer")
+
+    @staticmethod
+    def key(
+        cfg: FeaturesConfig,
+        data: pd.DataFrame,
+        data_key: Optional[str] = None,
+    ) -> str:
+        """
+        :param cfg, FeaturesConfig
+        :param data, pd.DataFrame - training data
+        :param data_key, str (default None) - digest identifying `data`,
+        if known, the data is not hashed
+
+        :rtype str
+        """
+        settings = {
+            k: v for k, v in asdict(cfg).items() if k not in UNKEYED_FIELDS
+        }
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps(
+                [settings, library_versions(), list(map(str, data.dtypes))],
+                sort_keys=True,
+                default=str,
+            ).encode()
+        )
+        digest.update(json.dumps(list(map(str, data.columns))).encode())
+        if data_key is not None:
+            digest.update(data_key.encode())
+        else:
+            digest.update(
+                pd.util.hash_pandas_object(data, index=False).values
+            )
+        return digest.hexdigest()
@@ -0,0 +1,224 @@
+from dataclasses import replace
+from typing import Callable, Iterable, Iterator, List, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from sklearn.base import clone
+
+from ..data import read_dataset_chunks
+from ..settings.params import DatasetConfig, FeaturesConfig, SplitConfig
+
+from .extract import extract_feature_columns, extract_target
+from .preprocessing import Preprocessor
+
+
+log = logging.getLogger(__name__)
+
+# imputer strategies with statistics computable in a single pass
+STREAMING_IMPUTER_STRATEGIES = ("mean", "constant")
+
+Chunks = Callable[[], Iterable[pd.DataFrame]]
+
+
+def stream_split(
+    dataset: DatasetConfig,
+    splitter: SplitConfig,
+    feature: FeaturesConfig,
+    validation: bool = False,
+) -> Iterator[Tuple[pd.DataFrame, pd.Series]]:
+    """
+    Reads the dataset in chunks of `dataset.chunk_size` rows and yields
+    features and target of the train (or validation) rows of each one.
+    Rows are assigned to the validation part with the probability
+    of `splitter.validation` by a generator seeded with
+    `splitter.random_state`, so every read yields the same rows.
+    Unlike `split_data`, the split is not stratified
+
+    :param dataset, DatasetConfig
+    :param splitter, SplitConfig
+    :param feature, FeaturesConfig
+    :param validation, bool (default False) - whether to yield
+    the validation part instead of the train one
+
+    :rtype Iterator[Tuple[pd.DataFrame, pd.Series]], features and target
+    """
+    columns = feature.numeric_features + feature.categorical_features
+    rng = np.random.default_rng(splitter.random_state)
+    for chunk in read_dataset_chunks(dataset, feature):
+        is_validation = rng.random(len(chunk)) < splitter.validation
+        rows = chunk[is_validation if validation else ~is_validation]
+        if len(rows):
+            yield (
+                extract_feature_columns(rows, columns),
+                extract_target(rows, feature.target),
+            )
+
+
+def fit_incremental_preprocessor(
+    cfg: FeaturesConfig, chunks: Chunks
+) -> Preprocessor:
+    """
+    Fits `Preprocessor` on the data which does not fit in memory.
+    `chunks` is called once per pass and must yield the same features
+    each time. The passes are: imputer statistics and categories,
+    `StandardScaler.partial_fit` and `IncrementalPCA.partial_fit`
+    (if `cfg.PCA_components` is set). Only the standard scaler,
+    the linear kernel and `mean`/`constant` numeric imputers
+    are supported, `ValueError` is raised otherwise
+
+    :param cfg, FeaturesConfig
+    :param chunks, Callable - returns an iterable of feature chunks
+
+    :rtype Preprocessor, same as fitted by `Preprocessor.fit`
+    """
+    cfg = _incremental_config(cfg)
+    preprocessor = Preprocessor(cfg)
+    numeric = [
+        c for c in cfg.numeric_features if c not in cfg.features_to_drop
+    ]
+    categorical = [
+        c for c in cfg.categorical_features if c not in cfg.features_to_drop
+    ]
+
+    means = _fit_statistics(preprocessor, chunks, numeric, categorical)
+    if not numeric:
+        return preprocessor
+
+    num_pipeline, _ = _fitted_pipelines(preprocessor)
+    imputer, steps = num_pipeline[0], num_pipeline[-1]
+    if cfg.numeric_imputer_strategy == "mean":
+        imputer.statistics_ = means
+
+    def imputed() -> Iterator[np.ndarray]:
+        return (imputer.transform(chunk[numeric]) for chunk in chunks())
+
+    scaler = _fit_scaler(steps, imputed)
+    if cfg.PCA_components:
+        _fit_pca(
+            steps,
+            (scaler.transform(values) for values in imputed()),
+            cfg.PCA_components,
+        )
+    return preprocessor
+
+
+def _incremental_config(cfg: FeaturesConfig) -> FeaturesConfig:
+    if cfg.scaler_type != "standard":
+        error_message = f"Scaler can not be fitted incrementally: {cfg}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    if cfg.numeric_imputer_strategy not in STREAMING_IMPUTER_STRATEGIES:
+        error_message = (
+            f"Imputer strategy can not be fitted incrementally: "
+            f"{cfg.numeric_imputer_strategy}. "
+            f"Expected {STREAMING_IMPUTER_STRATEGIES}"
+        )
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    if cfg.PCA_components and cfg.PCA_solver not in ("auto", "incremental"):
+        error_message = f"PCA can not be fitted incrementally: {cfg}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    if cfg.PCA_components:
+        cfg = replace(cfg, PCA_solver="incremental")
+    return cfg
+
+
+def _fit_statistics(
+    preprocessor: Preprocessor,
+    chunks: Chunks,
+    numeric: List[str],
+    categorical: List[str],
+) -> np.ndarray:
+    # fits the transformer on the first chunk with the categories
+    # and modes of the whole data, returns the numeric means
+    log.info(msg="Collecting imputer statistics and categories")
+    first, means, modes, categories = _collect_statistics(
+        chunks(), numeric, categorical
+    )
+
+    # categories seen in the first chunk only might be incomplete
+    transformer = preprocessor.transformer
+    _, cat_pipeline, _ = transformer.transformers[-1]
+    cat_pipeline[-1][-1].set_params(categories=categories)
+    transformer.fit(first.drop(columns=preprocessor.cfg.features_to_drop))
+
+    if categorical:
+        _, cat_pipeline = _fitted_pipelines(preprocessor)
+        cat_pipeline[0].statistics_ = np.array(modes, dtype=object)
+    return means
+
+
+def _fitted_pipelines(preprocessor: Preprocessor):
+    transformer = preprocessor.transformer
+    return (
+        transformer.named_transformers_[name]
+        for name, _, _ in transformer.transformers
+    )
+
+
+def _fit_scaler(steps, imputed: Callable[[], Iterable[np.ndarray]]):
+    log.info(msg="Fitting scaler incrementally")
+    scaler = clone(steps[0])
+    for values in imputed():
+        scaler.partial_fit(values)
+    steps.steps[0] = (steps.steps[0][0], scaler)
+    return scaler
+
+
+def _fit_pca(steps, scaled: Iterable[np.ndarray], n_components: int):
+    log.info(msg="Fitting PCA incrementally")
+    pca = clone(steps[1])
+    for batch in _rebatch(scaled, n_components):
+        pca.partial_fit(batch)
+    steps.steps[1] = (steps.steps[1][0], pca)
+
+
+def _collect_statistics(
+    chunks: Iterable[pd.DataFrame], numeric: List[str], categorical: List[str]
+):
+    first, sums, counts = None, 0, 0
+    value_counts = [pd.Series(dtype=np.int64) for _ in categorical]
+    for chunk in chunks:
+        first = chunk if first is None else first
+        values = chunk[numeric].to_numpy(dtype=np.float64)
+        sums = sums + np.nansum(values, axis=0)
+        counts = counts + np.count_nonzero(~np.isnan(values), axis=0)
+        for i, column in enumerate(categorical):
+            value_counts[i] = value_counts[i].add(
+                chunk[column].astype(object).value_counts(), fill_value=0
+            )
+
+    if first is None:
+        error_message = "No data to fit the preprocessor on"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    if np.any(counts == 0):
+        error_message = "Some numeric features have no values"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    modes, categories = [], []
+    for column_counts in value_counts:
+        column_counts = column_counts[column_counts > 0].sort_index()
+        # ties are resolved to the smallest value, as by `SimpleImputer`
+        modes.append(column_counts.idxmax())
+        categories.append(column_counts.index.to_list())
+    return first, sums / counts, modes, categories
+
+
+def _rebatch(batches: Iterable[np.ndarray], min_size: int):
+    # `IncrementalPCA.partial_fit` needs at least `n_components` rows
+    pending = None
+    for batch in batches:
+        if pending is None:
+            pending = batch
+        elif len(batch) < min_size or len(pending) < min_size:
+            pending = np.concatenate((pending, batch))
+        else:
+            yield pending
+            pending = batch
+    if pending is not None:
+        yield pending
@@ -1,3 +1,4 @@
+from typing import Optional
 import logging
 import numpy as np
 
@@ -9,6 +10,7 @@ from sklearn.pipeline import Pipeline
 
 from ..settings.params import FeaturesConfig
 
+from .cache import TransformerCache
 from .process import (
     numeric_features_transform,
     categorical_features_transform,
@@ -29,10 +31,26 @@ class Preprocessor(BaseEstimator, TransformerMixin):
             cat_transform=self._build_categorical_pipeline(),
         )
 
-    def fit(self, X: pd.DataFrame, y=None) -> "Preprocessor":
+    def fit(
+        self, X: pd.DataFrame, y=None, data_key: Optional[str] = None
+    ) -> "Preprocessor":
+        # `data_key` identifies X for the transformer cache, if known
         log.debug(msg="Fitting preprocessor")
         x = X.drop(columns=self.cfg.features_to_drop)
+        if self.cfg.cache_dir is None:
+            self.transformer.fit(X=x)
+            return self
+
+        cache = TransformerCache(self.cfg.cache_dir, self.cfg.cache_max_size)
+        key = cache.key(self.cfg, x, data_key)
+        cached = cache.load(key)
+        if cached is not None:
+            log.info(msg="Reusing cached fitted transformer")
+            self.transformer = cached
+            return self
+
         self.transformer.fit(X=x)
+        cache.store(key, self.transformer)
         return self
 
     def transform(self, X: pd.DataFrame, y=None) -> np.ndarray:
@@ -48,6 +66,10 @@ class Preprocessor(BaseEstimator, TransformerMixin):
             scaler_type=self.cfg.scaler_type,
             principal_components=self.cfg.PCA_components,
             pca_kernel=self.cfg.PCA_kernel,
+            pca_solver=self.cfg.PCA_solver,
+            pca_batch_size=self.cfg.PCA_batch_size,
+            nystroem_components=self.cfg.nystroem_components,
+            random_state=self.cfg.random_state,
         )
 
     def _build_categorical_pipeline(self) -> Pipeline:
@@ -1,9 +1,10 @@
-from typing import List
+from typing import List, Optional
 import logging
 
 from sklearn.pipeline import Pipeline, make_pipeline
 from sklearn.preprocessing import StandardScaler, RobustScaler
-from sklearn.decomposition import KernelPCA
+from sklearn.decomposition import IncrementalPCA, KernelPCA, PCA
+from sklearn.kernel_approximation import Nystroem
 from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.compose import ColumnTransformer, make_column_transformer
@@ -11,6 +12,7 @@ from sklearn.compose import ColumnTransformer, make_column_transformer
 
 __all__ = [
     "numeric_features_transform",
+    "pca_layer",
     "categorical_features_transform",
     "preprocessing_pipeline",
 ]
@@ -19,10 +21,24 @@ __all__ = [
 log = logging.getLogger(__name__)
 
 
+PCA_SOLVERS = (
+    "auto",
+    "kernel",
+    "full",
+    "randomized",
+    "incremental",
+    "nystroem",
+)
+
+
 def numeric_features_transform(
     scaler_type: str,
     principal_components: int = None,
     pca_kernel: str = "linear",
+    pca_solver: str = "auto",
+    pca_batch_size: Optional[int] = None,
+    nystroem_components: int = 100,
+    random_state: Optional[int] = None,
 ) -> Pipeline:
     """
     Creates pipeline for numerical features:
@@ -32,6 +48,11 @@ def numeric_features_transform(
     :param principal_components: int or None,
     if not None, add PCA layer after scaling with specified kernel
     :param pca_kernel: PCA kernel to use. Default is a linear kernel
+    :param pca_solver: how to compute the components (see `pca_layer`)
+    :param pca_batch_size: batch size for `incremental` solver
+    :param nystroem_components: kernel approximation rank
+    for `nystroem` solver
+    :param random_state: seed for the randomized solvers
 
     :rtype : Pipeline
     """
@@ -50,12 +71,75 @@ def numeric_features_transform(
 
     if principal_components:
         log.debug(msg="Adding PCA layer to numeric pipeline")
-        pca = KernelPCA(n_components=principal_components, kernel=pca_kernel)
-        steps += [pca]
+        steps += pca_layer(
+            principal_components,
+            pca_kernel,
+            pca_solver,
+            pca_batch_size,
+            nystroem_components,
+            random_state,
+        )
 
     return make_pipeline(*steps)
 
 
+def pca_layer(
+    principal_components: int,
+    pca_kernel: str = "linear",
+    pca_solver: str = "auto",
+    pca_batch_size: Optional[int] = None,
+    nystroem_components: int = 100,
+    random_state: Optional[int] = None,
+) -> List:
+    """
+    Creates PCA step(s). `KernelPCA` builds the n x n kernel matrix
+    of the train set, so for the linear kernel `PCA` is used instead
+    (`auto`, `full` or `randomized` SVD, or `incremental` for batched
+    fitting), which yields the same projections up to tolerance.
+    Other kernels use exact `KernelPCA` by default or its Nystroem
+    approximation (`nystroem`) followed by `PCA`. Solver `kernel`
+    always uses `KernelPCA`
+
+    :rtype : List of the steps
+    """
+    if pca_solver not in PCA_SOLVERS:
+        error_message = (
+            f"Invalid PCA solver: {pca_solver}. Expected {PCA_SOLVERS}"
+        )
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    linear = pca_kernel == "linear"
+    if pca_solver == "kernel" or (pca_solver == "auto" and not linear):
+        return [
+            KernelPCA(n_components=principal_components, kernel=pca_kernel)
+        ]
+    if pca_solver == "nystroem":
+        nystroem = Nystroem(
+            kernel=pca_kernel,
+            n_components=nystroem_components,
+            random_state=random_state,
+        )
+        return [nystroem, PCA(n_components=principal_components)]
+    if not linear:
+        error_message = f"Solver {pca_solver} supports linear kernel only"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    if pca_solver == "incremental":
+        return [
+            IncrementalPCA(
+                n_components=principal_components, batch_size=pca_batch_size
+            )
+        ]
+    return [
+        PCA(
+            n_components=principal_components,
+            svd_solver=pca_solver,
+            random_state=random_state,
+        )
+    ]
+
+
 def categorical_features_transform(encoder_type: str) -> Pipeline:
     """
     Creates pipeline for categorical features:
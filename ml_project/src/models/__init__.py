@@ -3,12 +3,20 @@ from .classifier import (
     make_inference_pipeline,
 )
 
+from .compiled import CompiledPipeline, compile_pipeline
+from .trees import TreeEnsemble, compile_ensemble
+from .parallel import predict_chunks
+from .sweep import expand_grid, run_sweep
+from .incremental import fit_incremental, train_incremental
+
 from .utils import (
     get_metrics,
     dump_pipeline,
     dump_prediction,
     load_pipeline,
 )
+from .artifact import dump_artifact, load_artifact, read_header
+from .writers import ScoredChunk, PredictionWriter, make_writer
 
 __all__ = [
     "make_estimator",
@@ -16,5 +24,20 @@ __all__ = [
     "get_metrics",
     "dump_pipeline",
     "load_pipeline",
-    "dump_prediction"
+    "dump_prediction",
+    "dump_artifact",
+    "load_artifact",
+    "read_header",
+    "ScoredChunk",
+    "PredictionWriter",
+    "make_writer",
+    "predict_chunks",
+    "expand_grid",
+    "run_sweep",
+    "fit_incremental",
+    "train_incremental",
+    "CompiledPipeline",
+    "compile_pipeline",
+    "TreeEnsemble",
+    "compile_ensemble",
 ]
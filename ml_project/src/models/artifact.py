@@ -0,0 +1,210 @@
+from datetime import datetime, timezone
+from os import getpid, replace
+from typing import Any, Dict, List, Optional, Tuple, Union
+import hashlib
+import json
+import logging
+import mmap
+import pickle
+import platform
+import struct
+
+import numpy as np
+import pandas as pd
+import sklearn
+
+
+log = logging.getLogger(__name__)
+
+ARTIFACT_MAGIC = b"MLPKG\x00\x00\x01"
+ARTIFACT_SUFFIX = ".mlpkg"
+FORMAT_VERSION = 1
+# buffers are aligned for vectorized access to the mapped arrays
+ALIGNMENT = 64
+# smaller buffers are kept inside the pickle stream
+MIN_BUFFER_SIZE = 1 << 12
+
+_PREAMBLE = struct.Struct("<8sQ")
+
+
+def library_versions() -> Dict[str, str]:
+    return dict(
+        python=platform.python_version(),
+        numpy=np.__version__,
+        pandas=pd.__version__,
+        sklearn=sklearn.__version__,
+    )
+
+
+def dump_artifact(
+    obj: Any, path: str, metadata: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Serializes `obj` into the artifact format: a JSON header followed
+    by a pickle (protocol 5) stream and the raw data of NumPy arrays
+    larger than `MIN_BUFFER_SIZE` bytes, each one aligned
+    to `ALIGNMENT` bytes. `load_artifact` maps these arrays
+    instead of reading them, so workers share the pages.
+
+    The header holds library versions, SHA-256 of the content following
+    the header and the user-defined `metadata` (e.g. schema and stats),
+    it can be read without the content, see `read_header`
+
+    :param obj, Any - picklable object, e.g. fitted `Pipeline`
+    :param path, str - file to write, replaced atomically
+    :param metadata, Dict (default None) - JSON-serializable metadata
+
+    :rtype Dict, the header written
+    """
+    buffers: List[pickle.PickleBuffer] = []
+
+    def out_of_band(buffer: pickle.PickleBuffer) -> bool:
+        if buffer.raw().nbytes < MIN_BUFFER_SIZE:
+            return True
+        buffers.append(buffer)
+        return False
+
+    payload = pickle.dumps(obj, protocol=5, buffer_callback=out_of_band)
+
+    digest = hashlib.sha256(payload)
+    layout, offset = [], len(payload)
+    for buffer in buffers:
+        raw = buffer.raw()
+        digest.update(bytes(_align(offset) - offset))
+        offset = _align(offset)
+        digest.update(raw)
+        layout.append(dict(offset=offset, size=raw.nbytes))
+        offset += raw.nbytes
+
+    header = dict(
+        format=FORMAT_VERSION,
+        created=datetime.now(timezone.utc).isoformat(),
+        versions=library_versions(),
+        sha256=digest.hexdigest(),
+        pickle=dict(offset=0, size=len(payload)),
+        buffers=layout,
+        metadata=metadata or {},
+    )
+    encoded = json.dumps(header).encode()
+    encoded += b" " * (_align(_PREAMBLE.size + len(encoded)) - _PREAMBLE.size)
+
+    partial = f"{path}.{getpid()}.part"
+    with open(partial, "wb") as f:
+        f.write(_PREAMBLE.pack(ARTIFACT_MAGIC, len(encoded)))
+        f.write(encoded)
+        f.write(payload)
+        position = len(payload)
+        for buffer, item in zip(buffers, layout):
+            f.write(bytes(item["offset"] - position))
+            f.write(buffer.raw())
+            position = item["offset"] + item["size"]
+    replace(partial, path)
+    log.debug(msg=f"Artifact written to {path}: {len(buffers)} buffers")
+    return header
+
+
+def is_artifact(path: str) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(ARTIFACT_MAGIC)) == ARTIFACT_MAGIC
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """
+    Reads the header of the artifact without loading the content
+
+    :rtype Dict, with `format`, `versions`, `sha256` and `metadata`
+    """
+    with open(path, "rb") as f:
+        return _parse_header(f.read(_PREAMBLE.size), f.read)[0]
+
+
+def load_artifact(path: str, verify: bool = False) -> Any:
+    """
+    Loads the object stored by `dump_artifact`, large NumPy arrays are
+    read-only views of the memory-mapped file (pages are read lazily
+    and shared between processes mapping the same file)
+
+    :param path, str - artifact location
+    :param verify, bool (default False) - whether to check
+    the content hash (reads the whole file)
+
+    :rtype Any, the object
+    """
+    return load_with_header(path, verify)[0]
+
+
+def load_with_header(
+    path: str, verify: bool = False
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Same as `load_artifact`, the header is returned along with the object
+    """
+    with open(path, "rb") as f:
+        content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return _load(memoryview(content), verify)
+
+
+def loads_artifact(
+    data: Union[bytes, memoryview], verify: bool = False
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Same as `load_with_header` for the artifact contents already
+    in memory, arrays are views of `data`
+    """
+    return _load(memoryview(data), verify)
+
+
+def _load(content: memoryview, verify: bool) -> Tuple[Any, Dict[str, Any]]:
+    header, start = _parse_header(
+        content[: _PREAMBLE.size],
+        lambda size: content[slice(_PREAMBLE.size, _PREAMBLE.size + size)],
+    )
+    body = content[start:]
+    if verify:
+        digest = hashlib.sha256(body).hexdigest()
+        if digest != header["sha256"]:
+            error_message = f"Artifact hash mismatch: {digest}"
+            log.error(msg=error_message)
+            raise ValueError(error_message)
+
+    versions = library_versions()
+    for library, version in header["versions"].items():
+        if library != "python" and versions.get(library) != version:
+            log.warning(
+                msg=f"Artifact built with {library} {version}, "
+                f"running {versions.get(library)}"
+            )
+
+    stream = header["pickle"]
+    buffers = [
+        body[slice(item["offset"], item["offset"] + item["size"])]
+        for item in header["buffers"]
+    ]
+    obj = pickle.loads(
+        body[slice(stream["offset"], stream["offset"] + stream["size"])],
+        buffers=buffers,
+    )
+    return obj, header
+
+
+def _parse_header(preamble: bytes, read):
+    if len(preamble) < _PREAMBLE.size:
+        error_message = "Not an artifact: file is too short"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    magic, size = _PREAMBLE.unpack(preamble)
+    if magic != ARTIFACT_MAGIC:
+        error_message = "Not an artifact: invalid magic bytes"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    header = json.loads(bytes(read(size)))
+    if header.get("format") != FORMAT_VERSION:
+        error_message = f"Unsupported artifact format: {header.get('format')}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    return header, _PREAMBLE.size + size
+
+
+def _align(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
@@ -0,0 +1,322 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple, Union
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit, softmax
+
+from sklearn.compose import ColumnTransformer
+from sklearn.decomposition import IncrementalPCA, KernelPCA, PCA
+from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, RobustScaler, StandardScaler
+
+from ..features.preprocessing import Preprocessor
+from .classifier import make_inference_pipeline
+from .trees import compile_ensemble
+
+
+log = logging.getLogger(__name__)
+
+Features = Union[pd.DataFrame, np.ndarray]
+
+
+@dataclass
+class CategoricalBlock:
+    """
+    Lookup table for a single categorical column: each known category
+    maps to a row of the table, the last (zero) row is reserved
+    for unknown categories (like `handle_unknown="ignore"`)
+    """
+
+    column: str
+    fill: Any
+    index: Dict[Any, int]
+    table: np.ndarray
+
+    def lookup(self, values: np.ndarray) -> np.ndarray:
+        index, fill, unknown = self.index, self.fill, len(self.index)
+        codes = np.fromiter(
+            # NaN is the only value not equal to itself
+            (index.get(fill if v != v else v, unknown) for v in values),
+            dtype=np.intp,
+            count=len(values),
+        )
+        return self.table[codes]
+
+
+@dataclass
+class LogisticHead:
+    """
+    Turns decision values of a logistic regression into labels/probabilities
+    """
+
+    classes: np.ndarray
+    multinomial: bool = False
+
+    def predict(self, decision: np.ndarray) -> np.ndarray:
+        if decision.shape[1] == 1:
+            return self.classes[(decision[:, 0] > 0).astype(int)]
+        return self.classes[decision.argmax(axis=1)]
+
+    def predict_proba(self, decision: np.ndarray) -> np.ndarray:
+        if decision.shape[1] == 1:
+            positive = expit(decision[:, 0])
+            return np.column_stack((1 - positive, positive))
+        if self.multinomial:
+            return softmax(decision, axis=1)
+        proba = expit(decision)
+        return proba / proba.sum(axis=1, keepdims=True)
+
+
+@dataclass
+class CompiledPipeline:
+    """
+    NumPy-only form of the fitted inference pipeline.
+
+    Preprocessing (imputation, scaling, linear PCA, one-hot encoding)
+    is flattened into a single affine map of numeric features plus
+    lookup tables for categorical ones:
+    `X_num @ weights + bias + sum(table[category] for each column)`.
+    For linear models the estimator itself is folded into the same map,
+    so the output are decision values which `head` turns into labels
+    """
+
+    numeric_columns: List[str]
+    numeric_fill: np.ndarray
+    weights: np.ndarray
+    bias: np.ndarray
+    head: Any
+    categorical: List[CategoricalBlock] = field(default_factory=list)
+
+    @property
+    def classes_(self) -> np.ndarray:
+        return self.head.classes
+
+    def transform(self, X: Features) -> np.ndarray:
+        output = self._numeric(X) @ self.weights + self.bias
+        for block in self.categorical:
+            output += block.lookup(np.asarray(X[block.column], dtype=object))
+        return output
+
+    def predict(self, X: Features) -> np.ndarray:
+        return self.head.predict(self.transform(X))
+
+    def predict_proba(self, X: Features) -> np.ndarray:
+        return self.head.predict_proba(self.transform(X))
+
+    def _numeric(self, X: Features) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            if X.columns.tolist() != self.numeric_columns:
+                X = X[self.numeric_columns]
+            values = X.to_numpy(dtype=np.float64)
+        elif not self.categorical:
+            # plain matrix is expected to have numeric columns only
+            values = np.asarray(X, dtype=np.float64)
+        else:
+            raise ValueError("Categorical features require a DataFrame")
+
+        missing = np.isnan(values)
+        if missing.any():
+            values = np.where(missing, self.numeric_fill, values)
+        return values
+
+
+def compile_pipeline(
+    pipeline: Pipeline,
+) -> Union[CompiledPipeline, Pipeline]:
+    """
+    Flattens fitted `Pipeline(Preprocessor, estimator)` into NumPy
+    matrices, see `CompiledPipeline`. Tree ensembles keep the original
+    preprocessor, their trees are packed into `TreeEnsemble`.
+    Raises `ValueError` if some of the steps can not be compiled
+
+    :param pipeline, fitted `Pipeline` as built by `make_inference_pipeline`
+
+    :rtype CompiledPipeline, or Pipeline(Preprocessor, TreeEnsemble)
+    """
+    log.debug(msg="Compiling inference pipeline")
+    steps = (
+        [step for _, step in pipeline.steps]
+        if isinstance(pipeline, Pipeline)
+        else []
+    )
+    if len(steps) != 2 or not isinstance(steps[0], Preprocessor):
+        error_message = "Expected Pipeline(Preprocessor, estimator)"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    preprocessor, estimator = steps
+    if not _is_logistic(estimator):
+        ensemble = compile_ensemble(estimator)
+        log.debug(msg="Compilation complete")
+        return make_inference_pipeline(preprocessor, ensemble)
+
+    compiled = compile_column_transformer(preprocessor.transformer)
+
+    # fold the linear model into the preprocessing map
+    coef_t = estimator.coef_.T
+    compiled.weights = compiled.weights @ coef_t
+    compiled.bias = compiled.bias @ coef_t + estimator.intercept_
+    for block in compiled.categorical:
+        block.table = block.table @ coef_t
+    compiled.head = LogisticHead(
+        classes=estimator.classes_, multinomial=_is_multinomial(estimator)
+    )
+
+    log.debug(msg="Compilation complete")
+    return compiled
+
+
+def compile_column_transformer(
+    transformer: ColumnTransformer,
+) -> CompiledPipeline:
+    """
+    Compiles fitted `ColumnTransformer` built by `preprocessing_pipeline`
+    into `CompiledPipeline` without head: its output matches
+    the output of `transformer.transform`
+    """
+    if transformer.remainder != "drop":
+        raise ValueError("Only remainder='drop' is supported")
+
+    n_outputs = sum(
+        s.stop - s.start for s in transformer.output_indices_.values()
+    )
+    numeric_columns, numeric_fill = [], []
+    weights, bias = [], np.zeros(n_outputs)
+    categorical = []
+
+    for name, steps, columns in transformer.transformers_:
+        if steps == "drop" or len(columns) == 0:
+            continue
+        output = transformer.output_indices_[name]
+        steps = _flatten(steps)
+
+        if isinstance(steps[-1], OneHotEncoder):
+            categorical += _compile_categorical(
+                steps, columns, output, n_outputs
+            )
+            continue
+
+        fill, affine, shift = _compile_numeric(steps, len(columns))
+        numeric_columns += list(columns)
+        numeric_fill.append(fill)
+        block = np.zeros((len(columns), n_outputs))
+        block[:, output] = affine
+        weights.append(block)
+        bias[output] += shift
+
+    if not numeric_columns:
+        raise ValueError("At least one numeric column is expected")
+
+    return CompiledPipeline(
+        numeric_columns=numeric_columns,
+        numeric_fill=np.concatenate(numeric_fill),
+        weights=np.vstack(weights),
+        bias=bias,
+        head=None,
+        categorical=categorical,
+    )
+
+
+def _flatten(step: Any) -> List[Any]:
+    if isinstance(step, Pipeline):
+        return [s for _, inner in step.steps for s in _flatten(inner)]
+    return [step]
+
+
+def _compile_numeric(
+    steps: List[Any], n_features: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    imputer, *steps = steps
+    if not isinstance(imputer, SimpleImputer):
+        raise ValueError("Numeric pipeline should start with SimpleImputer")
+    if np.isnan(imputer.statistics_).any():
+        raise ValueError("Imputer has features without statistics")
+
+    # compose affine maps `x @ W + b` of the consecutive steps
+    weights, bias = np.eye(n_features), np.zeros(n_features)
+    for step in steps:
+        step_weights, step_bias = _affine(step)
+        weights = weights @ step_weights
+        bias = bias @ step_weights + step_bias
+    return imputer.statistics_.astype(np.float64), weights, bias
+
+
+def _affine(step: Any) -> Tuple[np.ndarray, np.ndarray]:
+    if isinstance(step, (StandardScaler, RobustScaler)):
+        if isinstance(step, StandardScaler):
+            shift, scale = step.mean_, step.scale_
+        else:
+            shift, scale = step.center_, step.scale_
+        n_features = step.n_features_in_
+        shift = np.zeros(n_features) if shift is None else shift
+        scale = np.ones(n_features) if scale is None else scale
+        return np.diag(1 / scale), -shift / scale
+
+    if isinstance(step, KernelPCA) and step.kernel == "linear":
+        # centered linear kernel of `x` against the train set equals
+        # `(x - m) @ (X_fit - m).T` where `m` is the train set mean
+        non_zeros = np.flatnonzero(step.eigenvalues_)
+        alphas = np.zeros_like(step.eigenvectors_)
+        alphas[:, non_zeros] = step.eigenvectors_[:, non_zeros] / np.sqrt(
+            step.eigenvalues_[non_zeros]
+        )
+        mean = step.X_fit_.mean(axis=0)
+        weights = (step.X_fit_ - mean).T @ alphas
+        return weights, -mean @ weights
+
+    if isinstance(step, (PCA, IncrementalPCA)):
+        weights = step.components_.T
+        if step.whiten:
+            weights = weights / np.sqrt(step.explained_variance_)
+        return weights, -step.mean_ @ weights
+
+    raise ValueError(f"Can not compile transformer: {step}")
+
+
+def _compile_categorical(
+    steps: List[Any],
+    columns: List[str],
+    output: slice,
+    n_outputs: int,
+) -> List[CategoricalBlock]:
+    if len(steps) != 2 or not isinstance(steps[0], SimpleImputer):
+        raise ValueError("Expected SimpleImputer followed by OneHotEncoder")
+    imputer, encoder = steps
+    if encoder.drop is not None:
+        raise ValueError("OneHotEncoder with dropped categories")
+
+    blocks, offset = [], output.start
+    for column, fill, categories in zip(
+        columns, imputer.statistics_, encoder.categories_
+    ):
+        rows = np.arange(len(categories))
+        table = np.zeros((len(categories) + 1, n_outputs))
+        table[rows, offset + rows] = 1
+        blocks.append(
+            CategoricalBlock(
+                column=column,
+                fill=fill,
+                index={c: i for i, c in enumerate(categories)},
+                table=table,
+            )
+        )
+        offset += len(categories)
+    return blocks
+
+
+def _is_logistic(estimator: Any) -> bool:
+    if isinstance(estimator, SGDClassifier):
+        return estimator.loss in ("log", "log_loss")
+    return isinstance(estimator, LogisticRegression)
+
+
+def _is_multinomial(estimator: LogisticRegression) -> bool:
+    if len(estimator.classes_) <= 2 or isinstance(estimator, SGDClassifier):
+        return False
+    if estimator.multi_class == "auto":
+        return estimator.solver != "liblinear"
+    return estimator.multi_class == "multinomial"
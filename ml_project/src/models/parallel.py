@@ -0,0 +1,99 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Iterator, Optional
+import logging
+
+import pandas as pd
+
+from .utils import load_pipeline
+from .writers import ScoredChunk
+
+
+log = logging.getLogger(__name__)
+
+# pipeline loaded by the initializer of each worker process
+_worker_pipeline: Optional[Any] = None
+
+
+def predict_chunks(
+    artifact: str,
+    chunks: Iterable[pd.DataFrame],
+    workers: int = 1,
+    id_column: Optional[str] = None,
+    proba: bool = False,
+) -> Iterator[ScoredChunk]:
+    """
+    Scores chunks of features with the pipeline stored at `artifact`,
+    predictions are yielded in the order of the chunks.
+
+    With `workers` > 1 chunks are scored in a process pool, each worker
+    loads the pipeline once. At most 2 chunks per worker are in flight,
+    so memory usage stays bounded for arbitrary long inputs
+
+    :param artifact, str - path to the pickled pipeline
+    :param chunks, Iterable[pd.DataFrame] - features to score
+    :param workers, int (default 1) - number of processes
+    :param id_column, str (default None) - column passed through
+    to the output as is
+    :param proba, bool (default False) - whether to predict
+    class probabilities as well
+
+    :rtype Iterator[ScoredChunk], predictions for each chunk
+    """
+    if workers < 1:
+        error_message = f"Invalid number of workers: {workers}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    if workers == 1:
+        pipeline = load_pipeline(artifact)
+        log.info(msg=f"Loaded pipeline: {pipeline}")
+        for features in chunks:
+            ids = _passthrough(features, id_column)
+            yield _score(pipeline, features, proba)._replace(ids=ids)
+        return
+
+    log.info(msg=f"Scoring in {workers} worker processes")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_load_worker_pipeline,
+        initargs=(artifact,),
+    ) as executor:
+        pending = deque()
+        for features in chunks:
+            ids = _passthrough(features, id_column)
+            future = executor.submit(_score_chunk, features, proba)
+            pending.append((future, ids))
+            if len(pending) >= 2 * workers:
+                future, ids = pending.popleft()
+                yield future.result()._replace(ids=ids)
+        while pending:
+            future, ids = pending.popleft()
+            yield future.result()._replace(ids=ids)
+
+
+def _passthrough(features: pd.DataFrame, id_column: Optional[str]):
+    if id_column is None:
+        return None
+    if id_column not in features.columns:
+        error_message = f"Id column missing: {id_column}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    return features[id_column].to_numpy()
+
+
+def _score(pipeline: Any, features: pd.DataFrame, proba: bool):
+    return ScoredChunk(
+        prediction=pipeline.predict(features),
+        proba=pipeline.predict_proba(features) if proba else None,
+        classes=getattr(pipeline, "classes_", None),
+    )
+
+
+def _load_worker_pipeline(artifact: str) -> None:
+    global _worker_pipeline
+    _worker_pipeline = load_pipeline(artifact)
+
+
+def _score_chunk(features: pd.DataFrame, proba: bool) -> ScoredChunk:
+    return _score(_worker_pipeline, features, proba)
@@ -0,0 +1,101 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from itertools import product
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+import logging
+
+from ..features.prepared import PreparedData
+from ..settings.params import EstimatorConfig
+from .classifier import make_estimator
+from .utils import get_metrics
+
+
+log = logging.getLogger(__name__)
+
+# prepared data shared by the tasks of a worker process
+_worker_data: Optional[PreparedData] = None
+
+
+def expand_grid(grid: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Expands the sweep grid into the list of candidates: each grid item
+    has `model_type` and `model_params`, mapping parameter names
+    to the lists of values, every combination of these is a candidate
+
+    :param grid, List[Dict] - grid items
+
+    :rtype List[Dict], candidates with `model_type` and `model_params`
+    """
+    candidates = []
+    for item in grid:
+        names = list(item.get("model_params", {}))
+        values = [item["model_params"][name] for name in names]
+        candidates += [
+            dict(
+                model_type=item["model_type"],
+                model_params=dict(zip(names, combination)),
+            )
+            for combination in product(*values)
+        ]
+    return candidates
+
+
+def run_sweep(
+    prepared: PreparedData,
+    base: EstimatorConfig,
+    candidates: List[Dict[str, Any]],
+    workers: int = 1,
+) -> List[Dict[str, Any]]:
+    """
+    Fits an estimator for each candidate on the same prepared data
+    and evaluates it on the validation part. Fits are run in a pool
+    of `workers` processes, the data is passed to each worker once
+
+    :param prepared, PreparedData - preprocessed train/validation data
+    :param base, EstimatorConfig - settings shared by the candidates
+    :param candidates, List[Dict] - `model_type` and `model_params`
+    overriding those of `base`, see `expand_grid`
+    :param workers, int (default 1) - number of processes
+
+    :rtype List[Dict], candidates with metrics and fit time,
+    in the order of `candidates`
+    """
+    if workers < 1:
+        error_message = f"Invalid number of workers: {workers}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    configs = [replace(base, **candidate) for candidate in candidates]
+    log.info(msg=f"Fitting {len(configs)} candidates in {workers} workers")
+    if workers == 1:
+        _share_data(prepared)
+        return [_evaluate(config) for config in configs]
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_share_data, initargs=(prepared,)
+    ) as executor:
+        return list(executor.map(_evaluate, configs))
+
+
+def _share_data(prepared: PreparedData) -> None:
+    global _worker_data
+    _worker_data = prepared
+
+
+def _evaluate(config: EstimatorConfig) -> Dict[str, Any]:
+    data = _worker_data
+    started = perf_counter()
+    model = make_estimator(data.train_features, data.train_target, config)
+    fit_time = perf_counter() - started
+
+    report = get_metrics(
+        data.val_target, model.predict(data.val_features), config
+    )
+    log.debug(msg=f"{config.model_type} {config.model_params}: {report}")
+    return dict(
+        model_type=config.model_type,
+        model_params=config.model_params,
+        fit_time=fit_time,
+        **report.__dict__,
+    )
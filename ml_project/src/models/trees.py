@@ -0,0 +1,316 @@
+from dataclasses import dataclass
+from typing import Any, List, Tuple
+import logging
+
+import numpy as np
+import sklearn
+from sklearn.dummy import DummyClassifier
+from sklearn.ensemble import (
+    GradientBoostingClassifier,
+    HistGradientBoostingClassifier,
+    RandomForestClassifier,
+)
+from sklearn.utils.fixes import parse_version
+
+
+log = logging.getLogger(__name__)
+
+# boosting compilers read private attributes of fitted estimators
+# (`_raw_predict_init`, `_baseline_prediction`, `_predictors`
+# and the loss), which are checked for these versions
+SKLEARN_VERSION = parse_version(sklearn.__version__)
+SUPPORTED_VERSIONS = (parse_version("1.0"), parse_version("1.4"))
+
+# rows are traversed in blocks to bound the memory
+# used by (rows x trees) arrays of node indices
+BLOCK_SIZE = 4096
+
+
+@dataclass
+class TreeEnsemble:
+    """
+    All trees of a fitted ensemble packed into contiguous node arrays.
+
+    Trees are traversed for a whole batch at once (one vectorized step
+    per tree level), leaves of a tree point to themselves. Leaf values
+    are accumulated in the same order and with the same floating point
+    operations as in scikit-learn, thus predictions are identical
+
+    Each tree adds its `value` rows of width `value.shape[1]`
+    to the output columns starting at `targets[tree]`
+    """
+
+    feature: np.ndarray
+    threshold: np.ndarray
+    missing_left: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    value: np.ndarray
+    roots: np.ndarray
+    targets: np.ndarray
+    depth: int
+    dtype: type
+    baseline: np.ndarray
+    classes: np.ndarray
+    average: bool = False
+    loss: Any = None
+    transposed: bool = False
+
+    @property
+    def classes_(self) -> np.ndarray:
+        return self.classes
+
+    def fit(self, X, y=None) -> "TreeEnsemble":
+        """
+        Compiled ensemble is inference-only: the method exists since
+        `Pipeline` requires its last step to implement `fit`,
+        refit the original estimator and compile it again instead
+
+        :raises TypeError
+        """
+        raise TypeError("Compiled ensemble can not be refit")
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """
+        Leaf indices for each row and each tree, (n_samples, n_trees)
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        rows = np.arange(X.shape[0])[:, np.newaxis]
+        nodes = np.tile(self.roots, (X.shape[0], 1))
+
+        for _ in range(self.depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = np.where(
+                np.isnan(x),
+                self.missing_left[nodes],
+                x <= self.threshold[nodes],
+            )
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def raw_predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=self.dtype)
+        blocks = np.split(X, range(BLOCK_SIZE, len(X), BLOCK_SIZE))
+        return np.concatenate([self._raw_predict_block(b) for b in blocks])
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        raw = self.raw_predict(X)
+        if self.loss is None:
+            return raw
+        if hasattr(self.loss, "_raw_prediction_to_proba"):
+            return self.loss._raw_prediction_to_proba(raw)
+        return self.loss.predict_proba(raw.T if self.transposed else raw)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if hasattr(self.loss, "_raw_prediction_to_decision"):
+            raw = self.raw_predict(X)
+            encoded = self.loss._raw_prediction_to_decision(raw)
+        else:
+            encoded = np.argmax(self.predict_proba(X), axis=1)
+        return self.classes.take(encoded, axis=0)
+
+    def _raw_predict_block(self, X: np.ndarray) -> np.ndarray:
+        values = self.value[self.apply(X)]
+        width = self.value.shape[1]
+        output = np.empty((len(X), len(self.baseline)))
+
+        for target in np.unique(self.targets):
+            trees = np.flatnonzero(self.targets == target)
+            columns = slice(target, target + width)
+            # `accumulate` sums strictly left to right (unlike `sum`),
+            # which matches the order trees are added in by scikit-learn
+            terms = np.concatenate(
+                (
+                    np.broadcast_to(
+                        self.baseline[columns], (len(X), 1, width)
+                    ),
+                    values[:, trees],
+                ),
+                axis=1,
+            )
+            output[:, columns] = np.add.accumulate(terms, axis=1)[:, -1]
+
+        if self.average:
+            output /= len(self.roots)
+        return output
+
+
+def compile_ensemble(estimator: Any) -> TreeEnsemble:
+    """
+    Packs trees of a fitted ensemble into `TreeEnsemble`.
+    Supports `RandomForestClassifier`, `GradientBoostingClassifier`
+    (with the default init) and `HistGradientBoostingClassifier`
+    (without categorical splits), raises `ValueError` otherwise
+
+    :param estimator - fitted ensemble
+
+    :rtype TreeEnsemble
+    """
+    log.debug(msg=f"Compiling {type(estimator)}")
+    if isinstance(estimator, RandomForestClassifier):
+        return _compile_forest(estimator)
+    if isinstance(estimator, GradientBoostingClassifier):
+        _check_version(estimator)
+        return _compile_boosting(estimator)
+    if isinstance(estimator, HistGradientBoostingClassifier):
+        _check_version(estimator)
+        return _compile_hist_boosting(estimator)
+
+    error_message = f"Can not compile estimator: {type(estimator)}"
+    log.error(msg=error_message)
+    raise ValueError(error_message)
+
+
+def _check_version(estimator: Any) -> None:
+    lowest, highest = SUPPORTED_VERSIONS
+    if lowest <= SKLEARN_VERSION < highest:
+        return
+    error_message = (
+        f"Can not compile {type(estimator)} "
+        f"with scikit-learn {sklearn.__version__}"
+    )
+    log.error(msg=error_message)
+    raise ValueError(error_message)
+
+
+def _compile_forest(estimator: RandomForestClassifier) -> TreeEnsemble:
+    if estimator.n_outputs_ != 1:
+        raise ValueError("Multi-output forests are not supported")
+
+    def leaf_proba(tree) -> np.ndarray:
+        proba = tree.tree_.value[:, 0, : estimator.n_classes_].copy()
+        normalizer = proba.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        proba /= normalizer
+        return proba
+
+    trees = [
+        (*_tree_nodes(tree.tree_), leaf_proba(tree))
+        for tree in estimator.estimators_
+    ]
+    return _pack(
+        trees,
+        targets=[0] * len(trees),
+        dtype=np.float32,
+        baseline=np.zeros(estimator.n_classes_),
+        classes=estimator.classes_,
+        average=True,
+    )
+
+
+def _compile_boosting(estimator: GradientBoostingClassifier) -> TreeEnsemble:
+    init = estimator.init_
+    if not (init == "zero" or isinstance(init, DummyClassifier)):
+        raise ValueError("Only default init estimator is supported")
+
+    # initial raw predictions of the prior do not depend on features
+    dummy = np.zeros((1, estimator.n_features_in_), dtype=np.float32)
+    baseline = estimator._raw_predict_init(dummy)[0]
+
+    trees, targets = [], []
+    for stage in estimator.estimators_:
+        for k, tree in enumerate(stage):
+            # same `scale * value` product as in `predict_stages`
+            value = tree.tree_.value[:, 0, :1]
+            leaf_value = estimator.learning_rate * value
+            trees.append((*_tree_nodes(tree.tree_), leaf_value))
+            targets.append(k)
+
+    return _pack(
+        trees,
+        targets=targets,
+        dtype=np.float32,
+        baseline=baseline,
+        classes=estimator.classes_,
+        # `loss_` was renamed to `_loss` in scikit-learn 1.1
+        loss=getattr(estimator, "_loss", None) or estimator.loss_,
+    )
+
+
+def _compile_hist_boosting(
+    estimator: HistGradientBoostingClassifier,
+) -> TreeEnsemble:
+    trees, targets = [], []
+    for predictors in estimator._predictors:
+        for k, predictor in enumerate(predictors):
+            nodes = predictor.nodes
+            if nodes["is_categorical"].any():
+                raise ValueError("Categorical splits are not supported")
+            is_leaf = nodes["is_leaf"].astype(bool)
+            trees.append(
+                (
+                    nodes["feature_idx"],
+                    nodes["num_threshold"],
+                    nodes["missing_go_to_left"].astype(bool),
+                    nodes["left"],
+                    nodes["right"],
+                    is_leaf,
+                    int(nodes["depth"].max()),
+                    nodes["value"][:, np.newaxis],
+                )
+            )
+            targets.append(k)
+
+    # before scikit-learn 1.1, raw predictions (thus inputs of the loss)
+    # are laid out as (n_trees_per_iteration, rows)
+    transposed = SKLEARN_VERSION < parse_version("1.1")
+
+    return _pack(
+        trees,
+        targets=targets,
+        dtype=np.float64,
+        baseline=np.ravel(estimator._baseline_prediction),
+        classes=estimator.classes_,
+        loss=estimator._loss,
+        transposed=transposed,
+    )
+
+
+def _tree_nodes(tree: Any) -> Tuple:
+    is_leaf = tree.children_left == -1
+    missing_left = getattr(tree, "missing_go_to_left", None)
+    if missing_left is None:
+        missing_left = np.zeros(tree.node_count, dtype=bool)
+    return (
+        tree.feature,
+        tree.threshold,
+        np.asarray(missing_left, dtype=bool),
+        tree.children_left,
+        tree.children_right,
+        is_leaf,
+        tree.max_depth,
+    )
+
+
+def _pack(trees: List[Tuple], targets: List[int], **kwargs) -> TreeEnsemble:
+    feature, threshold, missing_left = [], [], []
+    left, right, value = [], [], []
+    roots, offset, depth = [], 0, 0
+
+    for tree_feature, tree_threshold, tree_missing, *rest in trees:
+        tree_left, tree_right, is_leaf, tree_depth, tree_value = rest
+        nodes = np.arange(len(is_leaf))
+        # leaves loop to themselves, so that every row can
+        # make the same number of steps down the ensemble
+        feature.append(np.where(is_leaf, 0, tree_feature))
+        threshold.append(np.where(is_leaf, 0.0, tree_threshold))
+        missing_left.append(tree_missing)
+        left.append(np.where(is_leaf, nodes, tree_left) + offset)
+        right.append(np.where(is_leaf, nodes, tree_right) + offset)
+        value.append(tree_value)
+        roots.append(offset)
+        offset += len(is_leaf)
+        depth = max(depth, tree_depth)
+
+    return TreeEnsemble(
+        feature=np.concatenate(feature).astype(np.intp),
+        threshold=np.concatenate(threshold).astype(np.float64),
+        missing_left=np.concatenate(missing_left),
+        left=np.concatenate(left).astype(np.intp),
+        right=np.concatenate(right).astype(np.intp),
+        value=np.ascontiguousarray(np.concatenate(value), dtype=np.float64),
+        roots=np.array(roots, dtype=np.intp),
+        targets=np.array(targets, dtype=np.intp),
+        depth=depth,
+        **kwargs,
+    )
@@ -0,0 +1,273 @@
+from abc import ABC, abstractmethod
+from os import remove
+from os.path import isfile, splitext
+from typing import Any, Dict, NamedTuple, Optional
+import json
+import logging
+import struct
+
+import numpy as np
+import pandas as pd
+
+
+log = logging.getLogger(__name__)
+
+
+class ScoredChunk(NamedTuple):
+    """
+    Predictions for a chunk of features, with optional class
+    probabilities (columns ordered as `classes`) and passthrough ids
+    """
+
+    prediction: np.ndarray
+    proba: Optional[np.ndarray] = None
+    classes: Optional[np.ndarray] = None
+    ids: Optional[np.ndarray] = None
+
+
+class PredictionWriter(ABC):
+    """
+    Base class for the writers appending predictions to the output
+    file chunk by chunk. Rows are written as `id_column` (if ids are
+    given), `prediction` and `proba_<class>` for each class (if
+    probabilities are given). Should be used as a context manager,
+    incomplete output is removed if the block fails
+
+    :param path, str - output file path
+    :param id_column, str (default None) - name of the id column
+    """
+
+    def __init__(self, path: str, id_column: Optional[str] = None) -> None:
+        self.path = path
+        self.id_column = id_column or "id"
+        self.written = 0
+
+    def __enter__(self) -> "PredictionWriter":
+        log.debug(msg=f"Streaming predictions to {self.path}")
+        self._open()
+        return self
+
+    def write(self, chunk: ScoredChunk) -> None:
+        if not len(chunk.prediction):
+            return
+        self._write(chunk)
+        self.written += len(chunk.prediction)
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        self._close(complete=exc_type is None)
+        if exc_type is not None:
+            # incomplete output should not be mistaken for a valid one
+            remove(self.path) if isfile(self.path) else None
+            log.error(msg=f"Streaming failed, removed {self.path}")
+            return
+        log.debug(msg=f"Predictions saved: {self.written} items")
+
+    def columns(self, chunk: ScoredChunk) -> Dict[str, np.ndarray]:
+        columns = {}
+        if chunk.ids is not None:
+            columns[self.id_column] = chunk.ids
+        columns["prediction"] = chunk.prediction
+        if chunk.proba is not None:
+            columns.update(
+                (f"proba_{label}", chunk.proba[:, i])
+                for i, label in enumerate(chunk.classes)
+            )
+        return columns
+
+    @abstractmethod
+    def _open(self) -> None:
+        pass
+
+    @abstractmethod
+    def _write(self, chunk: ScoredChunk) -> None:
+        pass
+
+    @abstractmethod
+    def _close(self, complete: bool) -> None:
+        pass
+
+
+class JsonWriter(PredictionWriter):
+    """
+    Writes a JSON array of labels, or of records if ids
+    or probabilities are present
+    """
+
+    def _open(self) -> None:
+        self._file = open(self.path, "w+")
+        self._file.write("[")
+
+    def _write(self, chunk: ScoredChunk) -> None:
+        if chunk.ids is None and chunk.proba is None:
+            items = json.dumps(chunk.prediction.tolist())[1:-1]
+        else:
+            frame = pd.DataFrame(self.columns(chunk))
+            records = frame.to_json(orient="records", double_precision=15)
+            items = records[1:-1]
+        self._file.write(", " + items if self.written else items)
+
+    def _close(self, complete: bool) -> None:
+        if complete:
+            self._file.write("]")
+        self._file.close()
+
+
+class CsvWriter(PredictionWriter):
+    def _open(self) -> None:
+        self._file = open(self.path, "w+", newline="")
+
+    def _write(self, chunk: ScoredChunk) -> None:
+        frame = pd.DataFrame(self.columns(chunk))
+        frame.to_csv(self._file, header=not self.written, index=False)
+
+    def _close(self, complete: bool) -> None:
+        if complete and not self.written:
+            self._file.write("prediction\n")
+        self._file.close()
+
+
+class NpyWriter(PredictionWriter):
+    """
+    Writes `.npy` array of labels, or a structured array if ids
+    or probabilities are present. Row count is not known in advance,
+    so space for the header is reserved and filled in on close.
+    Labels are stored with the width of the longest class name,
+    so `classes` are required for string labels; ids should be numeric
+    """
+
+    def _open(self) -> None:
+        self._file = open(self.path, "wb+")
+        self._dtype: Optional[np.dtype] = None
+
+    def _write(self, chunk: ScoredChunk) -> None:
+        columns = self.columns(chunk)
+        if self._dtype is None:
+            self._dtype = self._make_dtype(chunk, columns)
+            # shape of the largest possible array has the longest header
+            self._header_size = len(npy_header(self._dtype, 2**63))
+            self._file.write(b"\0" * self._header_size)
+
+        if self._dtype.names is None:
+            records = np.asarray(chunk.prediction, dtype=self._dtype)
+        else:
+            records = np.empty(len(chunk.prediction), dtype=self._dtype)
+            for name, values in columns.items():
+                records[name] = values
+        self._file.write(records.tobytes())
+
+    def _close(self, complete: bool) -> None:
+        if complete:
+            if self._dtype is None:
+                self._file.write(npy_header(np.dtype(np.float64), 0))
+            else:
+                self._file.seek(0)
+                self._file.write(
+                    npy_header(self._dtype, self.written, self._header_size)
+                )
+        self._file.close()
+
+    def _make_dtype(self, chunk: ScoredChunk, columns: Dict) -> np.dtype:
+        labels = chunk.prediction
+        if chunk.classes is not None:
+            labels = chunk.classes
+        elif labels.dtype.kind in "OSU":
+            # width taken from the first chunk would truncate the labels
+            error_message = "Classes are required to write string labels"
+            log.error(msg=error_message)
+            raise ValueError(error_message)
+        if labels.dtype == object:
+            # fixed width unicode instead of Python objects
+            labels = np.asarray(labels.tolist())
+        if chunk.ids is None and chunk.proba is None:
+            return labels.dtype
+
+        if chunk.ids is not None and chunk.ids.dtype.kind not in "biuf":
+            error_message = "Only numeric ids can be written to .npy"
+            log.error(msg=error_message)
+            raise ValueError(error_message)
+
+        fields = {name: values.dtype for name, values in columns.items()}
+        fields["prediction"] = labels.dtype
+        return np.dtype(list(fields.items()))
+
+
+class ParquetWriter(PredictionWriter):
+    """
+    Writes a Parquet file, one row group per chunk.
+    Requires `pyarrow` to be installed
+    """
+
+    def __init__(self, path: str, id_column: Optional[str] = None) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            log.error(msg="pyarrow is required to write .parquet files")
+            raise e
+        super().__init__(path, id_column)
+        self._pa, self._pq = pyarrow, pyarrow.parquet
+
+    def _open(self) -> None:
+        self._writer: Optional[Any] = None
+
+    def _write(self, chunk: ScoredChunk) -> None:
+        table = self._pa.Table.from_pydict(self.columns(chunk))
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+
+    def _close(self, complete: bool) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        elif complete:
+            empty = self._pa.table({"prediction": self._pa.array([])})
+            self._pq.write_table(empty, self.path)
+
+
+WRITERS = {
+    ".json": JsonWriter,
+    ".csv": CsvWriter,
+    ".npy": NpyWriter,
+    ".parquet": ParquetWriter,
+}
+
+
+def make_writer(
+    path: str, id_column: Optional[str] = None
+) -> PredictionWriter:
+    """
+    Instantiates the prediction writer for the extension of `path`
+    (see `WRITERS`)
+
+    :param path, str - output file path
+    :param id_column, str (default None) - name of the id column
+
+    :rtype PredictionWriter
+    """
+    _, extension = splitext(path)
+    if extension not in WRITERS:
+        error_message = f"Unsupported output format: {extension}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    return WRITERS[extension](path, id_column)
+
+
+def npy_header(dtype: np.dtype, rows: int, size: int = 0) -> bytes:
+    """
+    `.npy` (version 1.0) header of a 1D array padded
+    with spaces to `size` bytes or to the multiple of 64
+    """
+    header = repr(
+        {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": (rows,),
+        }
+    ).encode("latin1")
+    prefix = np.lib.format.magic(1, 0)
+    # magic string, header length and the trailing newline
+    used = len(prefix) + 2 + len(header) + 1
+    size = size or -(-used // 64) * 64
+    padding = b" " * (size - used)
+    length = struct.pack("<H", size - len(prefix) - 2)
+    return prefix + length + header + padding + b"\n"
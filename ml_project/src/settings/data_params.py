@@ -9,11 +9,18 @@ class DatasetConfig:
     dataset_dir: str
     dataset_filename: str
     download: bool = False
+    download_segments: int = 1
+    checksum: Optional[str] = None
     column_names: List[str] = field(
         default_factory=lambda: DEFAULT_COLUMN_NAMES
     )
     random_state: int = 42
     header: Optional[int] = None
+    float_dtype: str = "float64"
+    cache_dir: Optional[str] = None
+    cache_format: str = "parquet"
+    prepared_cache_max_size: int = 1 << 32
+    chunk_size: Optional[int] = None
 
 
 @dataclass
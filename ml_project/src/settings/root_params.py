@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 from .data_params import DatasetConfig, SplitConfig
 from .features_params import FeaturesConfig
@@ -27,3 +28,7 @@ class InfConfig:
     artifact: str
     input_features: str
     output_target: str
+    chunk_size: Optional[int] = None
+    workers: int = 1
+    id_column: Optional[str] = None
+    probabilities: bool = False
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 @dataclass
@@ -11,3 +11,5 @@ class EstimatorConfig:
     metrics_path: str
     model_params: Dict[str, Any]
     random_state: int = field(default=42)
+    compiled_artifact_path: Optional[str] = None
+    epochs: int = 5
@@ -1,14 +1,26 @@
 from typing import Tuple
 from os import mkdir, remove, walk
-from os.path import isfile, isdir, join
-from requests import ConnectionError
+from os.path import getsize, isfile, isdir, join
+from glob import glob
+from requests import ConnectionError, Timeout
+
+import hashlib
 
 import pytest
+import numpy as np
 import pandas as pd
 
-from src.data.datautils import download_file, create_dataset, read_dataset
-from src.settings.params import DatasetConfig
-from testing.utils import online, TMP_DIR_NAME
+from src.data.datautils import (
+    RETRIABLE_ERRORS,
+    download_file,
+    create_dataset,
+    read_dataset,
+    read_inference_chunks,
+)
+from src.models.utils import dump_prediction
+from src.models.writers import PredictionWriter, ScoredChunk, make_writer
+from src.settings.params import DatasetConfig, FeaturesConfig
+from testing.utils import online, serve, TMP_DIR_NAME
 
 
 def setup_module(module):
@@ -69,6 +81,103 @@ def test_download_file(downloadable_links):
             assert isinstance(e, ConnectionError)
 
 
+@pytest.fixture
+def payload() -> bytes:
+    return bytes(range(256)) * 4099
+
+
+@pytest.mark.parametrize("segments", [1, 4])
+@pytest.mark.parametrize("ranges", [True, False])
+def test_download_file_local(payload, segments, ranges):
+    filename = f"{TMP_DIR_NAME}/local-download.csv"
+    remove(filename) if isfile(filename) else None
+    checksum = hashlib.sha256(payload).hexdigest()
+
+    with serve(payload, ranges=ranges) as stats:
+        download_file(
+            stats["url"], filename, checksum=checksum, segments=segments
+        )
+    with open(filename, "rb") as f:
+        assert f.read() == payload
+    assert not isfile(f"{filename}.part")
+    assert stats["requests"] == (segments if ranges else 1)
+
+
+@pytest.mark.parametrize("segments", [1, 3])
+def test_download_file_resume(payload, segments, mocker):
+    filename = f"{TMP_DIR_NAME}/resumed-download.csv"
+    remove(filename) if isfile(filename) else None
+    sleep = mocker.patch("src.data.datautils.sleep")
+
+    # the connection breaks halfway, the rest is requested with a range
+    with serve(payload, fail_after=len(payload) // 5) as stats:
+        download_file(
+            stats["url"],
+            filename,
+            checksum=f"md5:{hashlib.md5(payload).hexdigest()}",
+            segments=segments,
+            chunk_size=4096,
+        )
+    with open(filename, "rb") as f:
+        assert f.read() == payload
+    # the last chunk received before the failure may be lost
+    assert stats["sent"] < len(payload) + 4096 * segments
+    assert stats["requests"] == segments + 1
+    sleep.assert_called_once_with(0.5)
+
+    # partial file left by the previous run is resumed
+    remove(filename)
+    with serve(payload, fail_after=1000) as stats:
+        with pytest.raises(RETRIABLE_ERRORS):
+            download_file(stats["url"], filename, retries=0)
+    sent = getsize(f"{filename}.part")
+    with serve(payload) as stats:
+        download_file(stats["url"], filename)
+    assert stats["sent"] == len(payload) - sent
+    assert not isfile(f"{filename}.part.json")
+
+    # partial file of a file changed since is not spliced
+    changed = payload[::-1]
+    remove(filename)
+    with serve(payload, fail_after=1000) as stats:
+        with pytest.raises(RETRIABLE_ERRORS):
+            download_file(stats["url"], filename, retries=0)
+    with serve(changed) as stats:
+        download_file(stats["url"], filename)
+    with open(filename, "rb") as f:
+        assert f.read() == changed
+    assert stats["sent"] == len(changed)
+
+    # complete partial file is checked against the remote size
+    for extra in (b"", b"stale"):
+        remove(filename)
+        with serve(payload, fail_after=1000) as stats:
+            with pytest.raises(RETRIABLE_ERRORS):
+                download_file(stats["url"], filename, retries=0)
+        with open(f"{filename}.part", "r+b") as f:
+            f.seek(0)
+            f.write(payload + extra)
+        with serve(payload) as stats:
+            download_file(stats["url"], filename)
+        with open(filename, "rb") as f:
+            assert f.read() == payload
+        assert stats.get("sent", 0) == (len(payload) if extra else 0)
+
+    # file with a wrong checksum is discarded
+    remove(filename)
+    with serve(payload) as stats:
+        with pytest.raises(ValueError):
+            download_file(stats["url"], filename, checksum="0" * 64)
+    assert not isfile(filename) and not isfile(f"{filename}.part")
+
+    # retries back off exponentially
+    sleep.reset_mock()
+    mocker.patch("src.data.datautils._fetch_range", side_effect=Timeout)
+    with pytest.raises(Timeout):
+        download_file("http://localhost/data.csv", filename, retries=3)
+    assert [c.args for c in sleep.call_args_list] == [(0.5,), (1,), (2,)]
+
+
 @pytest.fixture
 def valid_ds_conf(downloadable_links: Tuple[str]) -> DatasetConfig:
     return DatasetConfig(
@@ -115,3 +224,171 @@ def test_read_dataset(valid_ds_conf):
     assert isinstance(dataset, pd.DataFrame)
     assert dataset.shape[0] > 50
     assert dataset.columns.tolist() == valid_ds_conf.column_names
+
+
+@pytest.mark.parametrize("cache_format", ["parquet", "feather"])
+def test_read_dataset_cache(cache_format, mocker):
+    pytest.importorskip("pyarrow")
+    columns = ["id", "diag", "size", "kind"]
+    data = pd.DataFrame(
+        dict(
+            id=[1, 2, 3],
+            diag=["M", "B", "M"],
+            size=[0.5, None, 2.0],
+            kind=["a", "b", None],
+        )
+    )
+    data.to_csv(f"{TMP_DIR_NAME}/typed.csv", header=False, index=False)
+    cfg = DatasetConfig(
+        source_url="",
+        dataset_dir=TMP_DIR_NAME,
+        dataset_filename="typed.csv",
+        column_names=columns,
+        float_dtype="float32",
+        cache_dir=f"{TMP_DIR_NAME}/cache-{cache_format}",
+        cache_format=cache_format,
+    )
+    features = FeaturesConfig(
+        target="diag", numeric_features=["size"], categorical_features=["kind"]
+    )
+
+    parsed = read_dataset(cfg, features)
+    assert parsed["size"].dtype == "float32"
+    assert parsed["kind"].dtype == "category"
+    assert parsed["id"].dtype == "int64"
+
+    # the second read is served from cache
+    read_csv = mocker.spy(pd, "read_csv")
+    cached = read_dataset(cfg, features)
+    assert read_csv.call_count == 0
+    pd.testing.assert_frame_equal(cached, parsed)
+
+    # other schema is cached separately
+    cfg.float_dtype = "float64"
+    assert read_dataset(cfg, features)["size"].dtype == "float64"
+    assert read_csv.call_count == 1
+
+    # as well as changed contents
+    data.iloc[:2].to_csv(
+        f"{TMP_DIR_NAME}/typed.csv", header=False, index=False
+    )
+    assert len(read_dataset(cfg, features)) == 2
+    assert read_csv.call_count == 2
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 7, 100])
+def test_stream_inference_data(chunk_size):
+    source = f"{TMP_DIR_NAME}/inference-features.csv"
+    data = pd.DataFrame(dict(a=np.arange(30), b=np.linspace(0, 1, 30)))
+    data.to_csv(source, index=False)
+
+    chunks = list(read_inference_chunks(source, chunk_size))
+    assert len(chunks) == (-(-len(data) // chunk_size) if chunk_size else 1)
+    pd.testing.assert_frame_equal(pd.concat(chunks), data)
+
+    # streamed output is identical to the one dumped at once
+    whole, streamed = f"{TMP_DIR_NAME}/whole.json", f"{TMP_DIR_NAME}/s.json"
+    labels = np.where(data.a % 3, "M", "B")
+    dump_prediction(labels, whole)
+    with make_writer(streamed) as writer:
+        for chunk in chunks:
+            writer.write(ScoredChunk(prediction=labels[chunk.index]))
+    assert writer.written == len(data)
+    with open(whole) as expected, open(streamed) as actual:
+        assert expected.read() == actual.read()
+
+    with pytest.raises(ValueError):
+        next(read_inference_chunks(source, -1))
+
+
+def read_output(path: str) -> pd.DataFrame:
+    if path.endswith(".json"):
+        return pd.read_json(path, orient="records")
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    if path.endswith(".npy"):
+        return pd.DataFrame(np.load(path))
+    return pd.read_parquet(path)
+
+
+@pytest.mark.parametrize("extension", [".json", ".csv", ".npy", ".parquet"])
+def test_prediction_writers(extension):
+    if extension == ".parquet":
+        pytest.importorskip("pyarrow")
+    path = f"{TMP_DIR_NAME}/predictions{extension}"
+    classes = np.array(["B", "M"], dtype=object)
+    proba = np.linspace(0, 1, 10)
+    chunk = ScoredChunk(
+        prediction=classes[(proba > 0.5).astype(int)],
+        proba=np.column_stack((1 - proba, proba)),
+        classes=classes,
+        ids=np.arange(10) + 100,
+    )
+
+    with make_writer(path, id_column="row") as writer:
+        writer.write(chunk)
+        writer.write(chunk._replace(prediction=chunk.prediction[:0]))
+        writer.write(chunk)
+    assert writer.written == 20
+
+    output = read_output(path)
+    columns = ["row", "prediction", "proba_B", "proba_M"]
+    assert output.columns.tolist() == columns
+    assert output["row"].tolist() == chunk.ids.tolist() * 2
+    assert output["prediction"].tolist() == chunk.prediction.tolist() * 2
+    assert np.allclose(output["proba_M"], np.tile(proba, 2))
+
+    # labels only
+    if extension != ".csv":
+        dump_prediction(chunk.prediction, path)
+        labels = np.load(path) if extension == ".npy" else read_output(path)
+        assert np.asarray(labels).ravel().tolist() == chunk.prediction.tolist()
+
+    # failed output is not left behind
+    with pytest.raises(RuntimeError):
+        with make_writer(path) as writer:
+            writer.write(chunk)
+            raise RuntimeError()
+    assert not isfile(path)
+
+    with pytest.raises(ValueError):
+        make_writer(f"{TMP_DIR_NAME}/predictions.txt")
+
+
+def test_npy_writer_labels():
+    path = f"{TMP_DIR_NAME}/labels.npy"
+    classes = np.array(["B", "Malignant"], dtype=object)
+    # the first chunk has only the short labels
+    chunks = [classes[[0, 0]], classes[[1, 0]]]
+    with make_writer(path) as writer:
+        for labels in chunks:
+            writer.write(ScoredChunk(prediction=labels, classes=classes))
+    assert np.load(path).tolist() == ["B", "B", "Malignant", "B"]
+
+    with pytest.raises(ValueError):
+        with make_writer(path) as writer:
+            writer.write(ScoredChunk(prediction=chunks[0]))
+    assert not isfile(path)
+
+    with pytest.raises(TypeError):
+        PredictionWriter(path)
+
+
+def test_download_segments_changed(payload):
+    filename = f"{TMP_DIR_NAME}/changed-download.csv"
+    remove(filename) if isfile(filename) else None
+
+    # some of the segments are complete, the rest are not
+    with serve(payload, fail_after=1000) as stats:
+        with pytest.raises(RETRIABLE_ERRORS):
+            download_file(stats["url"], filename, segments=3, retries=0)
+    assert len(glob(f"{filename}.part.*.json")) == 3
+
+    # remote file of the same size is fetched anew as a whole
+    changed = payload[::-1]
+    with serve(changed) as stats:
+        download_file(stats["url"], filename, segments=3)
+    with open(filename, "rb") as f:
+        assert f.read() == changed
+    assert stats["sent"] == len(changed)
+    assert not glob(f"{filename}.part*")
@@ -6,6 +6,7 @@ from pytest_mock import MockerFixture
 
 import numpy as np
 import pandas as pd
+from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 
 from src.features.extract import (
@@ -21,6 +22,13 @@ from src.features.process import (
     # preprocessing_pipeline,
 )
 
+from src.features import cache
+from src.features import (
+    BUNDLE_VERSION,
+    Preprocessor,
+    bundle_metadata,
+    read_bundle,
+)
 from src.settings.params import FeaturesConfig
 
 
@@ -207,3 +215,122 @@ def test_numeric_features_transform(
     exception_raised = exc_info.value
     assert isinstance(exception_raised, ValueError)
     mock_logger.assert_called_once()
+
+
+def test_preprocessor_cache(
+    sample_data: pd.DataFrame,
+    features_conf: FeaturesConfig,
+    mocker: MockerFixture,
+    tmp_path,
+):
+    features_conf.cache_dir = str(tmp_path)
+    fitted = Preprocessor(features_conf).fit(sample_data)
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # same config and data: the fitted state is loaded
+    fit = mocker.spy(ColumnTransformer, "fit")
+    cached = Preprocessor(features_conf).fit(sample_data)
+    fit.assert_not_called()
+    assert np.array_equal(
+        cached.transform(sample_data), fitted.transform(sample_data)
+    )
+
+    # other data, other config
+    Preprocessor(features_conf).fit(sample_data.iloc[1:])
+    features_conf.scaler_type = "robust"
+    Preprocessor(features_conf).fit(sample_data)
+    assert fit.call_count == 2
+    assert len(list(tmp_path.iterdir())) == 3
+
+    # least recently used entries are evicted by size
+    features_conf.cache_max_size = 1
+    features_conf.scaler_type = "standard"
+    Preprocessor(features_conf).fit(sample_data.iloc[2:])
+    assert len(list(tmp_path.iterdir())) == 0
+
+
+def test_transformer_cache_concurrent_eviction(tmp_path, mocker):
+    transformers = cache.TransformerCache(str(tmp_path), max_size=1 << 20)
+    for key in ("a" * 64, "b" * 64):
+        transformers.store(key, key)
+
+    # entries vanish as another run evicts them
+    listed = ["transformer.gone.pkl", *cache.listdir(str(tmp_path))]
+    mocker.patch.object(cache, "listdir", return_value=listed)
+    remove = mocker.patch.object(
+        cache, "remove", side_effect=FileNotFoundError
+    )
+    transformers.max_size = 0
+    transformers.evict()
+    assert remove.call_count == 2
+    assert transformers.load("a" * 64) == "a" * 64
+
+
+@pytest.mark.parametrize(
+    "kernel, solver",
+    [
+        ("linear", "auto"),
+        ("linear", "full"),
+        ("linear", "randomized"),
+        ("linear", "incremental"),
+        ("rbf", "nystroem"),
+    ],
+)
+def test_pca_solvers(kernel: str, solver: str):
+    # low rank data with distinct principal directions
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=(200, 3)) * [5, 3, 1] @ rng.normal(size=(3, 20))
+    data += rng.normal(scale=0.01, size=data.shape)
+
+    expected = numeric_features_transform(
+        "standard", 3, kernel, "kernel"
+    ).fit_transform(data)
+    transformed = numeric_features_transform(
+        "standard",
+        3,
+        kernel,
+        solver,
+        pca_batch_size=50,
+        nystroem_components=len(data),
+        random_state=0,
+    ).fit_transform(data)
+
+    # components are defined up to the sign
+    signs = np.sign((transformed * expected).sum(axis=0))
+    assert np.allclose(transformed * signs, expected, atol=1e-6)
+
+
+def test_pca_solvers_invalid(mocker: MockerFixture):
+    mock_logger = mocker.stub()
+    mocker.patch("src.features.process.log.error", mock_logger)
+
+    with pytest.raises(ValueError):
+        numeric_features_transform("standard", 3, "linear", "non-existing")
+    with pytest.raises(ValueError):
+        numeric_features_transform("standard", 3, "rbf", "incremental")
+    assert mock_logger.call_count == 2
+
+
+def test_bundle_metadata(features_conf: FeaturesConfig):
+    rng = np.random.default_rng(3)
+    data = pd.DataFrame(rng.normal(size=(100, 3)), columns=["a", "b", "c"])
+    data.iloc[::7, 1] = np.nan
+    data["kind"] = "x"
+    features_conf.numeric_features = ["a", "b", "c"]
+    features_conf.categorical_features = ["kind"]
+
+    # statistics merged over chunks match those of the whole data
+    chunks = [data.iloc[:30], data.iloc[30:31], data.iloc[31:]]
+    bundle = bundle_metadata(chunks, features_conf)
+    assert bundle["schema"]["categorical_columns"] == ["kind"]
+    assert np.allclose(bundle["stats"]["mean"], data[["a", "b", "c"]].mean())
+    assert np.allclose(
+        bundle["stats"]["std"], data[["a", "b", "c"]].std(ddof=0)
+    )
+
+    schema, mean, std = read_bundle(bundle)
+    assert schema == bundle["schema"]
+    with pytest.raises(ValueError):
+        read_bundle(dict(bundle, bundle=BUNDLE_VERSION + 1))
+    with pytest.raises(ValueError):
+        read_bundle(dict(bundle, stats=dict(mean=[0], std=[1])))
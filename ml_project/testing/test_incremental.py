@@ -0,0 +1,152 @@
+from os import mkdir, remove, walk
+from os.path import isdir, join
+
+import pytest
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import IncrementalPCA
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from src.features import (
+    Preprocessor,
+    fit_incremental_preprocessor,
+    stream_split,
+)
+from src.models import compile_pipeline, train_incremental
+from src.settings.params import (
+    DatasetConfig,
+    EstimatorConfig,
+    FeaturesConfig,
+    SplitConfig,
+)
+from testing.utils import TMP_DIR_NAME
+
+
+COLUMNS = ["diag", "a", "b", "c", "d", "kind"]
+
+
+def setup_module(module):
+    mkdir(TMP_DIR_NAME) if not isdir(TMP_DIR_NAME) else None
+
+
+def teardown_module(module):
+    for root, _, files in walk(TMP_DIR_NAME):
+        for file in files:
+            remove(join(root, file))
+
+
+@pytest.fixture
+def configs():
+    rng = np.random.default_rng(seed=5)
+    features = rng.normal(size=(500, 4))
+    features[rng.uniform(size=features.shape) < 0.05] = np.nan
+    kind = rng.choice(["x", "y", "z"], size=500, p=[0.6, 0.3, 0.1])
+    data = pd.DataFrame(features, columns=COLUMNS[1:5])
+    data["kind"] = kind
+    data.insert(
+        0, "diag", np.where(np.nan_to_num(features[:, 0]) > 0, "M", "B")
+    )
+    data.to_csv(f"{TMP_DIR_NAME}/stream.csv", header=False, index=False)
+
+    dataset = DatasetConfig(
+        source_url="",
+        dataset_dir=TMP_DIR_NAME,
+        dataset_filename="stream.csv",
+        column_names=COLUMNS,
+        chunk_size=37,
+    )
+    splitter = SplitConfig(validation=0.2, random_state=3)
+    feature = FeaturesConfig(
+        target="diag",
+        numeric_features=COLUMNS[1:5],
+        categorical_features=["kind"],
+    )
+    estimator = EstimatorConfig(
+        model_type="SGD",
+        pos_label="M",
+        neg_label="B",
+        model_artifact_path="",
+        metrics_path="",
+        model_params=dict(random_state=0),
+        epochs=10,
+    )
+    return dataset, splitter, feature, estimator
+
+
+def test_stream_split(configs):
+    dataset, splitter, feature, _ = configs
+    train = list(stream_split(dataset, splitter, feature))
+    validation = list(stream_split(dataset, splitter, feature, True))
+    assert sum(len(y) for _, y in train + validation) == 500
+    assert 60 < sum(len(y) for _, y in validation) < 140
+
+    # every read yields the same rows
+    again = list(stream_split(dataset, splitter, feature))
+    assert all(a.equals(b) for (a, _), (b, _) in zip(train, again))
+
+
+def test_fit_incremental_preprocessor(configs):
+    dataset, splitter, feature, _ = configs
+    chunks = [x for x, _ in stream_split(dataset, splitter, feature)]
+    incremental = fit_incremental_preprocessor(feature, lambda: chunks)
+
+    # matches the preprocessor fitted on the whole train part at once
+    train = pd.concat(chunks)
+    expected = Preprocessor(feature).fit(train)
+    assert np.allclose(
+        incremental.transform(train), expected.transform(train)
+    )
+
+
+def test_fit_incremental_preprocessor_pca(configs):
+    dataset, splitter, feature, _ = configs
+    feature.PCA_components = 2
+    chunks = [x for x, _ in stream_split(dataset, splitter, feature)]
+    preprocessor = fit_incremental_preprocessor(feature, lambda: chunks)
+
+    num_pipeline = preprocessor.transformer.named_transformers_["pipeline-1"]
+    assert isinstance(num_pipeline[-1][-1], IncrementalPCA)
+    assert preprocessor.transform(chunks[0]).shape == (len(chunks[0]), 5)
+
+
+@pytest.mark.parametrize(
+    "features",
+    [
+        dict(scaler_type="robust"),
+        dict(numeric_imputer_strategy="median"),
+        dict(PCA_components=2, PCA_kernel="rbf"),
+    ],
+)
+def test_fit_incremental_preprocessor_invalid(configs, features):
+    dataset, splitter, feature, _ = configs
+    for name, value in features.items():
+        setattr(feature, name, value)
+    with pytest.raises(ValueError):
+        fit_incremental_preprocessor(
+            feature,
+            lambda: (x for x, _ in stream_split(dataset, splitter, feature)),
+        )
+
+
+def test_train_incremental(configs):
+    dataset, splitter, feature, estimator = configs
+    pipeline, metrics, bundle = train_incremental(
+        dataset, splitter, feature, estimator
+    )
+    train = pd.concat([x for x, _ in stream_split(dataset, splitter, feature)])
+    assert bundle["schema"]["columns"] == COLUMNS[1:]
+    assert np.allclose(bundle["stats"]["std"], train[COLUMNS[1:5]].std(ddof=0))
+    assert isinstance(pipeline, Pipeline)
+    assert isinstance(pipeline[-1], SGDClassifier)
+    assert metrics.accuracy > 0.8
+
+    features, _ = next(stream_split(dataset, splitter, feature, True))
+    assert np.allclose(
+        compile_pipeline(pipeline).predict_proba(features),
+        pipeline.predict_proba(features),
+    )
+
+    estimator.model_type = "RandomForest"
+    with pytest.raises(ValueError):
+        train_incremental(dataset, splitter, feature, estimator)
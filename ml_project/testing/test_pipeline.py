@@ -0,0 +1,283 @@
+from itertools import chain
+from typing import List
+
+import pytest
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import (
+    GradientBoostingClassifier,
+    HistGradientBoostingClassifier,
+    RandomForestClassifier,
+)
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.utils.fixes import parse_version
+
+from src.features import Preprocessor
+from src.models import (
+    dump_pipeline,
+    load_artifact,
+    load_pipeline,
+    make_inference_pipeline,
+    read_header,
+)
+from src.models.parallel import predict_chunks
+from src.models.compiled import CompiledPipeline, compile_pipeline
+from src.models import trees
+from src.models.trees import TreeEnsemble
+from src.settings.params import FeaturesConfig
+
+
+@pytest.fixture
+def num_columns() -> List[str]:
+    return [f"num-feature-{i}" for i in range(6)]
+
+
+@pytest.fixture
+def cat_columns() -> List[str]:
+    return [f"cat-feature-{i}" for i in range(2)]
+
+
+@pytest.fixture
+def training_data(num_columns: List[str], cat_columns: List[str]):
+    rng = np.random.default_rng(seed=7)
+    items = 300
+
+    numeric = rng.normal(size=(items, len(num_columns)))
+    numeric[rng.uniform(size=numeric.shape) < 0.05] = np.nan
+    categorical = rng.choice(["a", "b", "c"], size=(items, len(cat_columns)))
+
+    data = pd.DataFrame(
+        dict(
+            chain(
+                zip(num_columns, numeric.T),
+                zip(cat_columns, categorical.T),
+            )
+        )
+    )
+    target = np.where(
+        np.nan_to_num(numeric[:, 0]) + (categorical[:, 0] == "a") > 0.3,
+        "M",
+        "B",
+    )
+    return data, pd.Series(target)
+
+
+def fit_pipeline(cfg: FeaturesConfig, data, target, model):
+    preprocessor = Preprocessor(cfg)
+    model.fit(preprocessor.fit_transform(data), target)
+    return make_inference_pipeline(preprocessor, model)
+
+
+@pytest.mark.parametrize(
+    "features",
+    [
+        dict(),
+        dict(scaler_type="robust"),
+        dict(PCA_components=3, PCA_kernel="linear"),
+        dict(PCA_components=3, PCA_solver="kernel"),
+        dict(PCA_components=3, PCA_solver="incremental", PCA_batch_size=50),
+    ],
+)
+def test_compile_pipeline(features, training_data, num_columns, cat_columns):
+    data, target = training_data
+    cfg = FeaturesConfig(
+        target="target",
+        numeric_features=num_columns,
+        categorical_features=cat_columns,
+        **features,
+    )
+    pipeline = fit_pipeline(cfg, data, target, LogisticRegression())
+    compiled = compile_pipeline(pipeline)
+    assert isinstance(compiled, CompiledPipeline)
+
+    # unseen category and missing values are handled
+    # in the same way as in the original pipeline
+    test_data = data.copy()
+    test_data.loc[:10, cat_columns[1]] = "unseen"
+    test_data.loc[5:15, cat_columns[0]] = np.nan
+
+    assert np.array_equal(
+        compiled.predict(test_data), pipeline.predict(test_data)
+    )
+    assert np.allclose(
+        compiled.predict_proba(test_data), pipeline.predict_proba(test_data)
+    )
+
+
+def test_compile_unsupported(training_data, num_columns, cat_columns):
+    data, target = training_data
+    cfg = FeaturesConfig(
+        target="target",
+        numeric_features=num_columns,
+        categorical_features=cat_columns,
+        PCA_components=2,
+        PCA_kernel="rbf",
+    )
+    pipeline = fit_pipeline(cfg, data, target, LogisticRegression())
+    with pytest.raises(ValueError):
+        compile_pipeline(pipeline)
+
+    with pytest.raises(ValueError):
+        compile_pipeline(pipeline.steps[-1][1])
+
+
+@pytest.mark.parametrize(
+    "model",
+    [
+        RandomForestClassifier(n_estimators=20, max_depth=5, random_state=7),
+        GradientBoostingClassifier(n_estimators=20, random_state=7),
+        HistGradientBoostingClassifier(max_iter=20, random_state=7),
+    ],
+)
+def test_compile_ensemble(model, training_data, num_columns, cat_columns):
+    data, target = training_data
+    cfg = FeaturesConfig(
+        target="target",
+        numeric_features=num_columns,
+        categorical_features=cat_columns,
+    )
+    pipeline = fit_pipeline(cfg, data, target, model)
+    compiled = compile_pipeline(pipeline)
+    assert isinstance(compiled, Pipeline)
+    assert isinstance(compiled.steps[-1][1], TreeEnsemble)
+
+    # trees are traversed and accumulated exactly as in scikit-learn
+    assert np.array_equal(compiled.predict(data), pipeline.predict(data))
+    assert np.array_equal(
+        compiled.predict_proba(data), pipeline.predict_proba(data)
+    )
+
+
+@pytest.mark.parametrize(
+    "model",
+    [
+        GradientBoostingClassifier(n_estimators=10, random_state=7),
+        HistGradientBoostingClassifier(max_iter=10, random_state=7),
+    ],
+)
+def test_compile_multiclass(model, training_data, num_columns, cat_columns):
+    data, _ = training_data
+    cfg = FeaturesConfig(
+        target="target",
+        numeric_features=num_columns,
+        categorical_features=cat_columns,
+    )
+    # one tree per class and iteration
+    target = pd.Series(data[cat_columns[0]].to_numpy())
+    pipeline = fit_pipeline(cfg, data, target, model)
+    compiled = compile_pipeline(pipeline)
+
+    assert np.array_equal(compiled.predict(data), pipeline.predict(data))
+    assert np.array_equal(
+        compiled.predict_proba(data), pipeline.predict_proba(data)
+    )
+
+    ensemble = compiled.steps[-1][1]
+    with pytest.raises(TypeError):
+        ensemble.fit(data, target)
+
+
+def test_compile_unsupported_version(
+    monkeypatch, training_data, num_columns, cat_columns
+):
+    data, target = training_data
+    cfg = FeaturesConfig(
+        target="target",
+        numeric_features=num_columns,
+        categorical_features=cat_columns,
+    )
+    model = GradientBoostingClassifier(n_estimators=5, random_state=7)
+    pipeline = fit_pipeline(cfg, data, target, model)
+
+    # private attributes of boosting are not relied on in other versions
+    monkeypatch.setattr(trees, "SKLEARN_VERSION", parse_version("0.24"))
+    with pytest.raises(ValueError):
+        compile_pipeline(pipeline)
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+@pytest.mark.parametrize(
+    "model",
+    [
+        LogisticRegression(),
+        RandomForestClassifier(n_estimators=20, random_state=7),
+    ],
+)
+def test_mapped_artifact(
+    model, compiled, tmp_path, training_data, num_columns, cat_columns
+):
+    data, target = training_data
+    cfg = FeaturesConfig(
+        target="target",
+        numeric_features=num_columns,
+        categorical_features=cat_columns,
+    )
+    pipeline = fit_pipeline(cfg, data, target, model)
+    pipeline = compile_pipeline(pipeline) if compiled else pipeline
+    artifact = str(tmp_path / "artifact.mlpkg")
+    dump_pipeline(pipeline, artifact, metadata=dict(columns=num_columns))
+
+    header = read_header(artifact)
+    assert header["metadata"] == dict(columns=num_columns)
+    assert set(header["versions"]) == {"python", "numpy", "pandas", "sklearn"}
+
+    loaded = load_pipeline(artifact)
+    assert np.array_equal(loaded.predict(data), pipeline.predict(data))
+    assert np.array_equal(
+        loaded.predict_proba(data), pipeline.predict_proba(data)
+    )
+    if compiled and isinstance(model, RandomForestClassifier):
+        # large arrays are read-only views of the mapped file
+        ensemble = loaded.steps[-1][1]
+        assert not ensemble.feature.flags.writeable
+        assert ensemble.feature.ctypes.data % 64 == 0
+
+    # content hash is checked on demand
+    with open(artifact, "r+b") as f:
+        f.seek(-1, 2)
+        last = f.read(1)
+        f.seek(-1, 2)
+        f.write(bytes([last[0] ^ 0xFF]))
+    with pytest.raises(ValueError):
+        load_artifact(artifact, verify=True)
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_predict_chunks(
+    workers, tmp_path, training_data, num_columns, cat_columns
+):
+    data, target = training_data
+    cfg = FeaturesConfig(
+        target="target",
+        numeric_features=num_columns,
+        categorical_features=cat_columns,
+    )
+    pipeline = fit_pipeline(cfg, data, target, LogisticRegression())
+    artifact = str(tmp_path / "artifact.pkl")
+    dump_pipeline(pipeline, artifact)
+
+    # chunks outnumber the in-flight window, yet order is preserved
+    chunks = [c for _, c in data.groupby(np.arange(len(data)) // 17)]
+    scored = list(predict_chunks(artifact, chunks, workers, proba=True))
+    assert len(scored) == len(chunks)
+    assert np.array_equal(
+        np.concatenate([s.prediction for s in scored]),
+        pipeline.predict(data),
+    )
+    assert np.allclose(
+        np.concatenate([s.proba for s in scored]),
+        pipeline.predict_proba(data),
+    )
+    assert np.array_equal(scored[0].classes, pipeline.classes_)
+
+    data["id"] = np.arange(len(data)) * 10
+    chunks = [c for _, c in data.groupby(np.arange(len(data)) // 17)]
+    scored = list(predict_chunks(artifact, chunks, workers, "id"))
+    assert np.array_equal(
+        np.concatenate([s.ids for s in scored]), data["id"].to_numpy()
+    )
+
+    with pytest.raises(ValueError):
+        next(predict_chunks(artifact, chunks, 0))
@@ -0,0 +1,135 @@
+from os import mkdir, remove, walk
+from glob import glob
+from os.path import isdir, join
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from src.data import datautils
+from src.features import prepare_data
+from src.features import prepared as prepared_module
+from src.features.cache import library_versions
+from src.models import expand_grid, run_sweep
+from src.settings.params import (
+    DatasetConfig,
+    EstimatorConfig,
+    FeaturesConfig,
+    SplitConfig,
+)
+from testing.utils import TMP_DIR_NAME
+
+
+def setup_module(module):
+    mkdir(TMP_DIR_NAME) if not isdir(TMP_DIR_NAME) else None
+
+
+def teardown_module(module):
+    for root, _, files in walk(TMP_DIR_NAME):
+        for file in files:
+            remove(join(root, file))
+
+
+@pytest.fixture
+def configs():
+    rng = np.random.default_rng(seed=11)
+    features = rng.normal(size=(120, 3))
+    data = pd.DataFrame(features, columns=["a", "b", "c"])
+    data.insert(0, "diag", np.where(features[:, 0] > 0, "M", "B"))
+    data.to_csv(f"{TMP_DIR_NAME}/sweep.csv", header=False, index=False)
+
+    dataset = DatasetConfig(
+        source_url="",
+        dataset_dir=TMP_DIR_NAME,
+        dataset_filename="sweep.csv",
+        column_names=["diag", "a", "b", "c"],
+    )
+    splitter = SplitConfig(validation=0.25, random_state=3)
+    feature = FeaturesConfig(target="diag", numeric_features=["a", "b", "c"])
+    return dataset, splitter, feature
+
+
+def test_expand_grid():
+    grid = [
+        dict(model_type="LogReg", model_params=dict(C=[0.1, 1], tol=[1e-4])),
+        dict(model_type="RandomForest", model_params=dict(max_depth=[2])),
+    ]
+    assert expand_grid(grid) == [
+        dict(model_type="LogReg", model_params=dict(C=0.1, tol=1e-4)),
+        dict(model_type="LogReg", model_params=dict(C=1, tol=1e-4)),
+        dict(model_type="RandomForest", model_params=dict(max_depth=2)),
+    ]
+
+
+def test_prepare_data_cache(configs, mocker):
+    dataset, splitter, feature = configs
+    cache_dir = f"{TMP_DIR_NAME}/prepared"
+    prepared = prepare_data(dataset, splitter, feature, cache_dir)
+    assert prepared.train_features.shape == (90, 3)
+    assert prepared.val_features.shape == (30, 3)
+
+    # same configs are served from cache without refitting
+    fit = mocker.spy(type(prepared.preprocessor), "fit")
+    cached = prepare_data(dataset, splitter, feature, cache_dir)
+    assert fit.call_count == 0
+    assert np.array_equal(cached.val_features, prepared.val_features)
+
+    splitter.validation = 0.5
+    prepare_data(dataset, splitter, feature, cache_dir)
+    assert fit.call_count == 1
+
+    # pickles of other library versions are not reused
+    versions = dict(library_versions(), sklearn="0.0")
+    mocker.patch.object(
+        prepared_module, "library_versions", return_value=versions
+    )
+    prepare_data(dataset, splitter, feature, cache_dir)
+    assert fit.call_count == 2
+    mocker.stopall()
+
+    # the dataset file is hashed once for all the caches
+    dataset.cache_dir = f"{TMP_DIR_NAME}/dataset"
+    feature.cache_dir = f"{TMP_DIR_NAME}/transformers"
+    digests = [
+        mocker.spy(prepared_module, "file_digest"),
+        mocker.spy(datautils, "file_digest"),
+    ]
+    hashed = mocker.spy(pd.util, "hash_pandas_object")
+    splitter.validation = 0.3
+    prepare_data(dataset, splitter, feature, cache_dir)
+    assert sum(digest.call_count for digest in digests) == 1
+    hashed.assert_not_called()
+
+    # least recently used entries are evicted by size
+    splitter.validation = 0.4
+    prepare_data(dataset, splitter, feature, cache_dir, cache_max_size=1)
+    assert not glob(f"{cache_dir}/prepared/prepared.*.pkl")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_sweep(configs, workers):
+    prepared = prepare_data(*configs)
+    base = EstimatorConfig(
+        model_type="LogReg",
+        pos_label="M",
+        neg_label="B",
+        model_artifact_path="",
+        metrics_path="",
+        model_params={},
+    )
+    candidates = expand_grid(
+        [
+            dict(model_type="LogReg", model_params=dict(C=[0.01, 1.0])),
+            dict(model_type="RandomForest", model_params=dict(max_depth=[3])),
+        ]
+    )
+    results = run_sweep(prepared, base, candidates, workers)
+    assert [r["model_type"] for r in results] == [
+        "LogReg",
+        "LogReg",
+        "RandomForest",
+    ]
+    assert all(0 <= r["f1"] <= 1 and r["fit_time"] > 0 for r in results)
+
+    with pytest.raises(ValueError):
+        run_sweep(prepared, base, candidates, 0)
@@ -1,3 +1,10 @@
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Dict, Iterator
+import hashlib
+import re
+
 import requests
 
 TMP_DIR_NAME = "tmp/"
@@ -12,3 +19,83 @@ def inet_avaliable(timeout: int = 1) -> bool:
 
 
 online = inet_avaliable()
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves `server.payload` supporting single byte ranges
+    and `If-Range` with its ETag.
+    The first response breaks after `server.fail_after` bytes
+    """
+
+    def do_HEAD(self) -> None:
+        self._respond(body=False)
+
+    def do_GET(self) -> None:
+        self._respond(body=True)
+
+    def _respond(self, body: bool) -> None:
+        payload, stats = self.server.payload, self.server.stats
+        start, end = 0, len(payload) - 1
+        etag = f'"{hashlib.md5(payload).hexdigest()}"'
+        requested = self.headers["Range"] or ""
+        if self.headers.get("If-Range", etag) != etag:
+            requested = ""
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", requested)
+        if match and self.server.ranges:
+            start = int(match[1])
+            end = int(match[2]) if match[2] else end
+            if start >= len(payload):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(payload)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{end}/{len(payload)}"
+            )
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        if self.server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if not body:
+            return
+
+        stats["requests"] = stats.get("requests", 0) + 1
+        content = payload[slice(start, end + 1)]
+        if self.server.fail_after is not None:
+            content = content[slice(self.server.fail_after)]
+            self.server.fail_after = None
+            self.close_connection = True
+        self.wfile.write(content)
+        stats["sent"] = stats.get("sent", 0) + len(content)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@contextmanager
+def serve(
+    payload: bytes, ranges: bool = True, fail_after: int = None
+) -> Iterator[Dict]:
+    """
+    Runs a local HTTP server in a background thread, yields its url
+    and the dict with the number of requests and bytes sent
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+    server.payload, server.ranges = payload, ranges
+    server.fail_after, server.stats = fail_after, {}
+    thread = Thread(
+        target=server.serve_forever, args=(0.05,), daemon=True
+    )
+    thread.start()
+    try:
+        host, port = server.server_address
+        server.stats["url"] = f"http://{host}:{port}/data.csv"
+        yield server.stats
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,51 @@
+import json
+import logging
+from os import getcwd
+
+import hydra
+from hydra.utils import instantiate
+from omegaconf import OmegaConf
+
+from src.data import create_dataset
+from src.features import prepare_data
+from src.models import expand_grid, run_sweep
+
+
+log = logging.getLogger(__name__)
+
+
+@hydra.main(config_path="./configs", config_name="tune")
+def main(cfg: OmegaConf) -> None:
+    log.info(msg="Hyperparameter sweep starting")
+    log.debug(msg=f"Original working dir: {hydra.utils.get_original_cwd()}")
+    log.debug(msg=f"Actual CWD: {getcwd()}")
+
+    dataset = instantiate(cfg.dataset)
+    splitter = instantiate(cfg.splitter)
+    feature = instantiate(cfg.feature)
+    estimator = instantiate(cfg.estimator)
+
+    # preprocessing is fitted once and shared by all the candidates
+    create_dataset(dataset)
+    prepared = prepare_data(
+        dataset,
+        splitter,
+        feature,
+        dataset.cache_dir,
+        dataset.prepared_cache_max_size,
+    )
+
+    grid = OmegaConf.to_container(cfg.grid, resolve=True)
+    results = run_sweep(prepared, estimator, expand_grid(grid), cfg.workers)
+    results.sort(key=lambda result: result[cfg.metric], reverse=True)
+
+    with open(cfg.results_path, "w+") as f:
+        json.dump(results, f, indent=2)
+    log.info(msg=f"Sweep results saved to {cfg.results_path}")
+    log.info(msg=f"Best candidate: {results[0]}")
+
+    log.info(msg="Hyperparameter sweep finished")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
 import logging
-from os import getenv, getpid
-from dataclasses import dataclass
+from os import getenv
+from dataclasses import dataclass, field
 
 from flask import Flask
 
 from dotenv import load_dotenv
 from click import secho
 
+from .logs import LazyQueueHandler, SamplingFilter, log_pipeline
+
 ENV_PATH = getenv("ENV_PATH")
 
 if ENV_PATH:
@@ -15,9 +17,9 @@ if ENV_PATH:
 else:
     secho("User-defined environment not set", fg="yellow")
 
-# bind logfile names to pid to
-# let multiple workers write into separate files
-LOGFILE = f'{getenv("LOGFILE", "server")}-{getpid()}.log'
+# logfile names are bound to pid (in the process which writes)
+# to let multiple workers write into separate files
+LOGFILE = getenv("LOGFILE", "server")
 
 
 @dataclass
@@ -29,11 +31,45 @@ class AppConfig:
     artifact_path: str
     table_schema_path: str
     feature_stats_path: str
+    prediction_cache_size: int - max rows in prediction cache, 0 disables
+    prediction_cache_ttl: float - cached prediction lifetime, seconds
+    batching_max_size: int - max rows in a micro-batch, 0 disables batching
+    batching_max_latency: float - max wait for a micro-batch to fill, ms
+    executor_workers: int - threads running the model in ASGI mode
+    executor_max_pending: int - max predictions submitted at once (ASGI)
+    fetch_timeout: float - connect/read timeout of remote resources, seconds
+    fetch_retries: int - max retries of a failed resource request
+    fetch_cache_dir: str - on-disk cache of remote resources, unset disables
+    log_sample_rate: float - fraction of requests with debug/info records
+    trace_exporter: str - span exporter (memory, stdout, `module:Factory`)
+    reload_interval: float - period of resource checks, seconds, 0 disables
+    admin_token: str - bearer token of admin endpoints, unset disables them
+    reload_state_path: str - file sharing reloaded locations among workers
+    max_content_length: int - max request body size, bytes, 0 disables
     """
 
     artifact_path: str = getenv("ARTIFACT", None)
     table_schema_path: str = getenv("TABLE_SCHEMA", None)
     feature_stats_path: str = getenv("STATS", None)
+    prediction_cache_size: int = int(getenv("PREDICTION_CACHE_SIZE", 4096))
+    prediction_cache_ttl: float = float(getenv("PREDICTION_CACHE_TTL", 300))
+    batching_max_size: int = int(getenv("BATCHING_MAX_SIZE", 0))
+    batching_max_latency: float = float(getenv("BATCHING_MAX_LATENCY", 5))
+    executor_workers: int = int(getenv("EXECUTOR_WORKERS", 4))
+    executor_max_pending: int = int(getenv("EXECUTOR_MAX_PENDING", 64))
+    fetch_timeout: float = float(getenv("FETCH_TIMEOUT", 10))
+    fetch_retries: int = int(getenv("FETCH_RETRIES", 3))
+    fetch_cache_dir: str = getenv("FETCH_CACHE_DIR", None)
+    reload_interval: float = float(getenv("RELOAD_INTERVAL", 0))
+    admin_token: str = getenv("ADMIN_TOKEN", None)
+    log_sample_rate: float = float(getenv("LOG_SAMPLE_RATE", 1))
+    trace_exporter: str = getenv("TRACE_EXPORTER", None)
+    max_content_length: int = int(getenv("MAX_CONTENT_LENGTH", 16 << 20))
+    # read once the config is created: `gunicorn.conf.py`
+    # sets the default after the module is imported
+    reload_state_path: str = field(
+        default_factory=lambda: getenv("RELOAD_STATE", None)
+    )
 
 
 def make_logger(name: str, logfile: str) -> logging.Logger:
@@ -43,20 +79,17 @@ def make_logger(name: str, logfile: str) -> logging.Logger:
         LOGLEVEL = getenv("LOG_LEVEL", "DEBUG")
         log.setLevel(getattr(logging, LOGLEVEL.upper()))
 
-        formatter = logging.Formatter(
-            "[%(asctime)s]::[%(levelname)s]::[%(name)s]::%(message)s",
-            "%D # %H:%M:%S",
+        # records are formatted and written by a background thread
+        pipeline = log_pipeline(
+            logfile if getenv("LOG_FILE", "False") == "True" else None,
+            stream=getenv("LOG_STREAM", "False") == "True",
+            json_format=getenv("LOG_FORMAT", "text") == "json",
+            maxsize=int(getenv("LOG_QUEUE_SIZE", 10000)),
         )
-
-        if getenv("LOG_FILE", "False") == "True":
-            file = logging.FileHandler(filename=f"{logfile}", encoding="utf-8")
-            file.setFormatter(formatter)
-            log.addHandler(file)
-
-        if getenv("LOG_STREAM", "False") == "True":
-            stream = logging.StreamHandler()
-            stream.setFormatter(formatter)
-            log.addHandler(stream)
+        if pipeline.enabled:
+            handler = LazyQueueHandler(pipeline)
+            handler.addFilter(SamplingFilter())
+            log.addHandler(handler)
 
     return log
 
@@ -75,3 +108,15 @@ def make_app(settings: AppConfig = AppConfig()) -> Flask:
     log.info(msg=f"Recieved application config: {settings}")
     app = application_factory(settings=settings)
     return app
+
+
+def make_asgi_app(settings: AppConfig = AppConfig()):
+    from .asgi import AsgiApplication
+
+    log.info(msg="ASGI application is in the oven")
+    app = AsgiApplication(
+        make_app(settings),
+        workers=settings.executor_workers,
+        max_pending=settings.executor_max_pending,
+    )
+    return app
@@ -0,0 +1,303 @@
+import asyncio
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+from urllib.parse import parse_qs
+
+from flask import Flask
+
+from . import default_logger
+from .logs import sample_request
+from .utils.metrics import exposition, observe_stage, track_request
+from .utils.tracing import REQUEST_ID_HEADER, start_trace
+
+log = default_logger(__name__)
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class AsgiApplication:
+    """
+    Minimal ASGI application serving `/health`, `/predict`,
+    `/predict/batch`, `/cache`, `/metrics` and `/admin/reload`
+    from an event loop. Request bodies larger than `MAX_CONTENT_LENGTH`
+    of the Flask application are answered with 413
+
+    Resources are collected by the regular startup routine of
+    the wrapped Flask application, validation and inference
+    (same helpers as in the WSGI app) are offloaded to a bounded
+    thread pool, so that idle keep-alive connections cost
+    no threads at all
+
+    :param flask_app - configured application instance
+    :param workers - number of threads running the model
+    :param max_pending - max number of predictions submitted
+    to the pool at once, the rest are waiting in the event loop
+    """
+
+    def __init__(
+        self, flask_app: Flask, workers: int, max_pending: int
+    ) -> None:
+        self.flask_app = flask_app
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="inference"
+        )
+        # asyncio primitives should be created inside the running loop
+        self._pending: Optional[asyncio.Semaphore] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+
+        # the decision is kept in the context of the task
+        # and copied into the threads handling the request
+        sample_request(self.flask_app.config["LOG_SAMPLE_RATE"])
+        route = scope["method"], scope["path"].rstrip("/")
+        log.debug("Request: %s", route)
+
+        if route == ("GET", "/health"):
+            return await self._health(send)
+        if route == ("GET", "/predict"):
+            with track_request("predict"), self._trace(
+                "predict_handler", scope, send
+            ) as send:
+                return await self._predict(scope, send)
+        if route == ("POST", "/predict/batch"):
+            with track_request("predict/batch"), self._trace(
+                "batch_predict_handler", scope, send
+            ) as send:
+                return await self._batch_predict(scope, receive, send)
+        if route == ("GET", "/cache"):
+            return await self._cache_stats(send)
+        if route == ("GET", "/metrics"):
+            body, content_type = exposition()
+            return await respond(send, 200, body, content_type)
+        if route == ("POST", "/admin/reload"):
+            return await self._reload(scope, receive, send)
+        not_found = b"<h1>Page not found</h1>"
+        return await respond(send, 404, not_found, "text/html")
+
+    @contextmanager
+    def _trace(self, name: str, scope: Scope, send: Send) -> Iterator[Send]:
+        # same as `traced_request` of the WSGI application
+        from .view.helper import request_id
+
+        headers = dict(scope.get("headers", ()))
+        header = headers.get(REQUEST_ID_HEADER.lower().encode(), b"")
+        rid = request_id(header.decode("latin-1"))
+        exporter = self.flask_app.config["TRACE_EXPORTER"]
+
+        async def send_with_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                header = REQUEST_ID_HEADER.lower().encode(), rid.encode()
+                message = dict(message, headers=[*message["headers"], header])
+            await send(message)
+
+        with start_trace(name, rid, exporter):
+            yield send_with_id
+
+    @property
+    def operating(self) -> bool:
+        return "HEALTHY" in self.flask_app.config
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                log.info(msg="ASGI application started")
+                self.flask_app.config["MODEL_RELOADER"].ensure_watcher()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                log.info(msg="Shutting down inference executor")
+                self.flask_app.config["MODEL_RELOADER"].stop()
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _health(self, send: Send) -> None:
+        log.debug(msg="Application status requested")
+        if self.operating:
+            return await respond(send, 200, b"Healthy")
+        return await respond(send, 400, b"Bad request")
+
+    async def _predict(self, scope: Scope, send: Send) -> None:
+        log.debug(msg="Prediction requested")
+        if not self.operating:
+            log.warning(msg="App is not set up correctly")
+            return await redirect(send, "/health")
+
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if "payload" not in query:
+            log.warning(msg="No payload in request")
+            return await respond_prediction(send, None)
+
+        try:
+            with observe_stage("parse"):
+                payload = json.loads(query["payload"][-1])
+        except json.JSONDecodeError:
+            log.warning(msg="Payload should be an encoded JSON string")
+            return await respond_prediction(send, None)
+
+        prediction = await self._run_prediction(payload)
+        await respond_prediction(send, prediction)
+
+    async def _cache_stats(self, send: Send) -> None:
+        log.debug(msg="Prediction cache stats requested")
+        cache = self.flask_app.config.get("PREDICTION_CACHE")
+        stats = dict(cache=None if cache is None else cache.stats())
+        body = json.dumps(stats, separators=(",", ":")).encode()
+        await respond(send, 200, body, "application/json")
+
+    async def _batch_predict(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        log.debug(msg="Batch prediction requested")
+        body = await self._read_body(scope, receive)
+        if body is None:
+            return await respond_too_large(send)
+        if not self.operating:
+            log.warning(msg="App is not set up correctly")
+            return await redirect(send, "/health")
+
+        try:
+            with observe_stage("parse"):
+                payload = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            log.warning(msg="Request body should be a JSON document")
+            return await respond_prediction(send, None)
+
+        prediction = await self._run_prediction(payload)
+        await respond_prediction(send, prediction)
+
+    async def _reload(self, scope: Scope, receive: Receive, send: Send):
+        log.info(msg="Resource reload requested")
+        body = await self._read_body(scope, receive)
+        if body is None:
+            return await respond_too_large(send)
+        headers = dict(scope.get("headers", ()))
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        try:
+            payload = json.loads(body) if body else None
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            payload = None
+
+        # resources are collected off the loop (and the inference pool),
+        # predictions are served with the old ones in the meantime
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        status, response = await loop.run_in_executor(
+            None, context.run, self._reload_in_context, authorization, payload
+        )
+        body = json.dumps(response, separators=(",", ":")).encode()
+        await respond(send, status, body, "application/json")
+
+    async def _read_body(
+        self, scope: Scope, receive: Receive
+    ) -> Optional[bytes]:
+        limit = self.flask_app.config.get("MAX_CONTENT_LENGTH")
+        headers = dict(scope.get("headers", ()))
+        length = headers.get(b"content-length", b"")
+        if limit is not None and length.isdigit() and int(length) > limit:
+            log.warning(msg=f"Request body of {int(length)} bytes rejected")
+            return None
+        return await read_body(receive, limit)
+
+    def _reload_in_context(
+        self, authorization: str, payload: Any
+    ) -> Tuple[int, Dict[str, Any]]:
+        from .view.helper import reload_resources
+
+        with self.flask_app.app_context():
+            return reload_resources(authorization, payload)
+
+    async def _run_prediction(self, payload: Any) -> Optional[List]:
+        if self._pending is None:
+            self._pending = asyncio.Semaphore(self.max_pending)
+
+        loop = asyncio.get_running_loop()
+        async with self._pending:
+            context = contextvars.copy_context()
+            prediction = await loop.run_in_executor(
+                self.executor, context.run, self._predict_in_context, payload
+            )
+        if prediction is None:
+            log.warning(msg="Seems like the input did not pass validation")
+        return prediction
+
+    def _predict_in_context(self, payload: Any) -> Optional[List]:
+        from .view.helper import predict_payload
+
+        with self.flask_app.app_context():
+            return predict_payload(payload)
+
+
+async def read_body(
+    receive: Receive, limit: Optional[int] = None
+) -> Optional[bytes]:
+    # `None` if the body is larger than `limit` bytes
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if limit is not None and size > limit:
+            log.warning(msg=f"Request body over {limit} bytes rejected")
+            return None
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def respond(
+    send: Send,
+    status: int,
+    body: bytes,
+    content_type: str = "text/plain",
+    headers: Tuple[Tuple[bytes, bytes], ...] = (),
+) -> None:
+    if "charset" not in content_type:
+        content_type = f"{content_type}; charset=utf-8"
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type.encode()),
+                (b"content-length", str(len(body)).encode()),
+                *headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def respond_prediction(send: Send, prediction: Optional[List]) -> None:
+    with observe_stage("serialize"):
+        body = json.dumps(dict(prediction=prediction), separators=(",", ":"))
+        body = body.encode()
+    await respond(send, 200, body, "application/json")
+
+
+async def respond_too_large(send: Send) -> None:
+    body = b"<h1>Request Entity Too Large</h1>"
+    await respond(send, 413, body, "text/html")
+
+
+async def redirect(send: Send, location: str) -> None:
+    await respond(send, 302, b"", headers=((b"location", location.encode()),))
@@ -0,0 +1,201 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+TEXT_FORMAT = "[%(asctime)s]::[%(levelname)s]::[%(name)s]::%(message)s"
+TEXT_DATEFMT = "%D # %H:%M:%S"
+
+# whether records of the current request are written,
+# records outside of requests (e.g. startup) always are
+request_sampled: ContextVar[bool] = ContextVar("request_sampled", default=True)
+
+
+def sample_request(rate: float) -> bool:
+    """
+    Decides whether the debug and info records of the current request
+    (thread or asyncio task) are written, warnings and errors
+    are written regardless
+
+    :param rate - fraction of requests to keep the records of
+
+    :rtype `bool`, whether the request is sampled
+    """
+    sampled = rate >= 1 or random.random() < rate
+    request_sampled.set(sampled)
+    return sampled
+
+
+class SamplingFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or request_sampled.get()
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as single-line JSON documents
+    (a structured alternative to `TEXT_FORMAT`)
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        document = dict(
+            time=self.formatTime(record),
+            level=record.levelname,
+            logger=record.name,
+            message=record.getMessage(),
+            pid=record.process,
+            thread=record.threadName,
+        )
+        if record.exc_info:
+            document["exception"] = self.formatException(record.exc_info)
+        return json.dumps(document, default=str)
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Puts records into the queue of `LogPipeline` as they are:
+    messages are formatted by the writer thread, so that arguments
+    of the records should not be modified after the logging call.
+    If the queue is full, records are dropped instead of blocking,
+    their number is reported by a warning queued along with
+    the next record which fits
+    """
+
+    def __init__(self, pipeline: "LogPipeline") -> None:
+        super().__init__(queue=None)
+        self.pipeline = pipeline
+        self.dropped = 0
+        self._reported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        records = self.pipeline.queue()
+        try:
+            if self.dropped > self._reported:
+                records.put_nowait(self._dropped_record(record.name))
+                self._reported = self.dropped
+            records.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _dropped_record(self, name: str) -> logging.LogRecord:
+        return logging.LogRecord(
+            name=name,
+            level=logging.WARNING,
+            pathname=__file__,
+            lineno=0,
+            msg="Dropped %d log records",
+            args=(self.dropped - self._reported,),
+            exc_info=None,
+        )
+
+
+class DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # waits for a free slot, so that the queued records are written
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    """
+    Writes log records from a background thread: logging calls only
+    put records into a bounded queue, the formatting and I/O happen
+    in the writer thread of `QueueListener`
+
+    The writer is started lazily in the process which logs first.
+    Neither threads nor locks held by them survive the fork
+    of gunicorn workers, thus a forked process starts its own writer
+    with a new queue and its own logfile (named after its pid)
+
+    :param logfile - logfile name prefix, `None` disables the file
+    :param stream - whether records are written to stderr
+    :param json_format - whether records are formatted as JSON
+    :param maxsize - max number of records waiting in the queue
+    """
+
+    def __init__(
+        self,
+        logfile: Optional[str],
+        stream: bool,
+        json_format: bool = False,
+        maxsize: int = 10000,
+    ) -> None:
+        self.logfile = logfile
+        self.stream = stream
+        self.json_format = json_format
+        self.maxsize = maxsize
+        self._queue: Optional[queue.Queue] = None
+        self._listener: Optional[DrainingQueueListener] = None
+        self._handlers: List[logging.Handler] = []
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def enabled(self) -> bool:
+        return self.logfile is not None or self.stream
+
+    def queue(self) -> queue.Queue:
+        if self._pid != os.getpid():
+            self._start()
+        return self._queue
+
+    def stop(self) -> None:
+        # waits for the queued records to be written
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                self._listener.stop()
+                for handler in self._handlers:
+                    handler.close()
+            self._listener, self._pid = None, None
+
+    def _after_fork(self) -> None:
+        # the lock might have been held by another thread
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            formatter = (
+                JsonFormatter()
+                if self.json_format
+                else logging.Formatter(TEXT_FORMAT, TEXT_DATEFMT)
+            )
+            self._handlers = []
+            if self.logfile is not None:
+                filename = f"{self.logfile}-{os.getpid()}.log"
+                self._handlers.append(
+                    logging.FileHandler(filename=filename, encoding="utf-8")
+                )
+            if self.stream:
+                self._handlers.append(logging.StreamHandler())
+            for handler in self._handlers:
+                handler.setFormatter(formatter)
+
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._listener = DrainingQueueListener(
+                self._queue, *self._handlers
+            )
+            self._listener.start()
+            self._pid = os.getpid()
+
+
+_pipelines: Dict[Optional[str], LogPipeline] = {}
+
+
+def log_pipeline(logfile: Optional[str], **kwargs) -> LogPipeline:
+    # loggers writing to the same file share the writer
+    if logfile not in _pipelines:
+        _pipelines[logfile] = LogPipeline(logfile, **kwargs)
+    return _pipelines[logfile]
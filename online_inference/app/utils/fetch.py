@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from validators import url
+
+from .. import default_logger
+
+log = default_logger(__name__)
+
+# transient failures worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class ResourceFetcher:
+    """
+    Fetches application resources over a single pooled session
+    with timeouts and bounded retries (exponential backoff).
+
+    With `cache_dir` set, remote resources are stored on disk along with
+    their `ETag`/`Last-Modified` and SHA-256. Subsequent fetches
+    revalidate the copy with a conditional request, and the copy
+    is served if the host is unreachable. Cached files whose hash
+    does not match are discarded
+
+    :param timeout - connect and read timeout, seconds
+    :param retries - max retries of a failed request
+    :param backoff - backoff factor between the retries, seconds
+    :param cache_dir - directory for cached resources, `None` disables it
+    :param pool_size - max connections kept per host
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10,
+        retries: int = 3,
+        backoff: float = 0.5,
+        cache_dir: Optional[str] = None,
+        pool_size: int = 4,
+    ) -> None:
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(("GET", "HEAD")),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, location: str) -> Union[str, bytes]:
+        """
+        Resolves the resource: filenames are returned as is, remote
+        resources are downloaded into the cache (their local filename
+        is returned) or into memory if the cache is disabled.
+        Raises `requests.RequestException` on failure
+
+        :param location - URL or filename
+
+        :rtype `str` filename or `bytes` content
+        """
+        if not url(location):
+            return location
+        if self.cache_dir is None:
+            log.debug(msg=f"Downloading {location}")
+            response = self._get(location)
+            return response.content
+        return self._fetch_cached(location)
+
+    def read(self, location: str) -> bytes:
+        resource = self.fetch(location)
+        if isinstance(resource, bytes):
+            return resource
+        with open(resource, "rb") as f:
+            return f.read()
+
+    def cached(self, location: str) -> Optional[str]:
+        """
+        Local filename of the resource without any request: filenames
+        are returned as is, remote resources if these are cached
+
+        :rtype `str` or `None` if the resource is not at hand
+        """
+        if not url(location):
+            return location
+        if self.cache_dir is None:
+            return
+        path = self._cache_path(location)
+        return path if os.path.isfile(path) else None
+
+    def fingerprint(self, location: str) -> Optional[str]:
+        """
+        Cheap version tag of the resource, changes along with
+        its content: modification time and size of local files,
+        `ETag` or `Last-Modified` of remote ones (`HEAD` request)
+
+        :param location - URL or filename
+
+        :rtype `str` or `None` if the resource is not accessible
+        """
+        try:
+            if not url(location):
+                stat = os.stat(location)
+                return f"{stat.st_mtime_ns}:{stat.st_size}"
+            response = self.session.head(
+                location, timeout=self.timeout, allow_redirects=True
+            )
+            response.raise_for_status()
+        except (OSError, requests.RequestException) as e:
+            log.warning(msg=f"Failed to check {location}: {e}")
+            return
+        headers = response.headers
+        return headers.get("ETag") or headers.get("Last-Modified")
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _get(
+        self, location: str, headers: Optional[Dict[str, str]] = None
+    ) -> requests.Response:
+        response = self.session.get(
+            location, headers=headers, timeout=self.timeout
+        )
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    def _cache_path(self, location: str) -> str:
+        key = hashlib.sha256(location.encode()).hexdigest()[:32]
+        return os.path.join(self.cache_dir, key)
+
+    def _fetch_cached(self, location: str) -> str:
+        path = self._cache_path(location)
+        meta = self._read_meta(path)
+
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = self._get(location, headers)
+        except requests.RequestException as e:
+            if not meta:
+                raise
+            log.warning(msg=f"Failed to revalidate {location}: {e}")
+            log.warning(msg="Serving cached copy")
+            return path
+
+        if response.status_code == 304:
+            log.debug(msg=f"Cached copy of {location} is up to date")
+            return path
+
+        log.debug(msg=f"Caching {location} at {path}")
+        content = response.content
+        meta = dict(
+            url=location,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            sha256=hashlib.sha256(content).hexdigest(),
+        )
+        with self._lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._write(path, content)
+            self._write(f"{path}.json", json.dumps(meta).encode())
+        return path
+
+    def _read_meta(self, path: str) -> Dict[str, str]:
+        try:
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+            with open(path, "rb") as f:
+                digest = _file_digest(f)
+        except (OSError, ValueError):
+            return {}
+        if digest != meta.get("sha256"):
+            log.warning(msg=f"Cached copy is corrupted, discarding {path}")
+            return {}
+        return meta
+
+    @staticmethod
+    def _write(path: str, content: bytes) -> None:
+        # readers never see partially written files
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(partial, "wb") as f:
+            f.write(content)
+        os.replace(partial, path)
+
+
+def _file_digest(f, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    for block in iter(lambda: f.read(block_size), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+_default_fetcher: Optional[ResourceFetcher] = None
+
+
+def default_fetcher() -> ResourceFetcher:
+    # shared by the loaders called without an explicit fetcher
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = ResourceFetcher()
+    return _default_fetcher
@@ -1,35 +1,88 @@
+import os
 import pickle
-from typing import Optional, Union, List, Any
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import requests
 import numpy as np
 import pandas as pd
 
 from sklearn.pipeline import Pipeline
-from validators import url
 
 from flask import current_app
 
+from src.models.artifact import (
+    ARTIFACT_MAGIC,
+    is_artifact,
+    load_with_header,
+    loads_artifact,
+)
+from src.models.compiled import CompiledPipeline
+
 from .. import default_logger
+from .fetch import ResourceFetcher, default_fetcher
+from .metrics import BATCH_ROWS, observe_stage
+from .resources import current_resources
 
 log = default_logger(__name__)
 
 
-def load_artifact(path: str) -> Optional[Pipeline]:
+def load_artifact(
+    path: str, fetcher: Optional[ResourceFetcher] = None
+) -> Optional[Pipeline]:
+    return load_bundle(path, fetcher)[0]
+
+
+def load_bundle(
+    path: str, fetcher: Optional[ResourceFetcher] = None
+) -> Tuple[Optional[Pipeline], Dict[str, Any]]:
+    """
+    Loads the model artifact along with the metadata from its header
+    in a single read. Artifacts in the memory-mappable format are told
+    from plain pickles (which have no metadata) by the magic bytes
+
+    :param path - artifact location, URL or filename
+    :param fetcher - `ResourceFetcher` for remote artifacts,
+    remote artifacts cached on disk are loaded from the cache
+
+    :rtype `tuple` of the model (`None` on error) and metadata
+    """
     log.debug(msg=f"Reading model artifact from {path}")
     try:
-        if url(path):
+        path = (fetcher or default_fetcher()).fetch(path)
+        if isinstance(path, bytes):
             log.debug(msg="Collecting pickle from specified URL")
-            with requests.get(path) as response:
-                response.raise_for_status()
-                model = pickle.loads(response.content)
-                return model
+            if path.startswith(ARTIFACT_MAGIC):
+                model, header = loads_artifact(path)
+                return model, header["metadata"]
+            model = pickle.loads(path)
+            return model, {}
+
+        if is_artifact(path):
+            log.debug(msg="Mapping model artifact from local filesystem")
+            model, header = load_with_header(path)
+            log.debug(msg="Artifact loaded")
+            return model, header["metadata"]
 
         log.debug(msg="Collecting model pickle from local filesystem")
         with open(path, "rb") as f:
             model = pickle.load(f)
             log.debug(msg="Artifact loaded")
-            return model
+            return model, {}
     except (
         FileNotFoundError,
         pickle.UnpicklingError,
@@ -41,16 +94,18 @@ def load_artifact(path: str) -> Optional[Pipeline]:
         log.error(msg="Failed to load model artifact")
         log.error(msg=f"{type(e)}")
         log.error(msg=f"{e}")
+        return None, {}
 
 
 def validate_artifact(artifact: Any) -> bool:
-    if not isinstance(artifact, Pipeline):
+    if not isinstance(artifact, (Pipeline, CompiledPipeline)):
         log.warning(msg="The model should be a Pipeline instance")
         log.warning(msg=f"Got {type(artifact)}")
         return False
     return True
 
 
+@observe_stage("predict")
 def make_prediction(
     features: Union[List, pd.DataFrame]
 ) -> Optional[np.ndarray]:
@@ -58,9 +113,216 @@ def make_prediction(
     if isinstance(features, list):
         log.debug(msg="Casting list to DataFrame")
         features = pd.DataFrame(features)
+
+    artifact = current_resources().artifact
+    dispatcher = current_app.config.get("BATCH_DISPATCHER")
     try:
-        return current_app.config["ARTIFACT"].predict(features)
+        if dispatcher is not None and len(features) < dispatcher.max_size:
+            log.debug(msg="Submitting features to batch dispatcher")
+            return dispatcher.predict(features, artifact)
+        return artifact.predict(features)
     except Exception as e:
         log.error(msg="Prediction aborted")
         log.error(msg=f"{type(e)}")
         log.error(msg=f"{e}")
+
+
+class PredictionCache:
+    """
+    Thread-safe in-process LRU cache with TTL for per-row predictions.
+    Entries are bound to the artifact instance they were computed
+    with: once a different artifact is passed, the cache is flushed
+
+    :param maxsize - max number of rows to keep
+    :param ttl - entry lifetime in seconds
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._items: OrderedDict = OrderedDict()
+        self._artifact = None
+        self._lock = threading.Lock()
+
+    def get(self, key: Optional[Hashable], artifact: Any) -> Optional[Any]:
+        with self._lock:
+            self._bind(artifact)
+            item = self._items.get(key) if key is not None else None
+            if item is not None and item[0] < self._clock():
+                del self._items[key]
+                item = None
+            if item is None:
+                self.misses += 1
+                return
+            self.hits += 1
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key: Optional[Hashable], value: Any, artifact: Any) -> None:
+        if key is None:
+            return
+        with self._lock:
+            self._bind(artifact)
+            self._items[key] = self._clock() + self.ttl, value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(
+                hits=self.hits,
+                misses=self.misses,
+                size=len(self._items),
+                maxsize=self.maxsize,
+            )
+
+    def _bind(self, artifact: Any) -> None:
+        # keep the reference (not just `id`) so that
+        # the identity can not be reused by another object
+        if artifact is not self._artifact:
+            log.info(msg="Model artifact changed, flushing prediction cache")
+            self._items.clear()
+            self._artifact = artifact
+
+
+class PendingPrediction(NamedTuple):
+    features: pd.DataFrame
+    artifact: Any
+    future: Future
+
+
+class BatchDispatcher:
+    """
+    Collects features submitted by concurrent requests and predicts
+    for them in a single batched `predict` call: a batch is sent
+    once it has `max_size` rows or the first request in it
+    has been waiting for `max_latency` seconds
+
+    The worker thread is started lazily in the process which
+    submits first (threads do not survive the fork of gunicorn workers).
+    Requests wait for the batch to fill and for the predict call at most,
+    failures of the worker are passed to the requests of the batch
+
+    :param max_size - max number of rows in a batch
+    :param max_latency - max time to wait for batch to fill, seconds
+    :param predict_timeout - max time to wait for the predict call, seconds
+    """
+
+    def __init__(
+        self, max_size: int, max_latency: float, predict_timeout: float = 10
+    ) -> None:
+        self.max_size = max_size
+        self.max_latency = max_latency
+        self.timeout = max_latency + predict_timeout
+        self._queue: queue.Queue = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def submit(self, features: pd.DataFrame, artifact: Any) -> Future:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put(PendingPrediction(features, artifact, future))
+        return future
+
+    def predict(self, features: pd.DataFrame, artifact: Any) -> np.ndarray:
+        future = self.submit(features, artifact)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # not predicted for if still in the queue
+            future.cancel()
+            raise
+
+    def _ensure_worker(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid() and self._worker.is_alive():
+                return
+            log.debug(msg="Starting batch dispatcher thread")
+            if self._pid != os.getpid():
+                # items queued before the fork are not waited for here
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._worker = threading.Thread(
+                target=self._run, args=(self._queue,), daemon=True
+            )
+            self._worker.start()
+
+    def _run(self, pending: queue.Queue) -> None:
+        while True:
+            batch = [pending.get()]
+            try:
+                self._predict_batch(batch, pending)
+            except Exception as e:
+                # the worker outlives any failure, requests
+                # of the batch get it instead of waiting
+                log.error(msg=f"Batch dispatcher failed: {type(e)}")
+                log.error(msg=f"{e}")
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+
+    def _predict_batch(
+        self, batch: List[PendingPrediction], pending: queue.Queue
+    ) -> None:
+        rows = len(batch[0].features)
+        deadline = time.monotonic() + self.max_latency
+
+        while rows < self.max_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = pending.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item.features)
+
+        BATCH_ROWS.observe(rows)
+        # requests may refer to different artifacts
+        # (e.g. while the model is being replaced),
+        # the ones which timed out are skipped
+        groups: Dict[int, List[PendingPrediction]] = {}
+        for item in batch:
+            if item.future.set_running_or_notify_cancel():
+                groups.setdefault(id(item.artifact), []).append(item)
+        for items in groups.values():
+            self._dispatch(items)
+
+    def _dispatch(self, items: List[PendingPrediction]) -> None:
+        log.debug("Predicting for a batch of %d requests", len(items))
+        try:
+            features = (
+                pd.concat([item.features for item in items], ignore_index=True)
+                if len(items) > 1
+                else items[0].features
+            )
+            prediction = items[0].artifact.predict(features)
+        except Exception as e:
+            if len(items) == 1:
+                items[0].future.set_exception(e)
+                return
+            # do not let a single malformed request
+            # fail the others in the same batch
+            log.warning(msg="Batched prediction failed, predicting one by one")
+            for item in items:
+                self._dispatch([item])
+            return
+
+        offsets = np.cumsum([len(item.features) for item in items])[:-1]
+        for item, result in zip(items, np.split(prediction, offsets)):
+            item.future.set_result(result)
@@ -0,0 +1,44 @@
+import resource
+from typing import Dict
+
+from .. import default_logger
+
+log = default_logger(__name__)
+
+SMAPS_ROLLUP = "/proc/self/smaps_rollup"
+SMAPS_FIELDS = dict(
+    Rss="rss",
+    Pss="pss",
+    Shared_Clean="shared",
+    Shared_Dirty="shared",
+    Private_Clean="private",
+    Private_Dirty="private",
+)
+
+
+def memory_usage() -> Dict[str, float]:
+    """
+    Resident memory of the current process in MiB. On Linux,
+    also reports proportional set size and the split between
+    pages shared with other processes (e.g. copy-on-write pages
+    inherited from gunicorn master) and private ones
+
+    :rtype `dict` with `rss` and, if available, `pss`,
+    `shared` and `private` keys
+    """
+    usage = dict()
+    try:
+        with open(SMAPS_ROLLUP, "r") as f:
+            for line in f:
+                field, _, value = line.partition(":")
+                if field in SMAPS_FIELDS:
+                    key = SMAPS_FIELDS[field]
+                    kbytes = int(value.split()[0])
+                    usage[key] = usage.get(key, 0) + kbytes / 1024
+        return usage
+    except (FileNotFoundError, PermissionError, ValueError, IndexError) as e:
+        log.debug(msg=f"Detailed memory usage is not available: {e}")
+
+    # fallback: peak resident set size (KiB on Linux)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return dict(rss=peak / 1024)
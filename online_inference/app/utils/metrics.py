@@ -0,0 +1,131 @@
+from contextlib import contextmanager
+from functools import wraps
+from os import getenv
+from typing import Callable, Iterator, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+from .tracing import span
+
+# the directory is shared by gunicorn workers, each of them writes
+# its samples into separate memory-mapped files (should be set
+# before `prometheus_client` is imported, see `gunicorn.conf.py`)
+MULTIPROC_DIR = getenv("PROMETHEUS_MULTIPROC_DIR")
+
+STAGES = ("parse", "validate", "predict", "serialize")
+
+# stages take from tens of microseconds up to a few seconds
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+ROWS_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+
+STAGE_LATENCY = Histogram(
+    "inference_stage_seconds",
+    "Time spent in each stage of request handling",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_LATENCY = Histogram(
+    "inference_request_seconds",
+    "Time spent handling prediction requests",
+    ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "inference_requests_in_flight",
+    "Prediction requests being handled",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+REQUEST_ROWS = Histogram(
+    "inference_request_rows",
+    "Rows in a prediction request that passed validation",
+    buckets=ROWS_BUCKETS,
+)
+BATCH_ROWS = Histogram(
+    "inference_batch_rows",
+    "Rows in a micro-batch sent to the model by the dispatcher",
+    buckets=ROWS_BUCKETS,
+)
+PAYLOADS = Counter(
+    "inference_payloads",
+    "Payloads: passed, with outliers, invalid or cached (not validated)",
+    ["result"],
+)
+
+# children are resolved once, so that hot paths skip label lookups
+_stages = {stage: STAGE_LATENCY.labels(stage=stage) for stage in STAGES}
+
+
+@contextmanager
+def observe_stage(stage: str) -> Iterator[None]:
+    """
+    Times the enclosed block into `inference_stage_seconds`
+    and, if the request is traced, into the span named after the stage
+
+    :param stage - one of `STAGES`
+    """
+    with _stages[stage].time(), span(stage):
+        yield
+
+
+@contextmanager
+def track_request(endpoint: str) -> Iterator[None]:
+    """
+    Counts the enclosed block as an in-flight request
+    to `endpoint` and times it into `inference_request_seconds`
+    """
+    with IN_FLIGHT.labels(endpoint=endpoint).track_inprogress():
+        with REQUEST_LATENCY.labels(endpoint=endpoint).time():
+            yield
+
+
+def tracked(endpoint: str) -> Callable:
+    # same as `track_request`, for view functions
+    def decorator(handler: Callable) -> Callable:
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            with track_request(endpoint):
+                return handler(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def exposition() -> Tuple[bytes, str]:
+    """
+    Metrics in the Prometheus text format. If `PROMETHEUS_MULTIPROC_DIR`
+    is set, samples of all workers (including the exited ones) are
+    aggregated, no matter which one handles the scrape
+
+    :rtype `tuple` of the response body and its content type
+    """
+    registry = REGISTRY
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
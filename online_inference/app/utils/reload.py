@@ -0,0 +1,241 @@
+import hmac
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Dict, Optional, Tuple
+
+from flask import Flask
+
+from .fetch import ResourceFetcher
+from .startup import make_fetcher, on_startup
+
+from .. import AppConfig, default_logger
+
+log = default_logger(__name__)
+
+# settings which may be overridden by the reload request
+RESOURCE_LOCATIONS = (
+    "artifact_path",
+    "table_schema_path",
+    "feature_stats_path",
+)
+
+
+class ModelReloader:
+    """
+    Replaces the resources of the running application without
+    a restart: new artifact, schema and statistics are collected
+    and validated by the startup routine while the old ones keep
+    serving, then swapped in at once (see `install_resources`).
+    If anything is invalid, the old resources stay in place
+
+    Reloads are requested via the admin endpoint or by the watcher
+    thread, which polls version tags of the resources (see
+    `ResourceFetcher.fingerprint`) every `interval` seconds.
+    The watcher is started lazily in the process which serves
+    first (threads do not survive the fork of gunicorn workers)
+
+    Locations set by the admin endpoint reach a single worker, thus
+    they are written into the state file (`reload_state_path`) once
+    loaded: watchers of the other workers poll it and reload from
+    the same locations, workers started later begin with them
+
+    :param app - application serving the resources
+    :param settings - resource locations
+    :param interval - seconds between the checks, 0 disables the watcher
+    :param fetcher - `ResourceFetcher`, built from settings if not given
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        settings: AppConfig,
+        interval: float = 0,
+        fetcher: Optional[ResourceFetcher] = None,
+    ) -> None:
+        self.app = app
+        self.interval = interval
+        self.fetcher = fetcher or make_fetcher(settings)
+        self.generation = 0
+        self.failures = 0
+        self.reloaded_at: Optional[float] = None
+        self.state_path = settings.reload_state_path
+        self._versions: Optional[Tuple] = None
+        self._state_version: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        # workers started after a reload serve the shared locations
+        self.settings = replace(settings, **self.shared_locations())
+
+    @property
+    def shares_locations(self) -> bool:
+        # whether locations set by the admin endpoint reach every worker:
+        # without the state file the application is assumed to run
+        # in a single process, otherwise it is polled by the watchers
+        return self.state_path is None or self.interval > 0
+
+    def reload(self, share: bool = False, **locations: str) -> bool:
+        """
+        Collects the resources and installs them if all are valid
+
+        :param share - whether the locations are written into
+        the state file on success (see `shared_locations`)
+        :param locations - resource locations replacing the configured
+        ones (see `RESOURCE_LOCATIONS`), kept on success
+
+        :rtype `bool`, whether the resources were replaced
+        """
+        with self._lock:
+            settings = replace(self.settings, **locations)
+            log.info(msg="Collecting resources")
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # version tags are needed by the watcher only, taken
+                # along with the resources: changes made while these
+                # are being collected trigger another reload
+                versions = (
+                    executor.submit(self.versions, settings)
+                    if self.interval > 0
+                    else None
+                )
+                with self.app.app_context():
+                    loaded = on_startup(settings, self.fetcher)
+                self._versions = versions and versions.result()
+
+            if not loaded:
+                self.failures += 1
+                log.error(msg="Reload failed, keeping the previous resources")
+                return False
+
+            self.settings = settings
+            if share and self.state_path:
+                self._write_state()
+            self.generation += 1
+            self.reloaded_at = time.time()
+            self.app.config["HEALTHY"] = True
+            log.info(msg=f"Serving resources of generation {self.generation}")
+            return True
+
+    def versions(self, settings: AppConfig) -> Tuple[Optional[str], ...]:
+        return tuple(
+            self.fetcher.fingerprint(location) if location else None
+            for location in (
+                getattr(settings, name) for name in RESOURCE_LOCATIONS
+            )
+        )
+
+    def shared_locations(self) -> Dict[str, str]:
+        """
+        Reads the locations from the state file, remembers its version
+
+        :rtype `dict` of the locations, empty if there are none
+        """
+        if not self.state_path:
+            return {}
+        # taken first: writes made meanwhile trigger another read
+        self._state_version = self._state_fingerprint()
+        if self._state_version is None:
+            return {}
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            return {
+                name: state[name]
+                for name in RESOURCE_LOCATIONS
+                if isinstance(state.get(name), str)
+            }
+        except (OSError, ValueError, AttributeError) as e:
+            log.error(msg=f"Failed to read {self.state_path}: {e}")
+            return {}
+
+    def authorize(self, authorization: Optional[str]) -> bool:
+        token = self.settings.admin_token
+        if not token or not authorization:
+            return False
+        expected = f"Bearer {token}".encode()
+        return hmac.compare_digest(authorization.encode(), expected)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                generation=self.generation,
+                failures=self.failures,
+                reloaded_at=self.reloaded_at,
+                **{
+                    name: getattr(self.settings, name)
+                    for name in RESOURCE_LOCATIONS
+                },
+            )
+
+    def ensure_watcher(self) -> None:
+        if self.interval <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            log.debug(msg=f"Watching resources every {self.interval}s")
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._watcher = threading.Thread(
+                target=self._watch, name="reloader", daemon=True
+            )
+            self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None and self._pid == os.getpid():
+            self._watcher.join()
+        self._pid = None
+
+    def _write_state(self) -> None:
+        state = {
+            name: getattr(self.settings, name) for name in RESOURCE_LOCATIONS
+        }
+        # replaced atomically, so that the readers never see a partial file
+        partial = f"{self.state_path}.{os.getpid()}"
+        with open(partial, "w") as f:
+            json.dump(state, f)
+        os.replace(partial, self.state_path)
+        self._state_version = self._state_fingerprint()
+
+    def _state_fingerprint(self) -> Optional[str]:
+        try:
+            stat = os.stat(self.state_path)
+        except FileNotFoundError:
+            # no locations were set yet
+            return
+        return f"{stat.st_mtime_ns}:{stat.st_size}"
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            if self.state_path and (
+                self._state_fingerprint() != self._state_version
+            ):
+                log.info(msg="Shared locations changed, reloading")
+                try:
+                    self.reload(**self.shared_locations())
+                except Exception as e:
+                    log.error(msg=f"{type(e)}")
+                    log.error(msg=f"{e}")
+                continue
+
+            versions = self.versions(self.settings)
+            if versions == self._versions:
+                continue
+            if any(
+                version is None and getattr(self.settings, name)
+                for name, version in zip(RESOURCE_LOCATIONS, versions)
+            ):
+                # resource is being replaced or its host is unreachable
+                continue
+            log.info(msg="Resources changed, reloading")
+            try:
+                self.reload()
+            except Exception as e:
+                # the watcher should outlive any failure
+                log.error(msg=f"{type(e)}")
+                log.error(msg=f"{e}")
@@ -0,0 +1,43 @@
+from typing import Any, NamedTuple, Tuple
+
+import numpy as np
+from flask import Config, current_app, g
+
+from .validate import PayloadValidator, TabularDataSchema
+
+
+class ServingResources(NamedTuple):
+    """
+    Resources the predictions are served with: the model artifact,
+    input data format, the validator compiled from it and statistics.
+    These are replaced as a whole, so that a request never mixes
+    the model of one version with the schema of another
+    """
+
+    artifact: Any
+    table_schema: TabularDataSchema
+    stats: Tuple[np.ndarray, np.ndarray]
+    validator: PayloadValidator
+
+
+def install_resources(config: Config, resources: ServingResources) -> None:
+    # swapping a single reference is atomic, separate
+    # entries are kept for the code inspecting the config
+    config["RESOURCES"] = resources
+    config["ARTIFACT"] = resources.artifact
+    config["TABLE_SCHEMA"] = resources.table_schema
+    config["STATS"] = resources.stats
+    config["PAYLOAD_VALIDATOR"] = resources.validator
+
+
+def current_resources() -> ServingResources:
+    """
+    Resources of the current application context (that is, request):
+    the snapshot is taken on the first access, so requests running
+    while the resources are reloaded finish with the old ones
+
+    :rtype `ServingResources`
+    """
+    if "resources" not in g:
+        g.resources = current_app.config["RESOURCES"]
+    return g.resources
@@ -1,46 +1,180 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
 from flask import current_app
 
-from .inference import load_artifact, validate_artifact
-from .validate import load_tabular_schema, load_stats
+from src.features.bundle import read_bundle
+from src.models.artifact import is_artifact, read_header
+
+from .fetch import ResourceFetcher
+from .inference import load_bundle, validate_artifact
+from .resources import ServingResources, install_resources
+from .validate import (
+    load_tabular_schema,
+    load_stats,
+    PayloadValidator,
+    TabularDataSchema,
+)
 
 from .. import AppConfig, default_logger
 
 log = default_logger(__name__)
 
 
-def on_startup(settings: AppConfig) -> bool:
+def on_startup(
+    settings: AppConfig, fetcher: Optional[ResourceFetcher] = None
+) -> bool:
     """
     Startup routine: try to collect application resources:
 
     + model artifact
-    + input data format for requests
+    + input data format for requests (and the validator compiled from it)
     + statistics
 
+    and install them into the current app's config (see
+    `collect_resources`). Also used to reload the resources
+    of the running application (see `ModelReloader`)
+
     :param settings, `AppConfig`
+    :param fetcher, `ResourceFetcher` - built from settings if not given
 
     :rtype `bool`
     """
     with current_app.app_context():
         log.info(msg="Running startup routine")
-        log.debug(msg="Collecting model artifact")
+        fetcher = fetcher or make_fetcher(settings)
+        resources = collect_resources(settings, fetcher)
+        if resources is None:
+            return False
+        install_resources(current_app.config, resources)
+    return True
+
+
+def make_fetcher(settings: AppConfig) -> ResourceFetcher:
+    return ResourceFetcher(
+        timeout=settings.fetch_timeout,
+        retries=settings.fetch_retries,
+        cache_dir=settings.fetch_cache_dir,
+    )
+
+
+def collect_resources(
+    settings: AppConfig, fetcher: ResourceFetcher
+) -> Optional[ServingResources]:
+    """
+    Resources are fetched concurrently over a shared pooled session
+    with timeouts and retries (remote ones are cached on disk
+    if `fetch_cache_dir` is set). Schema and statistics bundled
+    with the artifact (see `pipeline.py`) take precedence,
+    separately fetched ones are used for artifacts without the bundle.
+    These are not fetched at all if the header of the artifact
+    at hand (local or cached) tells it has the bundle
+
+    :param settings, `AppConfig`
+    :param fetcher, `ResourceFetcher`
+
+    :rtype `ServingResources` or `None` if any of them is invalid
+    """
+    log.debug(msg="Collecting model artifact")
+    executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="startup")
+    others: List[Future] = []
+    try:
+        artifact_future = executor.submit(
+            load_bundle, settings.artifact_path, fetcher
+        )
+        if not has_bundle(settings.artifact_path, fetcher):
+            others = submit_others(executor, settings, fetcher)
 
-        artifact = load_artifact(settings.artifact_path)
+        artifact, metadata = artifact_future.result()
         if not validate_artifact(artifact):
             log.critical(msg="Failed to load artifact, aborting startup")
-            return False
+            return
+
+        if "bundle" in metadata:
+            bundled = unpack_bundle(metadata)
+            if bundled is None:
+                msg = "Invalid artifact bundle, aborting startup"
+                log.critical(msg=msg)
+                return
+            table_schema, stats = bundled
+        else:
+            # the header was not at hand or did not match the artifact
+            others = others or submit_others(executor, settings, fetcher)
+            table_schema, stats = (future.result() for future in others)
+    finally:
+        for future in others:
+            future.cancel()
+        # no fetches are left running, e.g. holding the locks
+        # of the session when gunicorn forks the preloaded app
+        executor.shutdown(wait=True)
+
+    if not table_schema:
+        log.critical(msg="Failed to load table schema, aborting startup")
+        return
+
+    try:
+        validator = PayloadValidator(table_schema)
+    except ValueError as e:
+        log.critical(msg="Inconsistent table schema, aborting startup")
+        log.critical(msg=f"{e}")
+        return
+
+    if not stats:
+        msg = "Failed to load statistics for features, aborting statrup"
+        log.critical(msg=msg)
+        return
+
+    return ServingResources(artifact, table_schema, stats, validator)
 
-        table_schema = load_tabular_schema(settings.table_schema_path)
-        if not table_schema:
-            log.critical(msg="Failed to load table schema, aborting startup")
-            return False
 
-        stats = load_stats(settings.feature_stats_path)
-        if not stats:
-            msg = "Failed to load statistics for features, aborting statrup"
-            log.critical(msg=msg)
+def unpack_bundle(
+    metadata: Dict[str, Any]
+) -> Optional[Tuple[TabularDataSchema, Tuple[np.ndarray, np.ndarray]]]:
+    log.info(msg="Using schema and statistics bundled with the artifact")
+    try:
+        schema, mean, std = read_bundle(metadata)
+        return TabularDataSchema(**schema), (mean, std)
+    except (KeyError, TypeError, ValueError) as e:
+        log.error(msg=f"{type(e)}")
+        log.error(msg=f"{e}")
+
+
+def has_bundle(location: Optional[str], fetcher: ResourceFetcher) -> bool:
+    # tells from the header of the local (or cached) artifact,
+    # remote ones are assumed to have no bundle until fetched
+    path = fetcher.cached(location) if location else None
+    try:
+        if path is None or not is_artifact(path):
             return False
+        return "bundle" in read_header(path)["metadata"]
+    except (OSError, ValueError, KeyError):
+        return False
 
-        current_app.config["ARTIFACT"] = artifact
-        current_app.config["TABLE_SCHEMA"] = table_schema
-        current_app.config["STATS"] = stats
-    return True
+
+def submit_others(
+    executor: ThreadPoolExecutor, settings: AppConfig, fetcher: ResourceFetcher
+) -> List[Future]:
+    log.debug(msg="Collecting table schema and statistics")
+    return [
+        submit_optional(
+            executor, load_tabular_schema, settings.table_schema_path, fetcher
+        ),
+        submit_optional(
+            executor, load_stats, settings.feature_stats_path, fetcher
+        ),
+    ]
+
+
+def submit_optional(
+    executor: ThreadPoolExecutor,
+    loader: Callable,
+    location: Optional[str],
+    fetcher: ResourceFetcher,
+) -> Future:
+    future = Future()
+    if not location:
+        # not configured, e.g. with bundled artifacts
+        future.set_result(None)
+        return future
+    return executor.submit(loader, location, fetcher)
@@ -0,0 +1,276 @@
+import atexit
+import importlib
+import itertools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from functools import wraps
+from typing import Callable, Deque, Iterator, List, Optional
+
+from .. import default_logger
+
+log = default_logger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+@dataclass
+class Span:
+    """
+    Timing of a single stage of request handling
+
+    name: str
+    request_id: str - id of the request (trace) the span belongs to
+    span_id: int - unique within the request, root span has id 0
+    parent_id: int - id of the enclosing span, `None` for the root one
+    start: float - wall-clock start time, seconds since epoch
+    duration: float - seconds
+    error: str - exception raised within the span, if any
+    """
+
+    name: str
+    request_id: str
+    span_id: int
+    parent_id: Optional[int]
+    start: float = 0
+    duration: float = 0
+    error: Optional[str] = None
+
+
+class SpanExporter(ABC):
+    """
+    Receives the spans of every finished request, the root
+    span comes last. Called by the thread handling the request,
+    thus should be cheap (e.g. hand the spans to a queue)
+    """
+
+    @abstractmethod
+    def export(self, spans: List[Span]) -> None:
+        ...
+
+
+class InMemoryExporter(SpanExporter):
+    """
+    Keeps spans of the last `maxlen` requests,
+    grouped by request id (e.g. for tests)
+    """
+
+    def __init__(self, maxlen: int = 1000) -> None:
+        self.traces: Deque[List[Span]] = deque(maxlen=maxlen)
+
+    def export(self, spans: List[Span]) -> None:
+        self.traces.append(spans)
+
+    def find(self, request_id: str) -> Optional[List[Span]]:
+        for spans in reversed(self.traces):
+            if spans[-1].request_id == request_id:
+                return spans
+
+
+class StdoutExporter(SpanExporter):
+    """
+    Writes each span as a single-line JSON document. Requests only
+    put their spans into a bounded queue, serialization and I/O happen
+    in the writer thread; if the queue is full, spans are dropped.
+    The writer is started lazily in the process which exports first
+    (same as the one of `LogPipeline`)
+
+    :param stream - file-like object, stdout by default
+    :param maxsize - max number of requests waiting in the queue
+    """
+
+    def __init__(self, stream=None, maxsize: int = 10000) -> None:
+        self.stream = stream
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._queue: Optional[queue.Queue] = None
+        self._writer: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        atexit.register(self.stop)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def export(self, spans: List[Span]) -> None:
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def stop(self) -> None:
+        # waits for the queued spans to be written
+        with self._lock:
+            if self._writer is not None and self._pid == os.getpid():
+                self._queue.put(None)
+                self._writer.join()
+            self._writer, self._pid = None, None
+
+    def _after_fork(self) -> None:
+        # the lock might have been held by another thread
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._writer = threading.Thread(
+                target=self._write,
+                args=(self._queue,),
+                name="span-writer",
+                daemon=True,
+            )
+            self._writer.start()
+            self._pid = os.getpid()
+
+    def _write(self, pending: queue.Queue) -> None:
+        reported = 0
+        while True:
+            spans = pending.get()
+            if spans is None:
+                return
+            stream = self.stream or sys.stdout
+            try:
+                stream.write(
+                    "".join(json.dumps(asdict(s)) + "\n" for s in spans)
+                )
+                if pending.empty():
+                    stream.flush()
+            except Exception as e:
+                # the writer should outlive any failure
+                log.error(msg=f"Failed to write spans: {e}")
+            if self.dropped > reported:
+                log.warning("Dropped %d spans", self.dropped - reported)
+                reported = self.dropped
+
+
+EXPORTERS = dict(memory=InMemoryExporter, stdout=StdoutExporter)
+
+
+def make_exporter(kind: Optional[str]) -> Optional[SpanExporter]:
+    """
+    Builds the exporter by its name (see `EXPORTERS`) or
+    by the `package.module:Factory` path of a custom one
+
+    :param kind - exporter name or path, `None` disables tracing
+
+    :rtype `SpanExporter` or `None`
+    """
+    if not kind:
+        return
+    if kind in EXPORTERS:
+        return EXPORTERS[kind]()
+    module, _, factory = kind.partition(":")
+    if not factory:
+        error_message = f"Unknown trace exporter: {kind}"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+    return getattr(importlib.import_module(module), factory)()
+
+
+@dataclass
+class Trace:
+    request_id: str
+    exporter: SpanExporter
+    spans: List[Span] = field(default_factory=list)
+    ids: Iterator[int] = field(default_factory=lambda: itertools.count(1))
+
+
+# trace of the current request and the innermost open span in it,
+# copied into the threads the request is handed to
+_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_parent: ContextVar[Optional[int]] = ContextVar("span", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_request_id() -> Optional[str]:
+    trace = _trace.get()
+    return None if trace is None else trace.request_id
+
+
+@contextmanager
+def start_trace(
+    name: str, request_id: str, exporter: Optional[SpanExporter]
+) -> Iterator[None]:
+    """
+    Opens the root span of the request, spans opened within
+    (see `span`) are exported along with it once it is closed
+
+    :param name - root span name, e.g. endpoint
+    :param request_id - id attached to every span of the request
+    :param exporter - `SpanExporter`, `None` disables tracing
+    """
+    if exporter is None:
+        yield
+        return
+    trace = Trace(request_id, exporter)
+    token = _trace.set(trace)
+    try:
+        with _open_span(trace, name, span_id=0):
+            yield
+    finally:
+        _trace.reset(token)
+        try:
+            exporter.export(trace.spans)
+        except Exception as e:
+            log.error(msg=f"Failed to export spans: {e}")
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Times the enclosed block as a child of the innermost open span,
+    does nothing outside of traced requests
+    """
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    with _open_span(trace, name, next(trace.ids)):
+        yield
+
+
+def traced(name: str) -> Callable:
+    # same as `span`, for functions
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if _trace.get() is None:
+                return function(*args, **kwargs)
+            with span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextmanager
+def _open_span(trace: Trace, name: str, span_id: int) -> Iterator[Span]:
+    record = Span(name, trace.request_id, span_id, _parent.get())
+    token = _parent.set(span_id)
+    record.start = time.time()
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record.duration = time.perf_counter() - started
+        _parent.reset(token)
+        trace.spans.append(record)
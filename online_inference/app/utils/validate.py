@@ -1,15 +1,16 @@
 import io
 import json
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Union
+from itertools import chain
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import requests
 import numpy as np
 import pandas as pd
 
-from validators import url
-
 from .. import default_logger
+from .fetch import ResourceFetcher, default_fetcher
+from .tracing import span, traced
 
 log = default_logger(__name__)
 
@@ -26,8 +27,122 @@ class TabularDataSchema:
     categorical_columns: List[str]
 
 
+class PayloadValidator:
+    """
+    Validator precompiled from `TabularDataSchema` once at startup.
+    Checks keys and value types directly on the parsed JSON
+    (either list of records or mapping of columns) and assembles
+    the features without pandas type inference
+
+    Call returns a `DataFrame` for the model along with the
+    float64 matrix of numeric features, raises `ValueError`
+    if the payload does not match the schema
+    """
+
+    NUMERIC_TYPES = frozenset((int, float, type(None)))
+    CATEGORICAL_TYPES = frozenset((str, type(None)))
+
+    def __init__(self, schema: TabularDataSchema) -> None:
+        columns = list(schema.columns)
+        numeric = set(schema.numeric_columns)
+        categorical = set(schema.categorical_columns)
+
+        if len(columns) != len(set(columns)):
+            raise ValueError("Duplicate columns")
+        if numeric & categorical or numeric | categorical != set(columns):
+            raise ValueError("Inconsistent column types in schema")
+
+        self.columns = columns
+        self.keys = frozenset(columns)
+        self.numeric_columns = [c for c in columns if c in numeric]
+        self.categorical_columns = [c for c in columns if c in categorical]
+
+    def __call__(
+        self, payload: Union[List[Dict[str, Any]], Dict[str, List[Any]]]
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        with span("table_structure_validation"):
+            return self._validate(payload)
+
+    def _validate(
+        self, payload: Union[List[Dict[str, Any]], Dict[str, List[Any]]]
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        if isinstance(payload, list):
+            columns, rows = self._from_records(payload)
+        elif isinstance(payload, dict):
+            columns, rows = self._from_columns(payload)
+        else:
+            raise ValueError(f"Unsupported payload type: {type(payload)}")
+
+        numeric = self._numeric_matrix(columns, rows)
+        if not self.categorical_columns:
+            # the most common case: single float64 block, no copies
+            features = pd.DataFrame(numeric, columns=self.columns, copy=False)
+            return features, numeric
+
+        data = dict(zip(self.numeric_columns, numeric.T))
+        for column in self.categorical_columns:
+            values = columns[column]
+            if not set(map(type, values)) <= self.CATEGORICAL_TYPES:
+                raise ValueError(f"Categorical column mismatch: {column}")
+            data[column] = np.array(values, dtype=object)
+
+        features = pd.DataFrame({c: data[c] for c in self.columns})
+        return features, numeric
+
+    def canonical_row(self, row: Any) -> Optional[Tuple[Tuple, Tuple]]:
+        """
+        Hashable representation of a single record in the schema
+        column order (value types are kept to tell `1` from `True`).
+        Returns `None` if the record keys do not match the schema
+        """
+        if not isinstance(row, dict) or row.keys() != self.keys:
+            return
+        values = tuple(row[c] for c in self.columns)
+        return values, tuple(map(type, values))
+
+    def _from_records(
+        self, payload: List[Dict[str, Any]]
+    ) -> Tuple[Dict[str, List[Any]], int]:
+        if not payload:
+            raise ValueError("Empty payload")
+        for row in payload:
+            if not isinstance(row, dict) or row.keys() != self.keys:
+                raise ValueError("Column format mismatch")
+        columns = {c: [row[c] for row in payload] for c in self.columns}
+        return columns, len(payload)
+
+    def _from_columns(
+        self, payload: Dict[str, List[Any]]
+    ) -> Tuple[Dict[str, List[Any]], int]:
+        if payload.keys() != self.keys:
+            raise ValueError("Column format mismatch")
+        if not all(isinstance(v, list) for v in payload.values()):
+            raise ValueError("Columns should be lists of values")
+        lengths = set(map(len, payload.values()))
+        if len(lengths) != 1 or 0 in lengths:
+            raise ValueError("Columns should be non-empty and of same size")
+        return payload, lengths.pop()
+
+    def _numeric_matrix(
+        self, columns: Dict[str, List[Any]], rows: int
+    ) -> np.ndarray:
+        values = [columns[c] for c in self.numeric_columns]
+        types = set(map(type, chain.from_iterable(values)))
+        if not types <= self.NUMERIC_TYPES:
+            raise ValueError("Numeric columns mismatch")
+        if not values:
+            return np.empty((rows, 0), dtype=np.float64)
+        # missing values (`null`) become NaN and are left to the imputer
+        try:
+            return np.array(values, dtype=np.float64).T
+        except (OverflowError, TypeError):
+            # integers out of the float64 range
+            raise ValueError("Numeric columns mismatch")
+
+
 def load_tabular_schema(
-    source: Union[str, io.StringIO]
+    source: Union[str, io.StringIO],
+    fetcher: Optional[ResourceFetcher] = None,
 ) -> Optional[TabularDataSchema]:
     """
     Loads configuration for TabularDataSchema
@@ -35,6 +150,7 @@ def load_tabular_schema(
 
     :param source, `str` or `io.StringIO` - resource location
     or buffer. Supports URLs and filenames
+    :param fetcher, `ResourceFetcher` for remote resources
 
     :rtype `TabularDataSchema` or `None`
     """
@@ -43,21 +159,15 @@ def load_tabular_schema(
     log.debug(msg=f"Reading feature schema from {source}")
     if isinstance(source, str):
         try:
-            if url(source):
-                log.debug(msg="Collecting from specified URL")
-                with requests.get(source) as response:
-                    response.raise_for_status()
-                    return TabularDataSchema(**json.loads(response.content))
-            else:
-                log.debug(msg="Collecting from local filesystem")
-                with open(source, "r") as f:
-                    return TabularDataSchema(**json.load(f))
+            log.debug(msg="Collecting schema")
+            content = (fetcher or default_fetcher()).read(source)
+            return TabularDataSchema(**json.loads(content))
         except (
             FileNotFoundError,
             json.JSONDecodeError,
             KeyError,
             TypeError,
-            requests.HTTPError,
+            requests.RequestException,
         ) as e:
             log.error(msg="Encountered error during schema loading")
             log.error(msg=f"{type(e)}")
@@ -75,12 +185,15 @@ def load_tabular_schema(
     return
 
 
-def load_stats(source: str, /) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+def load_stats(
+    source: str, /, fetcher: Optional[ResourceFetcher] = None
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
     """
     Collect mean and std for numerical features obtained
     earlier on train data to perform outlier detection
 
     :param source, str - path/URL to a valid JSON
+    :param fetcher, `ResourceFetcher` for remote resources
 
     :rtype `tuple` with 2 `np.ndarray` (mean & std, respectively)
     or `None` if errors occured
@@ -88,15 +201,8 @@ def load_stats(source: str, /) -> Optional[Tuple[np.ndarray, np.ndarray]]:
     log.debug(msg=f"Reading statistical data from {source}")
 
     try:
-        if url(source):
-            log.debug(msg="Collecting from specified URL")
-            with requests.get(source) as response:
-                response.raise_for_status()
-                stats = json.loads(response.content)
-        else:
-            log.debug(msg="Collecting from local filesystem")
-            with open(source, "r") as f:
-                stats = json.load(f)
+        log.debug(msg="Collecting statistics")
+        stats = json.loads((fetcher or default_fetcher()).read(source))
         log.debug(msg="Read JSON data")
 
         if len(stats["mean"]) != len(stats["std"]):
@@ -111,7 +217,7 @@ def load_stats(source: str, /) -> Optional[Tuple[np.ndarray, np.ndarray]]:
         KeyError,
         ValueError,
         TypeError,
-        requests.HTTPError,
+        requests.RequestException,
     ) as e:
         log.error(msg="Encountered error during stats loading")
         log.error(msg=f"{type(e)}")
@@ -119,6 +225,7 @@ def load_stats(source: str, /) -> Optional[Tuple[np.ndarray, np.ndarray]]:
         return
 
 
+@traced("table_structure_validation")
 def table_structure_validation(
     data: pd.DataFrame,
     schema: TabularDataSchema,
@@ -173,6 +280,7 @@ def table_structure_validation(
     return True
 
 
+@traced("outlier_validation")
 def outlier_validation(
     data: np.ndarray,
     *,
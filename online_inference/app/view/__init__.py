@@ -1,6 +1,7 @@
-from flask import Flask
+from flask import Flask, abort, request
 
 from .. import AppConfig, default_logger
+from ..logs import sample_request
 
 log = default_logger(__name__)
 
@@ -18,15 +19,60 @@ def application_factory(settings: AppConfig) -> Flask:
     app = Flask(__name__)
 
     from .routes import api
-    from ..utils import on_startup
+    from ..utils.inference import BatchDispatcher, PredictionCache
+    from ..utils.reload import ModelReloader
+    from ..utils.tracing import make_exporter
 
     app.register_blueprint(api)
+    app.config["LOG_SAMPLE_RATE"] = settings.log_sample_rate
+    # larger request bodies are answered with 413
+    app.config["MAX_CONTENT_LENGTH"] = settings.max_content_length or None
+    # spans of the requests are exported only if it is set
+    app.config["TRACE_EXPORTER"] = make_exporter(settings.trace_exporter)
+
+    if settings.max_content_length:
+
+        @app.before_request
+        def limit_request_body() -> None:
+            # werkzeug < 2.3 checks the limit for form data only
+            length = request.content_length
+            if length is not None and length > settings.max_content_length:
+                log.warning(msg=f"Request body of {length} bytes rejected")
+                abort(413)
+
+    if settings.log_sample_rate < 1:
+        log.debug(msg="Enabling sampling of request logs")
+
+        @app.before_request
+        def sample_request_logs() -> None:
+            sample_request(settings.log_sample_rate)
+
+    if settings.prediction_cache_size > 0:
+        log.debug(msg="Enabling prediction cache")
+        app.config["PREDICTION_CACHE"] = PredictionCache(
+            maxsize=settings.prediction_cache_size,
+            ttl=settings.prediction_cache_ttl,
+        )
+
+    if settings.batching_max_size > 0:
+        log.debug(msg="Enabling micro-batching of predictions")
+        app.config["BATCH_DISPATCHER"] = BatchDispatcher(
+            max_size=settings.batching_max_size,
+            max_latency=settings.batching_max_latency / 1000,
+        )
+
+    # resources are (re)loaded by the reloader: at startup,
+    # on admin requests and once the watcher notices a change
+    reloader = ModelReloader(app, settings, settings.reload_interval)
+    app.config["MODEL_RELOADER"] = reloader
+    if settings.reload_interval > 0:
+        log.debug(msg="Enabling resource watcher")
+        app.before_request(reloader.ensure_watcher)
 
     with app.app_context():
-        if on_startup(settings):
+        if reloader.reload():
             # startup routines worked out correctly
-            log.debug(msg="All items collected, updating current app's config")
-            app.config["HEALTHY"] = True
+            log.debug(msg="All items collected, current app's config updated")
             log.debug(msg="Startup routines done")
 
         log.info(msg="Application configured")
@@ -1,13 +1,24 @@
-from typing import List, Optional, Dict, Union
-from flask import current_app, Response
+from functools import wraps
+from typing import Any, Callable, List, Optional, Dict, Tuple, Union
+from flask import current_app, make_response, request, Response
 
 import pandas as pd
 
 from .. import default_logger
-from ..utils.validate import table_structure_validation, outlier_validation
+from ..utils.inference import make_prediction
+from ..utils.metrics import PAYLOADS, REQUEST_ROWS, observe_stage
+from ..utils.reload import RESOURCE_LOCATIONS
+from ..utils.resources import current_resources
+from ..utils.tracing import REQUEST_ID_HEADER, new_request_id, start_trace
+from ..utils.validate import outlier_validation
 
 log = default_logger(__name__)
 
+Payload = Union[
+    List[Dict[str, Union[str, float]]],
+    Dict[str, List[Union[str, float]]],
+]
+
 
 def operating() -> bool:
     with current_app.app_context():
@@ -26,34 +37,173 @@ def prediction_response(prediction: Optional[List]):
     return dict(prediction=prediction)
 
 
-def validate_payload(payload: List[Dict[str, Union[str, float]]]) -> bool:
-    log.debug(msg="Performs payload validation")
-    log.debug(msg=f"Payload: {payload} ({type(payload)})")
+def request_id(value: Optional[str]) -> str:
+    # ids set by the clients (e.g. ingress) are kept if sane
+    if value and len(value) <= 128 and value.isprintable():
+        return value
+    return new_request_id()
 
-    try:
-        payload = pd.DataFrame(data=payload)
-    except (ValueError, TypeError) as e:
-        log.error(msg="Failed to build DataFrame from payload")
-        log.error(msg=f"{e}")
-        return False
 
-    schema = current_app.config["TABLE_SCHEMA"]
+def traced_request(name: str) -> Callable:
+    """
+    Makes the view function the root span of the request trace
+    (exported if `TRACE_EXPORTER` is configured). The request ID
+    is taken from the `X-Request-ID` header or generated,
+    and returned in the same header of the response
+
+    :param name - root span name
+    """
+
+    def decorator(handler: Callable) -> Callable:
+        @wraps(handler)
+        def wrapper(*args, **kwargs) -> Response:
+            rid = request_id(request.headers.get(REQUEST_ID_HEADER))
+            exporter = current_app.config["TRACE_EXPORTER"]
+            with start_trace(name, rid, exporter):
+                response = make_response(handler(*args, **kwargs))
+            response.headers[REQUEST_ID_HEADER] = rid
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+@observe_stage("validate")
+def prepare_features(payload: Payload) -> Optional[pd.DataFrame]:
+    """
+    Validates the parsed JSON payload with the validator compiled
+    at startup and assembles features for the model. Both
+    record-oriented (`[{"col": value}, ...]`) and column-oriented
+    (`{"col": [value, ...]}`) layouts are accepted, row order is preserved
+
+    :param payload - list of records or mapping of columns
+
+    :rtype `pd.DataFrame` or `None` if the payload did not pass validation
+    """
+    log.debug(msg="Performs payload validation")
+    # formatted lazily: the payload may be large
+    log.debug("Payload: %s (%s)", payload, type(payload))
+
+    validator = current_resources().validator
     try:
-        table_structure_validation(payload, schema, raises=True)
+        features, numeric = validator(payload)
         log.debug(msg="Column structure matched, OK")
-    except ValueError:
+    except ValueError as e:
         log.error(msg="Column structure validation failed")
-        return False
+        log.error(msg=f"{e}")
+        PAYLOADS.labels(result="invalid").inc()
+        return
 
     # the payload is of correct format, check
     # distribution quality
-    stats = current_app.config["STATS"]
+    stats = current_resources().stats
     try:
         mean, std = stats[0], stats[1]
-        outlier_validation(payload.values, mean=mean, std=std, raises=True)
+        outlier_validation(numeric, mean=mean, std=std, raises=True)
         log.debug(msg="Outlier check passed")
+        PAYLOADS.labels(result="passed").inc()
     except ValueError:
         log.warning(msg="Found some outliers")
+        PAYLOADS.labels(result="outliers").inc()
 
     log.debug(msg="Payload validation done")
-    return True
+    return features
+
+
+def validate_payload(payload: Payload) -> bool:
+    return prepare_features(payload) is not None
+
+
+def predict_payload(payload: Payload) -> Optional[List]:
+    """
+    Validates the payload and predicts for it. If the prediction
+    cache is enabled, rows of record-oriented payloads that were
+    already seen with the current artifact skip both validation
+    and inference, only the remaining rows are sent to the model
+
+    :param payload - list of records or mapping of columns
+
+    :rtype `list` with predictions in the order of input rows
+    or `None` if validation/inference failed
+    """
+    cache = current_app.config.get("PREDICTION_CACHE")
+    if cache is None or not isinstance(payload, list):
+        features = prepare_features(payload)
+        if features is None:
+            return
+        REQUEST_ROWS.observe(len(features))
+        prediction = make_prediction(features)
+        return None if prediction is None else prediction.tolist()
+
+    resources = current_resources()
+    artifact, validator = resources.artifact, resources.validator
+
+    keys = [validator.canonical_row(row) for row in payload]
+    prediction = [cache.get(key, artifact) for key in keys]
+    missing = [i for i, value in enumerate(prediction) if value is None]
+    log.debug("Cache hits: %d/%d", len(payload) - len(missing), len(payload))
+
+    if not missing:
+        # validated along with the rows once, counted here,
+        # so that every payload makes it into the totals
+        PAYLOADS.labels(result="cached").inc()
+        REQUEST_ROWS.observe(len(payload))
+        return prediction
+
+    features = prepare_features([payload[i] for i in missing])
+    if features is None:
+        return
+    REQUEST_ROWS.observe(len(payload))
+    computed = make_prediction(features)
+    if computed is None:
+        return
+
+    for i, value in zip(missing, computed.tolist()):
+        prediction[i] = value
+        cache.put(keys[i], value, artifact)
+    return prediction
+
+
+def reload_resources(
+    authorization: Optional[str], payload: Any
+) -> Tuple[int, Dict[str, Any]]:
+    """
+    Handles the request to reload the resources of the application
+    (see `ModelReloader`). The endpoint is disabled unless the admin
+    token is set, requests should carry it as a bearer token.
+    The payload may override resource locations, e.g.
+    `{"artifact_path": "<new location>"}`, these are shared
+    with the other workers (see `ModelReloader`)
+
+    :param authorization - value of the `Authorization` header
+    :param payload - parsed JSON body, `None` if empty
+
+    :rtype `tuple` of the response status and body
+    """
+    reloader = current_app.config["MODEL_RELOADER"]
+    if not reloader.settings.admin_token:
+        log.warning(msg="Admin token is not set, reload is disabled")
+        return 404, dict(error="Not found")
+    if not reloader.authorize(authorization):
+        log.warning(msg="Unauthorized reload request")
+        return 401, dict(error="Unauthorized")
+
+    locations = {} if payload is None else payload
+    if not isinstance(locations, dict) or any(
+        key not in RESOURCE_LOCATIONS or not isinstance(value, str)
+        for key, value in locations.items()
+    ):
+        log.warning(msg=f"Invalid resource locations: {payload}")
+        return 400, dict(error=f"Expected mapping of {RESOURCE_LOCATIONS}")
+
+    if locations and not reloader.shares_locations:
+        # the other workers would keep serving the old resources
+        error = "Locations reach other workers only with RELOAD_INTERVAL"
+        log.warning(msg=error)
+        return 409, dict(error=error)
+
+    reloaded = reloader.reload(share=True, **locations)
+    return (200 if reloaded else 409), dict(
+        reloaded=reloaded, **reloader.stats()
+    )
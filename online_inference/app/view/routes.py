@@ -1,15 +1,25 @@
 import json
-from flask import Blueprint, Response, jsonify, redirect, url_for, request
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    redirect,
+    url_for,
+    request,
+)
 
 from .helper import (
     operating,
     empty_response,
     healthy_response,
     prediction_response,
-    validate_payload,
+    predict_payload,
+    reload_resources,
+    traced_request,
 )
 from .. import default_logger
-from ..utils.inference import make_prediction
+from ..utils.metrics import exposition, observe_stage, tracked
 
 log = default_logger(__name__)
 
@@ -23,6 +33,8 @@ def health_handler() -> Response:
 
 
 @api.route("/predict", methods=["GET"])
+@tracked("predict")
+@traced_request("predict_handler")
 def predict_handler() -> str:
     log.debug(msg="Prediction requested")
     if not operating():
@@ -33,20 +45,64 @@ def predict_handler() -> str:
         return jsonify(prediction_response(None))
 
     try:
-        payload = json.loads(request.values["payload"])
+        with observe_stage("parse"):
+            payload = json.loads(request.values["payload"])
     except json.JSONDecodeError:
         log.warning(msg="Payload should be an encoded JSON string")
         return jsonify(prediction_response(None))
 
     log.debug(msg="Sends prediction response")
-    if not validate_payload(payload):
+    prediction = predict_payload(payload)
+    if prediction is None:
         log.warning(msg="Seems like the input did not pass validation")
+    with observe_stage("serialize"):
+        return jsonify(prediction_response(prediction))
+
+
+@api.route("/predict/batch", methods=["POST"])
+@tracked("predict/batch")
+@traced_request("batch_predict_handler")
+def batch_predict_handler() -> str:
+    log.debug(msg="Batch prediction requested")
+    if not operating():
+        log.warning(msg="App is not set up correctly")
+        return redirect(url_for(".health_handler"))
+
+    with observe_stage("parse"):
+        payload = request.get_json(silent=True)
+    if payload is None:
+        log.warning(msg="Request body should be a JSON document")
         return jsonify(prediction_response(None))
 
-    prediction = make_prediction(payload)
+    log.debug(msg="Sends batch prediction response")
+    prediction = predict_payload(payload)
     if prediction is None:
-        return jsonify(prediction_response(None))
-    return jsonify(prediction_response(prediction.tolist()))
+        log.warning(msg="Seems like the input did not pass validation")
+    with observe_stage("serialize"):
+        return jsonify(prediction_response(prediction))
+
+
+@api.route("/cache", methods=["GET"])
+def cache_stats_handler() -> Response:
+    log.debug(msg="Prediction cache stats requested")
+    cache = current_app.config.get("PREDICTION_CACHE")
+    return jsonify(dict(cache=None if cache is None else cache.stats()))
+
+
+@api.route("/metrics", methods=["GET"])
+def metrics_handler() -> Response:
+    body, content_type = exposition()
+    return Response(body, status=200, content_type=content_type)
+
+
+@api.route("/admin/reload", methods=["POST"])
+def reload_handler() -> Response:
+    log.info(msg="Resource reload requested")
+    status, body = reload_resources(
+        request.headers.get("Authorization"),
+        request.get_json(silent=True),
+    )
+    return jsonify(body), status
 
 
 @api.errorhandler(404)
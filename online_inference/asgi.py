@@ -0,0 +1,3 @@
+from app import make_asgi_app
+
+app = make_asgi_app()
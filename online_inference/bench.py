@@ -0,0 +1,428 @@
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import click
+
+from client import PREDICT_ENDPOINT
+
+BATCH_ENDPOINT = "predict/batch"
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    body: bytes = b""
+
+
+@dataclass
+class Result:
+    latency: float
+    status: Optional[int]
+    error: Optional[str] = None
+
+
+class ConnectionPool:
+    """
+    Minimal asyncio HTTP/1.1 client keeping up to `size`
+    keep-alive connections to a single host. Responses should
+    have either `Content-Length` or chunked body
+
+    :param host - server host
+    :param port - server port
+    :param size - max number of connections
+    :param timeout - per-request timeout, seconds
+    """
+
+    def __init__(
+        self, host: str, port: int, size: int, timeout: float = 10
+    ) -> None:
+        self.host, self.port = host, port
+        self.timeout = timeout
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def request(self, request: Request) -> Tuple[int, bytes]:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.open_connection(
+                        self.host, self.port
+                    )
+                status, body, keep_alive = await asyncio.wait_for(
+                    self._exchange(*connection, request), self.timeout
+                )
+            except BaseException:
+                if connection is not None:
+                    connection[1].close()
+                raise
+            if keep_alive:
+                self._idle.append(connection)
+            else:
+                connection[1].close()
+            return status, body
+
+    async def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+    async def _exchange(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        request: Request,
+    ) -> Tuple[int, bytes, bool]:
+        head = (
+            f"{request.method} {request.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            f"Content-Length: {len(request.body)}\r\n"
+            "Content-Type: application/json\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + request.body)
+        await writer.drain()
+
+        status_line = await reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                line = await reader.readuntil(b"\r\n")
+                size = int(line.split(b";")[0], 16)
+                chunk = await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            body = b"".join(chunks)
+        else:
+            length = int(headers.get("content-length", 0))
+            body = await reader.readexactly(length)
+
+        keep_alive = headers.get("connection", "").lower() != "close"
+        return status, body, keep_alive
+
+
+def make_request(endpoint: str, payload) -> Request:
+    if endpoint == PREDICT_ENDPOINT:
+        query = urlencode(dict(payload=json.dumps(payload)))
+        return Request("GET", f"/{endpoint}?{query}")
+    return Request("POST", f"/{endpoint}", json.dumps(payload).encode())
+
+
+def replayed_requests(path: str, endpoint: str) -> List[Request]:
+    """
+    Reads recorded requests: each line of the JSONL file is either
+    a payload or an object with `payload` and optional `endpoint` keys
+    """
+    requests = []
+    with open(path, "r") as f:
+        for line in filter(str.strip, f):
+            record = json.loads(line)
+            if isinstance(record, dict) and "payload" in record:
+                target = record.get("endpoint", endpoint)
+                requests.append(make_request(target, record["payload"]))
+            else:
+                requests.append(make_request(endpoint, record))
+    return requests
+
+
+def synthetic_requests(
+    path: str,
+    endpoint: str,
+    count: int,
+    rows: int,
+    noise: float,
+    seed: int,
+) -> List[Request]:
+    """
+    Builds `count` requests of `rows` rows each sampled from the sample
+    payload, numeric values are jittered by up to `noise` (relative),
+    so that distinct requests are not answered from the cache
+    """
+    with open(path, "r") as f:
+        samples = json.load(f)
+    rng = random.Random(seed)
+
+    def jitter(value):
+        if isinstance(value, (int, float)) and noise > 0:
+            return round(value * (1 + rng.uniform(-noise, noise)), 6)
+        return value
+
+    def sample() -> dict:
+        row = rng.choice(samples)
+        return {key: jitter(value) for key, value in row.items()}
+
+    return [
+        make_request(endpoint, [sample() for _ in range(rows)])
+        for _ in range(count)
+    ]
+
+
+def predicted(body: bytes):
+    try:
+        return json.loads(body).get("prediction")
+    except (ValueError, AttributeError):
+        return None
+
+
+async def send(pool: ConnectionPool, request: Request, started: float):
+    try:
+        status, body = await pool.request(request)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+        return Result(time.perf_counter() - started, None, type(e).__name__)
+    error = None
+    if status != 200:
+        error = f"HTTP {status}"
+    elif predicted(body) is None:
+        # the service answers invalid payloads with 200
+        error = "invalid payload"
+    return Result(time.perf_counter() - started, status, error)
+
+
+async def run_load(
+    pool: ConnectionPool,
+    requests: List[Request],
+    duration: float,
+    concurrency: Optional[int] = None,
+    qps: Optional[float] = None,
+) -> Tuple[List[Result], float]:
+    """
+    Sends the requests (cycling through them) for `duration` seconds:
+    either by `concurrency` clients sending back to back (closed loop),
+    or at the fixed rate of `qps` requests per second (open loop).
+    In the latter case latency is measured from the scheduled send time,
+    so that a stalled server is not hidden by the delayed sends
+
+    :rtype `tuple` of the results and the elapsed time, seconds
+    """
+    results: List[Result] = []
+    started = time.perf_counter()
+    deadline = started + duration
+
+    if qps:
+        tasks = []
+        for i in range(int(duration * qps)):
+            scheduled = started + i / qps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            request = requests[i % len(requests)]
+            tasks.append(asyncio.ensure_future(send(pool, request, scheduled)))
+        results = list(await asyncio.gather(*tasks))
+        return results, time.perf_counter() - started
+
+    counter = iter(range(1 << 62))
+
+    async def client() -> None:
+        while time.perf_counter() < deadline:
+            request = requests[next(counter) % len(requests)]
+            results.append(await send(pool, request, time.perf_counter()))
+
+    await asyncio.gather(*(client() for _ in range(concurrency or 1)))
+    return results, time.perf_counter() - started
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    # nearest-rank percentile of sorted values
+    if not values:
+        return None
+    rank = max(int(-(-q * len(values) // 100)), 1)
+    return values[rank - 1]
+
+
+@dataclass
+class Report:
+    requests: int
+    errors: int
+    error_rate: float
+    throughput: float
+    latency_ms: Dict[str, Optional[float]]
+    error_kinds: Dict[str, int] = field(default_factory=dict)
+
+
+def summarize(results: List[Result], elapsed: float) -> Report:
+    latencies = sorted(1000 * result.latency for result in results)
+    errors = Counter(result.error for result in results if result.error)
+    total = len(results)
+    latency_ms = dict(
+        p50=percentile(latencies, 50),
+        p95=percentile(latencies, 95),
+        p99=percentile(latencies, 99),
+        max=latencies[-1] if latencies else None,
+        mean=sum(latencies) / total if total else None,
+    )
+    return Report(
+        requests=total,
+        errors=sum(errors.values()),
+        error_rate=sum(errors.values()) / total if total else 0.0,
+        throughput=total / elapsed if elapsed > 0 else 0.0,
+        latency_ms=latency_ms,
+        error_kinds=dict(errors),
+    )
+
+
+async def benchmark(
+    host: str,
+    port: int,
+    requests: List[Request],
+    duration: float,
+    warmup: float,
+    concurrency: Optional[int],
+    qps: Optional[float],
+    connections: int,
+    timeout: float,
+) -> Report:
+    pool = ConnectionPool(host, port, connections, timeout)
+    try:
+        if warmup > 0:
+            await run_load(pool, requests, warmup, concurrency, qps)
+        results, elapsed = await run_load(
+            pool, requests, duration, concurrency, qps
+        )
+    finally:
+        await pool.close()
+    return summarize(results, elapsed)
+
+
+def current_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@click.command()
+@click.option("-p", "--port", default=5000)
+@click.option("-h", "--host", default="127.0.0.1")
+@click.option("-d", "--data", default="data/payload.json")
+@click.option(
+    "-e",
+    "--endpoint",
+    default=PREDICT_ENDPOINT,
+    type=click.Choice([PREDICT_ENDPOINT, BATCH_ENDPOINT]),
+)
+@click.option("-r", "--replay", default=None, help="JSONL with requests")
+@click.option("--rows", default=1, help="Rows per synthetic request")
+@click.option("--unique", default=1000, help="Distinct synthetic requests")
+@click.option("--noise", default=0.05, help="Relative jitter of values")
+@click.option("--seed", default=0)
+@click.option("-c", "--concurrency", default=None, type=int)
+@click.option("-q", "--qps", default=None, type=float)
+@click.option("-t", "--duration", default=10.0, help="Seconds")
+@click.option("-w", "--warmup", default=2.0, help="Seconds")
+@click.option("--connections", default=None, type=int)
+@click.option("--timeout", default=10.0, help="Seconds")
+@click.option("-o", "--output", default=None, help="JSON report path")
+def main(
+    port,
+    host,
+    data,
+    endpoint,
+    replay,
+    rows,
+    unique,
+    noise,
+    seed,
+    concurrency,
+    qps,
+    duration,
+    warmup,
+    connections,
+    timeout,
+    output,
+):
+    if concurrency and qps:
+        raise click.UsageError("Set either --concurrency or --qps")
+    if not qps:
+        concurrency = concurrency or 1
+    connections = connections or concurrency or 64
+
+    if replay:
+        click.secho(f"Replays requests from {replay}", fg="yellow")
+        requests = replayed_requests(replay, endpoint)
+    else:
+        click.secho(f"Samples rows from {data}", fg="yellow")
+        requests = synthetic_requests(
+            data, endpoint, unique, rows, noise, seed
+        )
+
+    mode = f"{qps} QPS" if qps else f"concurrency {concurrency}"
+    target = f"{host}:{port}/{endpoint}"
+    click.secho(f"Runs {duration}s against {target} at {mode}", fg="green")
+    report = asyncio.run(
+        benchmark(
+            host,
+            port,
+            requests,
+            duration,
+            warmup,
+            concurrency,
+            qps,
+            connections,
+            timeout,
+        )
+    )
+
+    latency = ", ".join(
+        f"{key}={value:.2f}ms"
+        for key, value in report.latency_ms.items()
+        if value is not None
+    )
+    click.secho(f"Requests: {report.requests}, {latency}", fg="white")
+    click.secho(f"Throughput: {report.throughput:.1f} req/s", fg="white")
+    color = "red" if report.errors else "white"
+    errors = f"{report.error_rate:.2%} {report.error_kinds}"
+    click.secho(f"Errors: {errors}", fg=color)
+
+    if output:
+        run = dict(
+            commit=current_commit(),
+            timestamp=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            params=dict(
+                host=host,
+                port=port,
+                endpoint=endpoint,
+                replay=replay,
+                rows=rows,
+                unique=unique,
+                noise=noise,
+                seed=seed,
+                concurrency=concurrency,
+                qps=qps,
+                duration=duration,
+                warmup=warmup,
+                connections=connections,
+            ),
+            report=asdict(report),
+        )
+        with open(output, "w") as f:
+            json.dump(run, f, indent=2)
+        click.secho(f"Report saved to {output}", fg="green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import gc
+from os import environ, getenv, makedirs, remove, scandir
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+
+from app import default_logger
+from app.utils.memory import memory_usage
+
+log = default_logger("gunicorn.conf")
+
+# with preload enabled, the application (thus the model artifact,
+# schema and statistics) is loaded once in the master process
+# and shared with the forked workers via copy-on-write pages
+preload_app = getenv("PRELOAD_APP", "False") == "True"
+
+# workers write metrics into files in this directory and any of them
+# aggregates all the files on scrape (see `app.utils.metrics`);
+# must be set before the application is loaded, fresh one by default.
+# Files of the previous runs are removed here, before the application
+# (even the preloaded one) creates its own, so that counters start anew
+metrics_dir = None
+if "PROMETHEUS_MULTIPROC_DIR" in environ:
+    makedirs(environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+    for entry in scandir(environ["PROMETHEUS_MULTIPROC_DIR"]):
+        if entry.is_file() and entry.name.endswith(".db"):
+            remove(entry.path)
+else:
+    metrics_dir = mkdtemp(prefix="prometheus-")
+    environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+# resource locations set by the admin endpoint are shared by the workers
+# through this file (see `app.utils.reload`), fresh one by default
+state_dir = None
+if "RELOAD_STATE" not in environ:
+    state_dir = mkdtemp(prefix="reload-")
+    environ["RELOAD_STATE"] = join(state_dir, "locations.json")
+
+
+def format_usage(usage) -> str:
+    return ", ".join(f"{key}={value:.1f}MiB" for key, value in usage.items())
+
+
+def when_ready(server):
+    if preload_app:
+        # move startup objects into the permanent generation: otherwise
+        # the collector in workers would write to their headers and
+        # unshare the pages inherited from the master
+        gc.collect()
+        gc.freeze()
+        log.info(msg="Application preloaded, startup objects frozen")
+    log.info(msg=f"Master memory usage: {format_usage(memory_usage())}")
+
+
+def post_worker_init(worker):
+    usage = format_usage(memory_usage())
+    log.info(msg=f"Worker {worker.pid} memory usage: {usage}")
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    # in-flight gauges of the exited worker are dropped,
+    # its counters and histograms are still reported
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    # temporary directories created above
+    for directory in (metrics_dir, state_dir):
+        if directory is not None:
+            rmtree(directory, ignore_errors=True)
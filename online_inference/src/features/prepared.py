@@ -0,0 +1,158 @@
+from dataclasses import asdict, dataclass
+from os.path import isfile, join
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from ..data import read_dataset
+from ..data.datautils import file_digest
+from ..settings.params import DatasetConfig, FeaturesConfig, SplitConfig
+
+from .bundle import BUNDLE_VERSION, bundle_metadata
+from .cache import UNKEYED_FIELDS, PickleCache, library_versions
+from .extract import extract_feature_columns, extract_target, split_data
+from .preprocessing import Preprocessor
+
+
+log = logging.getLogger(__name__)
+
+PREPARED_CACHE_MAX_SIZE = 1 << 32
+
+
+@dataclass
+class PreparedData:
+    """
+    Train/validation split with the preprocessor fitted
+    on the train part and both parts transformed by it,
+    `bundle` is the schema and statistics of the train part
+    (see `bundle_metadata`)
+    """
+
+    preprocessor: Preprocessor
+    train_features: np.ndarray
+    train_target: pd.Series
+    val_raw_features: pd.DataFrame
+    val_features: np.ndarray
+    val_target: pd.Series
+    bundle: Dict[str, Any]
+
+
+def data_fingerprint(
+    dataset: DatasetConfig,
+    splitter: SplitConfig,
+    feature: FeaturesConfig,
+    digest: Optional[str] = None,
+) -> str:
+    """
+    Digest of everything the prepared data depends on: contents
+    of the dataset file, its schema, split and feature settings and
+    the library versions. Download options and paths do not affect it
+
+    :param digest, str (default None) - SHA-256 of the dataset file,
+    if already computed
+    """
+    dataset_path = f"{dataset.dataset_dir}/{dataset.dataset_filename}"
+    schema = dict(
+        column_names=dataset.column_names,
+        header=dataset.header,
+        float_dtype=dataset.float_dtype,
+    )
+    features = {
+        k: v for k, v in asdict(feature).items() if k not in UNKEYED_FIELDS
+    }
+    settings = json.dumps(
+        [
+            schema,
+            asdict(splitter),
+            features,
+            BUNDLE_VERSION,
+            library_versions(),
+        ],
+        sort_keys=True,
+        default=str,
+    )
+    digest = digest or file_digest(dataset_path)
+    return hashlib.sha256((digest + settings).encode()).hexdigest()
+
+
+def prepare_data(
+    dataset: DatasetConfig,
+    splitter: SplitConfig,
+    feature: FeaturesConfig,
+    cache_dir: Optional[str] = None,
+    cache_max_size: int = PREPARED_CACHE_MAX_SIZE,
+) -> PreparedData:
+    """
+    Reads and splits the dataset, fits the preprocessor and transforms
+    both parts. If `cache_dir` is set, the result is cached in its
+    `prepared` subdirectory under `data_fingerprint`, so runs differing
+    in estimator settings only skip all of these steps. When the total
+    size of the cached entries exceeds `cache_max_size`, least recently
+    used ones are evicted. The dataset file is hashed once for this
+    cache, the dataset cache and the fitted transformer cache
+
+    :param dataset, DatasetConfig
+    :param splitter, SplitConfig
+    :param feature, FeaturesConfig
+    :param cache_dir, str (default None) - directory for the cache
+    :param cache_max_size, int - max total size of the entries, bytes
+
+    :rtype PreparedData
+    """
+    dataset_path = f"{dataset.dataset_dir}/{dataset.dataset_filename}"
+    caches = (cache_dir, dataset.cache_dir, feature.cache_dir)
+    digest = fingerprint = None
+    if isfile(dataset_path) and any(c is not None for c in caches):
+        digest = file_digest(dataset_path)
+        fingerprint = data_fingerprint(dataset, splitter, feature, digest)
+
+    cache = None
+    if cache_dir is not None:
+        cache = PickleCache(
+            join(cache_dir, "prepared"), cache_max_size, prefix="prepared"
+        )
+        cached = cache.load(fingerprint) if fingerprint else None
+        if cached is not None:
+            log.info(msg=f"Loaded prepared data {fingerprint[:16]}")
+            return cached
+
+    raw_data = read_dataset(dataset, feature, digest)
+    log.info(msg=f"Loaded dataset: {raw_data.shape}")
+    log.debug(msg=f"Dataset columns: {raw_data.columns.to_list()}")
+
+    feature_columns = feature.numeric_features + feature.categorical_features
+    target = extract_target(raw_data, feature.target)
+    features = extract_feature_columns(raw_data, feature_columns)
+
+    log.info(msg="Splitting the dataset")
+    train_features, val_features, train_y, val_y = split_data(
+        features, target, splitter
+    )
+    log.debug(msg=f"Train set: {train_features.shape}: {train_y.shape}")
+    log.debug(msg=f"Val set: {val_features.shape}: {val_y.shape}")
+
+    preprocessor = Preprocessor(feature)
+    log.info(msg="Built preprocessor")
+    log.debug(msg=f"\n{preprocessor}")
+
+    prepared = PreparedData(
+        preprocessor=preprocessor,
+        # the train part is identified by the fingerprint
+        train_features=preprocessor.fit_transform(
+            train_features, data_key=fingerprint
+        ),
+        train_target=train_y,
+        val_raw_features=val_features,
+        val_features=preprocessor.transform(val_features),
+        val_target=val_y,
+        bundle=bundle_metadata([train_features], feature),
+    )
+
+    if cache is not None and fingerprint is not None:
+        cache.store(fingerprint, prepared)
+        log.info(msg=f"Prepared data cached as {fingerprint[:16]}")
+    return prepared
@@ -4,7 +4,9 @@ import logging
 import pandas as pd
 
 from sklearn.pipeline import Pipeline, make_pipeline
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.utils.fixes import parse_version
+import sklearn
 from sklearn.ensemble import (
     GradientBoostingClassifier,
     HistGradientBoostingClassifier,
@@ -18,6 +20,7 @@ log = logging.getLogger(__name__)
 
 Estimator = Union[
     LogisticRegression,
+    SGDClassifier,
     RandomForestClassifier,
     GradientBoostingClassifier,
     HistGradientBoostingClassifier,
@@ -28,8 +31,19 @@ IMPLEMENTED_MODELS = dict(
     RandomForest=RandomForestClassifier,
     Boosting=GradientBoostingClassifier,
     HistBoosting=HistGradientBoostingClassifier,
+    SGD=SGDClassifier,
 )
 
+# logistic loss was renamed in scikit-learn 1.1
+LOG_LOSS = (
+    "log_loss"
+    if parse_version(sklearn.__version__) >= parse_version("1.1")
+    else "log"
+)
+
+# defaults overridable by `model_params`
+MODEL_DEFAULTS = dict(SGD=dict(loss=LOG_LOSS))
+
 
 def make_estimator(
     features: pd.DataFrame, target: pd.Series, params: EstimatorConfig
@@ -45,6 +59,20 @@ def make_estimator(
     (see `IMPLEMENTED_MODELS`)
     :param model_kwds, Dict[str, Any] - keywords to build a model
 
+    :rtype Estimator, model instance
+    """
+    model = build_estimator(params)
+    log.debug(msg=f"Fitting {type(model)}")
+    model.fit(features, target)
+    log.debug(msg="Fitting complete")
+    return model
+
+
+def build_estimator(params: EstimatorConfig) -> Estimator:
+    """
+    Instantiates an unfitted estimator of `params.model_type`
+    with `MODEL_DEFAULTS` updated by `params.model_params`
+
     :rtype Estimator, model instance
     """
     log.debug(msg="Creating estimator")
@@ -54,15 +82,16 @@ def make_estimator(
         raise ValueError(error_message)
     try:
         model = IMPLEMENTED_MODELS[params.model_type]
-        model = model(**params.model_params)
+        return model(
+            **{
+                **MODEL_DEFAULTS.get(params.model_type, {}),
+                **params.model_params,
+            }
+        )
     except (ValueError, TypeError) as e:
         log.error(msg="Invalid model args")
         log.error(msg=f"{e}")
         raise e
-    log.debug(msg=f"Fitting {type(model)}")
-    model.fit(features, target)
-    log.debug(msg="Fitting complete")
-    return model
 
 
 def make_inference_pipeline(
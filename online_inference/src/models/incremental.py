@@ -0,0 +1,117 @@
+from typing import Any, Callable, Dict, Iterable, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from sklearn.pipeline import Pipeline
+
+from ..features.bundle import bundle_metadata
+from ..features.incremental import fit_incremental_preprocessor, stream_split
+from ..features.preprocessing import Preprocessor
+from ..settings.params import (
+    DatasetConfig,
+    EstimatorConfig,
+    FeaturesConfig,
+    SplitConfig,
+)
+from .classifier import Estimator, build_estimator, make_inference_pipeline
+from .utils import Report, get_metrics
+
+
+log = logging.getLogger(__name__)
+
+Batches = Callable[[], Iterable[Tuple[pd.DataFrame, pd.Series]]]
+
+
+def fit_incremental(
+    preprocessor: Preprocessor, batches: Batches, params: EstimatorConfig
+) -> Estimator:
+    """
+    Fits the estimator with `partial_fit` on the preprocessed chunks
+    for `params.epochs` passes, rows of each chunk are shuffled
+    on every pass. Classes are `params.neg_label` and `params.pos_label`
+
+    :param preprocessor, Preprocessor - fitted preprocessor
+    :param batches, Callable - returns an iterable of features
+    and target chunks, called once per epoch
+    :param params, EstimatorConfig - estimator supporting `partial_fit`,
+    e.g. `SGD`
+
+    :rtype Estimator, fitted model
+    """
+    model = build_estimator(params)
+    if not hasattr(model, "partial_fit"):
+        error_message = (
+            f"Model can not be fitted incrementally: {params.model_type}"
+        )
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    classes = np.unique([params.neg_label, params.pos_label])
+    rng = np.random.default_rng(params.random_state)
+    for epoch in range(params.epochs):
+        log.debug(msg=f"Epoch {epoch + 1}/{params.epochs}")
+        for features, target in batches():
+            order = rng.permutation(len(target))
+            model.partial_fit(
+                preprocessor.transform(features)[order],
+                target.to_numpy()[order],
+                classes=classes,
+            )
+    log.debug(msg="Fitting complete")
+    return model
+
+
+def train_incremental(
+    dataset: DatasetConfig,
+    splitter: SplitConfig,
+    feature: FeaturesConfig,
+    estimator: EstimatorConfig,
+) -> Tuple[Pipeline, Report, Dict[str, Any]]:
+    """
+    Out-of-core counterpart of the training pipeline: the dataset
+    is streamed by `dataset.chunk_size` rows (see `stream_split`)
+    through the incrementally fitted preprocessor and estimator,
+    only the labels of the validation part are kept in memory
+
+    :param dataset, DatasetConfig
+    :param splitter, SplitConfig
+    :param feature, FeaturesConfig
+    :param estimator, EstimatorConfig
+
+    :rtype Tuple[Pipeline, Report, Dict], same pipeline as built
+    by `make_inference_pipeline`, validation metrics
+    and `bundle_metadata` of the train part
+    """
+    def batches() -> Iterable[Tuple[pd.DataFrame, pd.Series]]:
+        return stream_split(dataset, splitter, feature)
+
+    log.info(msg=f"Training on chunks of {dataset.chunk_size} rows")
+    preprocessor = fit_incremental_preprocessor(
+        feature, lambda: (features for features, _ in batches())
+    )
+    log.info(msg="Fitted preprocessor")
+    log.debug(msg=f"\n{preprocessor}")
+
+    model = fit_incremental(preprocessor, batches, estimator)
+    pipeline = make_inference_pipeline(preprocessor, model)
+
+    targets, predictions = [], []
+    for features, target in stream_split(
+        dataset, splitter, feature, validation=True
+    ):
+        targets.append(target.to_numpy())
+        predictions.append(pipeline.predict(features))
+    if not targets:
+        error_message = "Validation part is empty"
+        log.error(msg=error_message)
+        raise ValueError(error_message)
+
+    metrics = get_metrics(
+        np.concatenate(targets), np.concatenate(predictions), estimator
+    )
+    bundle = bundle_metadata(
+        (features for features, _ in batches()), feature
+    )
+    return pipeline, metrics, bundle
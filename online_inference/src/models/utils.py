@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Dict, Optional
 import json
 import pickle
 import logging
@@ -15,6 +16,13 @@ from sklearn.metrics import (
 )
 
 from ..settings.params import EstimatorConfig
+from .artifact import (
+    ARTIFACT_SUFFIX,
+    dump_artifact,
+    is_artifact,
+    load_artifact,
+)
+from .writers import ScoredChunk, make_writer
 
 
 log = logging.getLogger(__name__)
@@ -52,10 +60,20 @@ def get_metrics(
     return Report(**metrics)
 
 
-def dump_pipeline(pipeline: Pipeline, dump_to: str) -> None:
+def dump_pipeline(
+    pipeline: Pipeline, dump_to: str, metadata: Optional[Dict] = None
+) -> None:
+    # paths with `ARTIFACT_SUFFIX` get the memory-mappable format
+    # carrying `metadata` in the header, plain pickle otherwise
     log.debug(msg=f"Serializing model to {dump_to}")
+    if metadata and not dump_to.endswith(ARTIFACT_SUFFIX):
+        log.warning(msg=f"Metadata is only stored in {ARTIFACT_SUFFIX} files")
 
     try:
+        if dump_to.endswith(ARTIFACT_SUFFIX):
+            dump_artifact(pipeline, dump_to, metadata)
+            log.debug(msg="Dump complete")
+            return
         with open(dump_to, "wb+") as f:
             pickle.dump(pipeline, f)
     except (FileNotFoundError, pickle.PicklingError) as e:
@@ -70,18 +88,26 @@ def load_pipeline(load_from: str) -> Pipeline:
     log.debug(msg=f"Loading model from {load_from}")
 
     try:
+        if is_artifact(load_from):
+            model = load_artifact(load_from)
+            log.debug(msg="Successfully mapped model artifact")
+            return model
         with open(load_from, "rb") as f:
             model = pickle.load(f)
             log.debug(msg="Successfully loaded model")
             return model
-    except (FileNotFoundError, pickle.UnpicklingError) as e:
+    except (FileNotFoundError, ValueError, pickle.UnpicklingError) as e:
         log.error(msg="Failed to deserialize model")
         log.error(msg=f"{e}")
         raise e
 
 
 def dump_prediction(prediction: np.ndarray, path: str) -> None:
+    # output format is chosen by the file extension
     log.debug(msg=f"Writing predictions to {path}")
-    with open(path, "w+") as f:
-        json.dump(tuple(prediction), f)
+    with make_writer(path) as writer:
+        prediction = np.asarray(prediction)
+        writer.write(
+            ScoredChunk(prediction=prediction, classes=np.unique(prediction))
+        )
     log.debug(msg="Predictions saved")
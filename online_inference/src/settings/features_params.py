@@ -8,6 +8,9 @@ class FeaturesConfig:
     target: str
     PCA_components: Optional[int] = None
     PCA_kernel: Optional[str] = "linear"
+    PCA_solver: str = "auto"
+    PCA_batch_size: Optional[int] = None
+    nystroem_components: int = 100
     scaler_type: str = "standard"
     encoder_type: str = "ohe"
     features_to_drop: List[str] = field(default_factory=lambda: [])
@@ -15,3 +18,5 @@ class FeaturesConfig:
     numeric_features: List[str] = field(default_factory=lambda: list(FEATURES))
     numeric_imputer_strategy: str = "mean"
     random_state: int = 42
+    cache_dir: Optional[str] = None
+    cache_max_size: int = 1 << 30
@@ -5,7 +5,13 @@ from os.path import isdir
 import pytest
 
 from . import TMP_DIR_NAME, SAMPLE_PICKLE_PATH, SAMPLE_PREDICTION_REQUEST
-from .mocks import testing_artifact, testing_stats, testing_schema
+from .mocks import (
+    testing_artifact,
+    testing_compiled_artifact,
+    testing_mapped_artifact,
+    testing_stats,
+    testing_schema,
+)
 
 
 @pytest.fixture
@@ -83,6 +89,46 @@ def tmp_application_config(table_format: Dict[str, str]) -> Dict[str, str]:
         remove(file)
 
 
+@pytest.fixture
+def compiled_application_config(
+    testing_application_config: Dict[str, str]
+) -> Dict[str, str]:
+    """
+    Same as `testing_application_config`, but the sample
+    artifact is compiled into NumPy-only form first
+
+    :rtype: Dict[str, str] - keyword-arguments for AppConfig
+    """
+    tmp = TMP_DIR_NAME
+    mkdir(tmp) if not isdir(tmp) else None
+
+    artifact_path = testing_compiled_artifact(
+        SAMPLE_PICKLE_PATH, "tmp/compiled-artifact.pkl"
+    )
+    yield dict(testing_application_config, artifact_path=artifact_path)
+    remove(artifact_path)
+
+
+@pytest.fixture
+def mapped_application_config(
+    testing_application_config: Dict[str, str]
+) -> Dict[str, str]:
+    """
+    Same as `testing_application_config`, but the sample
+    artifact is stored in the memory-mappable format
+
+    :rtype: Dict[str, str] - keyword-arguments for AppConfig
+    """
+    tmp = TMP_DIR_NAME
+    mkdir(tmp) if not isdir(tmp) else None
+
+    artifact_path = testing_mapped_artifact(
+        SAMPLE_PICKLE_PATH, "tmp/artifact.mlpkg"
+    )
+    yield dict(testing_application_config, artifact_path=artifact_path)
+    remove(artifact_path)
+
+
 @pytest.fixture
 def testing_payload() -> str:
     with open(SAMPLE_PREDICTION_REQUEST) as f:
@@ -1,10 +1,18 @@
+import hashlib
 import json
 import pickle
-from typing import Dict
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Dict, Iterator, Optional, Tuple
 
 from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import RobustScaler
 
+from src.models.artifact import dump_artifact
+from src.models.compiled import compile_pipeline
+
 
 def testing_artifact(filename: str) -> str:
     pipe = make_pipeline(RobustScaler())
@@ -13,6 +21,28 @@ def testing_artifact(filename: str) -> str:
     return filename
 
 
+def testing_compiled_artifact(source: str, filename: str) -> str:
+    with open(source, "rb") as f:
+        pipe = pickle.load(f)
+    with open(filename, "wb+") as f:
+        pickle.dump(compile_pipeline(pipe), f)
+    return filename
+
+
+def testing_mapped_artifact(
+    source: str, filename: str, metadata: Optional[Dict] = None
+) -> str:
+    with open(source, "rb") as f:
+        pipe = pickle.load(f)
+    dump_artifact(pipe, filename, metadata=metadata or dict(source=source))
+    return filename
+
+
+def testing_bundle(schema: str, stats: str, version: int = 1) -> Dict:
+    with open(schema) as f, open(stats) as g:
+        return dict(bundle=version, schema=json.load(f), stats=json.load(g))
+
+
 def testing_stats(filename: str) -> str:
     stats = {"mean": [0], "std": [1]}
     with open(filename, "w+") as f:
@@ -24,3 +54,85 @@ def testing_schema(filename: str, schema: Dict[str, str]) -> str:
     with open(filename, "w+") as f:
         json.dump(schema, f)
     return filename
+
+
+class ResourceHandler(BaseHTTPRequestHandler):
+    """
+    Serves `server.resources` with ETags, the first
+    `server.failures` requests are answered with 503
+    and every response is delayed by `server.delay` seconds
+    """
+
+    def do_HEAD(self) -> None:
+        stats = self.server.stats
+        stats["head"] = stats.get("head", 0) + 1
+        content = self.server.resources.get(self.path)
+        if content is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", resource_etag(content))
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        server, stats = self.server, self.server.stats
+        stats["requests"] = stats.get("requests", 0) + 1
+        time.sleep(server.delay)
+        if server.failures > 0:
+            server.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        content = server.resources.get(self.path)
+        if content is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        etag = resource_etag(content)
+        if self.headers["If-None-Match"] == etag:
+            stats["not_modified"] = stats.get("not_modified", 0) + 1
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        try:
+            self.wfile.write(content)
+        except ConnectionError:
+            # the client has given up waiting
+            pass
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def resource_etag(content: bytes) -> str:
+    return f'"{hashlib.sha256(content).hexdigest()[:16]}"'
+
+
+@contextmanager
+def serve_resources(
+    resources: Dict[str, bytes], failures: int = 0, delay: float = 0
+) -> Iterator[Tuple[str, Dict]]:
+    """
+    Runs a local HTTP server in a background thread, yields its base
+    url and the dict with the number of requests served
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ResourceHandler)
+    server.resources, server.stats = resources, {}
+    server.failures, server.delay = failures, delay
+    thread = Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    try:
+        host, port = server.server_address
+        yield f"http://{host}:{port}", server.stats
+    finally:
+        server.shutdown()
+        server.server_close()
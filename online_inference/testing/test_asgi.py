@@ -0,0 +1,162 @@
+import asyncio
+import json
+from typing import Dict, List, Tuple
+from urllib.parse import urlencode
+
+import pytest
+
+from app import AppConfig, make_asgi_app
+from . import artifact_present
+
+
+def call(
+    app,
+    method: str,
+    path: str,
+    query: Dict = None,
+    body: bytes = b"",
+    headers: Dict[str, str] = None,
+) -> Tuple[int, bytes]:
+    """
+    Drives the ASGI callable the way a server would
+    and collects status code and body of the response
+    """
+    scope = dict(
+        type="http",
+        method=method,
+        path=path,
+        query_string=urlencode(query or {}).encode(),
+        headers=[
+            (key.lower().encode(), value.encode())
+            for key, value in (headers or {}).items()
+        ],
+    )
+    sent: List[Dict] = []
+
+    async def receive():
+        return dict(type="http.request", body=body, more_body=False)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start, content = sent
+    return start["status"], content["body"]
+
+
+def test_asgi_invalid_startup(invalid_application_config):
+    app = make_asgi_app(AppConfig(**invalid_application_config))
+
+    status, body = call(app, "GET", "/health")
+    assert status == 400
+    assert b"Bad request" in body
+
+    status, _ = call(app, "GET", "/predict", {"payload": "[]"})
+    assert status == 302
+
+    status, _ = call(app, "GET", "/missing")
+    assert status == 404
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_asgi_predict(testing_application_config, testing_payload):
+    app = make_asgi_app(AppConfig(**testing_application_config))
+
+    status, body = call(app, "GET", "/health")
+    assert status == 200
+    assert b"Healthy" in body
+
+    status, body = call(app, "GET", "/predict", {"payload": testing_payload})
+    assert status == 200
+    assert body.startswith(b'{"prediction":[')
+
+    # same prediction is served via batch endpoint
+    status, batch_body = call(
+        app, "POST", "/predict/batch", body=testing_payload.encode()
+    )
+    assert status == 200
+    assert json.loads(batch_body) == json.loads(body)
+
+    for query in ({}, {"payload": "not json"}, {"payload": "[{}]"}):
+        status, body = call(app, "GET", "/predict", query)
+        assert status == 200
+        assert body == b'{"prediction":null}'
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_asgi_concurrent_requests(testing_application_config, testing_payload):
+    settings = AppConfig(
+        **testing_application_config,
+        executor_workers=2,
+        executor_max_pending=2,
+    )
+    app = make_asgi_app(settings)
+    query_string = urlencode({"payload": testing_payload}).encode()
+
+    async def request() -> bytes:
+        sent = []
+
+        async def receive():
+            return dict(type="http.request", body=b"", more_body=False)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = dict(
+            type="http",
+            method="GET",
+            path="/predict",
+            query_string=query_string,
+        )
+        await app(scope, receive, send)
+        return sent[-1]["body"]
+
+    async def main() -> List[bytes]:
+        return await asyncio.gather(*(request() for _ in range(32)))
+
+    bodies = asyncio.run(main())
+    assert len(set(bodies)) == 1
+    assert bodies[0].startswith(b'{"prediction":[')
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_asgi_cache_stats(testing_application_config, testing_payload):
+    app = make_asgi_app(AppConfig(**testing_application_config))
+    rows = len(json.loads(testing_payload))
+    for _ in range(2):
+        call(app, "GET", "/predict", {"payload": testing_payload})
+
+    # same document as the one of the WSGI app
+    status, body = call(app, "GET", "/cache")
+    assert status == 200
+    stats = json.loads(body)["cache"]
+    assert (stats["misses"], stats["hits"]) == (rows, rows)
+
+    settings = AppConfig(**testing_application_config, prediction_cache_size=0)
+    _, body = call(make_asgi_app(settings), "GET", "/cache")
+    assert json.loads(body) == dict(cache=None)
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_asgi_body_limit(testing_application_config, testing_payload):
+    settings = AppConfig(
+        **testing_application_config,
+        max_content_length=len(testing_payload),
+    )
+    app = make_asgi_app(settings)
+    status, _ = call(
+        app, "POST", "/predict/batch", body=testing_payload.encode()
+    )
+    assert status == 200
+
+    body = f" {testing_payload}".encode()
+    # announced by the header or found out while reading
+    for headers in ({"Content-Length": str(len(body))}, {}):
+        status, _ = call(
+            app, "POST", "/predict/batch", body=body, headers=headers
+        )
+        assert status == 413
+        status, _ = call(
+            app, "POST", "/admin/reload", body=body, headers=headers
+        )
+        assert status == 413
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from app import AppConfig, make_app
+from bench import (
+    BATCH_ENDPOINT,
+    Result,
+    benchmark,
+    make_request,
+    percentile,
+    replayed_requests,
+    summarize,
+    synthetic_requests,
+)
+from . import SAMPLE_PREDICTION_REQUEST, artifact_present
+
+
+@pytest.fixture
+def testing_server(testing_application_config):
+    app = make_app(AppConfig(**testing_application_config))
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_port
+    server.shutdown()
+    thread.join()
+
+
+def test_summarize():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+
+    results = [Result(0.001 * i, 200) for i in range(1, 10)]
+    results.append(Result(0.1, 500, "HTTP 500"))
+    report = summarize(results, elapsed=2)
+    assert report.requests == 10
+    assert report.throughput == 5
+    assert report.error_rate == 0.1
+    assert report.error_kinds == {"HTTP 500": 1}
+    assert report.latency_ms["p50"] == pytest.approx(5)
+    assert report.latency_ms["max"] == pytest.approx(100)
+
+
+def test_workloads(tmp_path):
+    requests = synthetic_requests(
+        SAMPLE_PREDICTION_REQUEST, "predict", 3, 2, 0.05, seed=0
+    )
+    same = synthetic_requests(
+        SAMPLE_PREDICTION_REQUEST, "predict", 3, 2, 0.05, seed=0
+    )
+    # the workload is reproducible, yet its requests are distinct
+    assert requests == same
+    assert len({r.path for r in requests}) == 3
+    assert all(r.method == "GET" for r in requests)
+
+    path = tmp_path / "requests.jsonl"
+    with open(SAMPLE_PREDICTION_REQUEST) as f:
+        payload = json.load(f)
+    record = dict(payload=payload, endpoint=BATCH_ENDPOINT)
+    path.write_text(f"{json.dumps(payload)}\n\n{json.dumps(record)}\n")
+    single, batch = replayed_requests(str(path), "predict")
+    assert single.path.startswith("/predict?payload=")
+    assert (batch.method, batch.path) == ("POST", "/predict/batch")
+    assert json.loads(batch.body) == payload
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+@pytest.mark.parametrize(
+    "endpoint, load",
+    [
+        ("predict", dict(concurrency=4, qps=None)),
+        (BATCH_ENDPOINT, dict(concurrency=None, qps=50)),
+    ],
+)
+def test_benchmark(testing_server, endpoint, load):
+    requests = synthetic_requests(
+        SAMPLE_PREDICTION_REQUEST, endpoint, 20, 3, 0.05, seed=0
+    )
+    report = asyncio.run(
+        benchmark(
+            "127.0.0.1",
+            testing_server,
+            requests,
+            duration=0.5,
+            warmup=0.1,
+            connections=4,
+            timeout=5,
+            **load,
+        )
+    )
+    assert report.requests > 0
+    assert report.errors == 0, report.error_kinds
+    assert report.throughput > 0
+    latency = report.latency_ms
+    assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"]
+    assert latency["p99"] <= latency["max"]
+
+
+def test_benchmark_unreachable():
+    requests = synthetic_requests(
+        SAMPLE_PREDICTION_REQUEST, "predict", 1, 1, 0, seed=0
+    )
+    # nothing listens on the port
+    report = asyncio.run(
+        benchmark("127.0.0.1", 1, requests, 0.1, 0, 1, None, 1, 1)
+    )
+    assert report.error_rate == 1
+    assert "ConnectionRefusedError" in report.error_kinds
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_benchmark_invalid_payloads(testing_server):
+    requests = [
+        make_request("predict", [{"unknown": 1}]),
+        make_request(BATCH_ENDPOINT, [{"unknown": 1}]),
+    ]
+    report = asyncio.run(
+        benchmark("127.0.0.1", testing_server, requests, 0.2, 0, 2, None, 2, 5)
+    )
+    # answered with 200, yet counted as errors
+    assert report.error_rate == 1
+    assert set(report.error_kinds) == {"invalid payload"}
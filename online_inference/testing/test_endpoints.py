@@ -51,3 +51,78 @@ def test_predict_endpoint(
         assert b"prediction" in response.data
         assert b'"prediction":null' not in response.data
         assert b'{"prediction":[' in response.data
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_batch_predict_endpoint(testing_application_config, testing_payload):
+    app = make_app(AppConfig(**testing_application_config))
+    records = json.loads(testing_payload) * 50
+    columns = {key: [row[key] for row in records] for key in records[0]}
+
+    def post(body):
+        # note: test client would sort the keys if `json=` was used,
+        # while the column order is a part of the schema
+        return c.post(
+            "/predict/batch",
+            data=json.dumps(body),
+            content_type="application/json",
+        )
+
+    with app.test_client() as c:
+        # both record and columnar layouts should yield
+        # the same predictions in the same order
+        by_records = post(records).get_json()
+        by_columns = post(columns).get_json()
+
+        assert len(by_records["prediction"]) == len(records)
+        assert by_records == by_columns
+
+        # malformed bodies are answered with null prediction
+        invalid_bodies = (
+            dict(data="not json", content_type="application/json"),
+            dict(json={"radius_mean": 1.0}),
+            dict(json={"radius_mean": [1.0], "texture_mean": [1.0, 2.0]}),
+            dict(json=[{"invalid_entry": "invalid value"}]),
+        )
+        for body in invalid_bodies:
+            response = c.post("/predict/batch", **body)
+            assert response.status_code == 200
+            assert b'"prediction":null' in response.data
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_compiled_artifact(
+    testing_application_config, compiled_application_config, testing_payload
+):
+    query_string = {"payload": testing_payload}
+    responses = []
+
+    for config in (testing_application_config, compiled_application_config):
+        app = make_app(AppConfig(**config))
+        with app.test_client() as c:
+            assert c.get("/health").status_code == 200
+            responses.append(c.get("/predict", query_string=query_string).data)
+
+    # compiled artifact should be served the same way
+    original, compiled = responses
+    assert b'{"prediction":[' in compiled
+    assert original == compiled
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_mapped_artifact(
+    testing_application_config, mapped_application_config, testing_payload
+):
+    query_string = {"payload": testing_payload}
+    responses = []
+
+    for config in (testing_application_config, mapped_application_config):
+        app = make_app(AppConfig(**config))
+        with app.test_client() as c:
+            assert c.get("/health").status_code == 200
+            responses.append(c.get("/predict", query_string=query_string).data)
+
+    # memory-mapped artifact should predict the same
+    original, mapped = responses
+    assert b'{"prediction":[' in mapped
+    assert original == mapped
@@ -0,0 +1,163 @@
+import json
+import threading
+import time
+from dataclasses import replace
+
+import pytest
+import requests
+
+from app import make_app, AppConfig
+from app.utils.fetch import ResourceFetcher
+from app.utils.inference import load_bundle, validate_artifact
+from . import artifact_present, SAMPLE_PICKLE_PATH
+from . import mocks
+from .mocks import serve_resources
+
+
+def test_fetch_local(tmp_path):
+    fetcher = ResourceFetcher(cache_dir=str(tmp_path))
+    path = "configs/statistics.json"
+    assert fetcher.fetch(path) == path
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_fetch_without_cache():
+    fetcher = ResourceFetcher(retries=0)
+    with serve_resources({"/a": b"content"}) as (base, stats):
+        assert fetcher.fetch(f"{base}/a") == b"content"
+        with pytest.raises(requests.HTTPError):
+            fetcher.fetch(f"{base}/missing")
+
+
+def test_fetch_cached(tmp_path):
+    fetcher = ResourceFetcher(cache_dir=str(tmp_path), backoff=0)
+    resources = {"/a": b"content"}
+    with serve_resources(resources) as (base, stats):
+        path = fetcher.fetch(f"{base}/a")
+        assert fetcher.read(f"{base}/a") == b"content"
+        # cached copy is revalidated by ETag
+        assert fetcher.fetch(f"{base}/a") == path
+        assert stats["not_modified"] == 2
+
+        resources["/a"] = b"updated"
+        assert fetcher.read(f"{base}/a") == b"updated"
+        assert stats["requests"] == 4
+
+        # corrupted copy is fetched again
+        with open(path, "wb") as f:
+            f.write(b"garbage")
+        assert fetcher.read(f"{base}/a") == b"updated"
+        assert stats["not_modified"] == 2
+
+    # the host is gone: cached copy is served
+    assert fetcher.read(f"{base}/a") == b"updated"
+    with pytest.raises(requests.RequestException):
+        fetcher.read(f"{base}/b")
+
+
+def test_fetch_retries():
+    with serve_resources({"/a": b"content"}, failures=2) as (base, stats):
+        assert ResourceFetcher(backoff=0).fetch(f"{base}/a") == b"content"
+        assert stats["requests"] == 3
+
+    with serve_resources({"/a": b"content"}, failures=2) as (base, stats):
+        with pytest.raises(requests.RequestException):
+            ResourceFetcher(retries=1, backoff=0).fetch(f"{base}/a")
+        assert stats["requests"] == 2
+
+
+def test_fetch_timeout():
+    fetcher = ResourceFetcher(timeout=0.1, retries=0)
+    with serve_resources({"/a": b"content"}, delay=1) as (base, _):
+        started = time.monotonic()
+        with pytest.raises(requests.RequestException):
+            fetcher.fetch(f"{base}/a")
+        assert time.monotonic() - started < 0.9
+
+
+@pytest.mark.skipif(not artifact_present, reason="Model pickle not found")
+def test_concurrent_startup(testing_application_config, tmp_path):
+    with open(SAMPLE_PICKLE_PATH, "rb") as f:
+        artifact = f.read()
+    resources = {"/artifact.pkl": artifact}
+    for name in ("table_schema_path", "feature_stats_path"):
+        with open(testing_application_config[name], "rb") as f:
+            resources[f"/{name}"] = f.read()
+
+    delay = 0.3
+    with serve_resources(resources, delay=delay) as (base, stats):
+        config = AppConfig(
+            artifact_path=f"{base}/artifact.pkl",
+            table_schema_path=f"{base}/table_schema_path",
+            feature_stats_path=f"{base}/feature_stats_path",
+            fetch_cache_dir=str(tmp_path),
+        )
+        started = time.monotonic()
+        app = make_app(config)
+        elapsed = time.monotonic() - started
+        assert app.config["HEALTHY"]
+        # resources are fetched at the same time
+        assert stats["requests"] == 3
+        assert elapsed < 2 * delay
+
+        # restart revalidates the cached copies
+        make_app(config)
+        assert stats["not_modified"] == 3
+
+    stats = json.loads(resources["/feature_stats_path"])
+    assert list(app.config["STATS"][0]) == stats["mean"]
+
+
+@pytest.mark.skipif(not artifact_present, reason="Model pickle not found")
+def test_bundled_startup_fetches(testing_application_config, tmp_path):
+    bundle = mocks.testing_bundle(
+        testing_application_config["table_schema_path"],
+        testing_application_config["feature_stats_path"],
+    )
+    artifact_path = str(tmp_path / "bundle.mlpkg")
+    mocks.testing_mapped_artifact(SAMPLE_PICKLE_PATH, artifact_path, bundle)
+    with open(artifact_path, "rb") as f:
+        resources = {"/bundle.mlpkg": f.read(), "/schema": b"{}"}
+
+    with serve_resources(resources, delay=0.2) as (base, stats):
+        remote = dict(
+            table_schema_path=f"{base}/schema",
+            feature_stats_path=f"{base}/stats",
+        )
+        # the header of the local artifact tells it has the bundle
+        app = make_app(AppConfig(artifact_path=artifact_path, **remote))
+        assert app.config["HEALTHY"]
+        assert stats.get("requests", 0) == 0
+
+        # remote one is fetched along with the other resources,
+        # which are not left running once the bundle is found
+        config = AppConfig(artifact_path=f"{base}/bundle.mlpkg", **remote)
+        app = make_app(config)
+        assert app.config["HEALTHY"]
+        assert not any(
+            thread.name.startswith("startup")
+            for thread in threading.enumerate()
+        )
+
+        # cached copy is checked before the other resources are fetched
+        config = replace(config, fetch_cache_dir=str(tmp_path / "cache"))
+        make_app(config)
+        requests_made = stats["requests"]
+        make_app(config)
+        assert stats["requests"] == requests_made + 1
+
+
+@pytest.mark.skipif(not artifact_present, reason="Model pickle not found")
+def test_remote_mapped_artifact(tmp_path):
+    artifact_path = str(tmp_path / "artifact.mlpkg")
+    metadata = dict(source=SAMPLE_PICKLE_PATH)
+    mocks.testing_mapped_artifact(SAMPLE_PICKLE_PATH, artifact_path, metadata)
+    with open(artifact_path, "rb") as f:
+        resources = {"/artifact.mlpkg": f.read()}
+
+    with serve_resources(resources) as (base, _):
+        # read into memory without the cache, the header is split off
+        location = f"{base}/artifact.mlpkg"
+        model, header = load_bundle(location, ResourceFetcher())
+    assert validate_artifact(model)
+    assert header == metadata
@@ -0,0 +1,215 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Optional
+
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from app import AppConfig, make_app
+from app.utils import inference
+from app.utils.inference import BatchDispatcher, PredictionCache
+from . import artifact_present
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_prediction_cache_lru():
+    artifact = object()
+    cache = PredictionCache(maxsize=2, ttl=10)
+
+    cache.put("a", 1, artifact)
+    cache.put("b", 2, artifact)
+    # touch "a" so that "b" becomes the least recently used
+    assert cache.get("a", artifact) == 1
+    cache.put("c", 3, artifact)
+
+    assert cache.get("b", artifact) is None
+    assert cache.get("c", artifact) == 3
+    assert cache.get(None, artifact) is None
+    assert cache.stats() == dict(hits=2, misses=2, size=2, maxsize=2)
+
+
+def test_prediction_cache_expiration():
+    artifact, clock = object(), FakeClock()
+    cache = PredictionCache(maxsize=10, ttl=5, clock=clock)
+
+    cache.put("a", 1, artifact)
+    clock.now = 4
+    assert cache.get("a", artifact) == 1
+    clock.now = 6
+    assert cache.get("a", artifact) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_prediction_cache_artifact_change():
+    cache = PredictionCache(maxsize=10, ttl=5)
+    old_artifact, new_artifact = object(), object()
+
+    cache.put("a", 1, old_artifact)
+    assert cache.get("a", old_artifact) == 1
+    # entries computed with another model must not be served
+    assert cache.get("a", new_artifact) is None
+    assert cache.get("a", old_artifact) is None
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_cached_predictions(testing_application_config, testing_payload):
+    app = make_app(AppConfig(**testing_application_config))
+    rows = len(json.loads(testing_payload))
+    query_string = {"payload": testing_payload}
+
+    with app.test_client() as c:
+        first = c.get("/predict", query_string=query_string).get_json()
+        second = c.get("/predict", query_string=query_string).get_json()
+        assert first == second
+        assert first["prediction"] is not None
+
+        stats = c.get("/cache").get_json()["cache"]
+        assert stats["misses"] == rows
+        assert stats["hits"] == rows
+        assert stats["size"] == rows
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_cache_disabled(testing_application_config):
+    settings = AppConfig(**testing_application_config, prediction_cache_size=0)
+    app = make_app(settings)
+
+    with app.test_client() as c:
+        assert c.get("/cache").get_json() == dict(cache=None)
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_body_limit(testing_application_config, testing_payload):
+    settings = AppConfig(
+        **testing_application_config,
+        max_content_length=len(testing_payload),
+    )
+    app = make_app(settings)
+    body = f" {testing_payload}"
+    with app.test_client() as c:
+        response = c.post(
+            "/predict/batch", data=body, content_type="application/json"
+        )
+        assert response.status_code == 413
+
+
+class CountingModel:
+    """
+    Echoes the first column back, fails on negative values.
+    Calls wait for the gate to open, if any
+    """
+
+    def __init__(self, gate: Optional[threading.Event] = None) -> None:
+        self.calls = []
+        self.lock = threading.Lock()
+        self.gate = gate
+
+    def predict(self, features: pd.DataFrame) -> np.ndarray:
+        with self.lock:
+            self.calls.append(len(features))
+        if self.gate is not None:
+            self.gate.wait()
+        if (features["x"] < 0).any():
+            raise ValueError("Negative values")
+        return features["x"].to_numpy()
+
+
+def test_batch_dispatcher():
+    gate = threading.Event()
+    model = CountingModel(gate)
+    dispatcher = BatchDispatcher(max_size=8, max_latency=0.05)
+
+    # the first batch is held by the model until every request is queued
+    futures = [
+        dispatcher.submit(pd.DataFrame({"x": [i, i]}), model)
+        for i in range(16)
+    ]
+    gate.set()
+    results = [future.result(timeout=5) for future in futures]
+
+    # each request gets its own rows back
+    for i, result in enumerate(results):
+        assert result.tolist() == [i, i]
+
+    # queued requests were merged into batches of 8 rows
+    first, *others = model.calls
+    assert first <= 8
+    assert others[:-1] == [8] * (len(others) - 1)
+    assert len(others) == -(-(32 - first) // 8)
+    assert sum(model.calls) == 32
+
+
+def test_batch_dispatcher_errors(monkeypatch):
+    gate = threading.Event()
+    model = CountingModel(gate)
+    dispatcher = BatchDispatcher(
+        max_size=4, max_latency=0.01, predict_timeout=0.05
+    )
+    try:
+        # requests do not wait for a stuck model forever
+        with pytest.raises(TimeoutError):
+            dispatcher.predict(pd.DataFrame({"x": [1]}), model)
+    finally:
+        gate.set()
+
+    class BrokenHistogram:
+        def observe(self, value: float) -> None:
+            raise RuntimeError("broken")
+
+    # failures outside of the predict call are passed to the requests
+    monkeypatch.setattr(inference, "BATCH_ROWS", BrokenHistogram())
+    with pytest.raises(RuntimeError):
+        dispatcher.predict(pd.DataFrame({"x": [1]}), model)
+
+    monkeypatch.undo()
+    result = dispatcher.predict(pd.DataFrame({"x": [2]}), model)
+    assert result.tolist() == [2]
+
+
+def test_batch_dispatcher_failure():
+    model = CountingModel()
+    dispatcher = BatchDispatcher(max_size=4, max_latency=0.05)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        valid = pool.submit(
+            dispatcher.predict, pd.DataFrame({"x": [1]}), model
+        )
+        invalid = pool.submit(
+            dispatcher.predict, pd.DataFrame({"x": [-1]}), model
+        )
+        # a malformed request does not affect the others
+        assert valid.result().tolist() == [1]
+        with pytest.raises(ValueError):
+            invalid.result()
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_batched_predictions(testing_application_config, testing_payload):
+    settings = AppConfig(
+        **testing_application_config,
+        prediction_cache_size=0,
+        batching_max_size=64,
+        batching_max_latency=20,
+    )
+    app = make_app(settings)
+    query_string = {"payload": testing_payload}
+
+    def request(_) -> dict:
+        with app.test_client() as c:
+            return c.get("/predict", query_string=query_string).get_json()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(request, range(8)))
+
+    assert responses[0]["prediction"] is not None
+    assert all(response == responses[0] for response in responses)
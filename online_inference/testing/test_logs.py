@@ -0,0 +1,163 @@
+import contextvars
+import json
+import logging
+import multiprocessing
+import os
+import threading
+
+from app.logs import LazyQueueHandler, LogPipeline, SamplingFilter
+from app.logs import sample_request
+
+
+class ThreadName:
+    # reports the thread which formats the message
+    def __str__(self) -> str:
+        return threading.current_thread().name
+
+
+class Blocking:
+    # stalls the writer thread formatting the message
+    def __init__(self) -> None:
+        self.formatting = threading.Event()
+        self.released = threading.Event()
+
+    def __str__(self) -> str:
+        self.formatting.set()
+        self.released.wait(timeout=5)
+        return "writer"
+
+
+def make_testing_logger(name: str, pipeline: LogPipeline) -> logging.Logger:
+    log = logging.getLogger(name)
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    handler = LazyQueueHandler(pipeline)
+    handler.addFilter(SamplingFilter())
+    log.addHandler(handler)
+    return log
+
+
+def read_records(prefix: str, pid: int) -> list:
+    with open(f"{prefix}-{pid}.log") as f:
+        return f.read().splitlines()
+
+
+def test_log_pipeline(tmp_path):
+    prefix = str(tmp_path / "server")
+    pipeline = LogPipeline(prefix, stream=False)
+    log = make_testing_logger("testing.pipeline", pipeline)
+
+    log.debug("Formatted by %s", ThreadName())
+    log.warning(msg="Plain message")
+    pipeline.stop()
+
+    first, second = read_records(prefix, os.getpid())
+    # messages are formatted by the writer thread
+    writer = first.split("::")[-1].replace("Formatted by ", "")
+    assert writer != threading.current_thread().name
+    assert "[DEBUG]::[testing.pipeline]" in first
+    assert second.endswith("::[WARNING]::[testing.pipeline]::Plain message")
+
+
+def test_log_pipeline_dropped(tmp_path):
+    prefix = str(tmp_path / "server")
+    pipeline = LogPipeline(prefix, stream=False, maxsize=2)
+    log = make_testing_logger("testing.pipeline.dropped", pipeline)
+    (handler,) = log.handlers
+
+    blocking = Blocking()
+    log.warning("Blocked %s", blocking)
+    assert blocking.formatting.wait(timeout=5)
+    for i in range(5):
+        log.warning("Queued %d", i)
+    assert handler.dropped == 3
+
+    blocking.released.set()
+    pipeline.queue().join()
+    log.warning(msg="Written")
+    pipeline.stop()
+
+    records = [r.split("::")[-1] for r in read_records(prefix, os.getpid())]
+    assert records == [
+        "Blocked writer",
+        "Queued 0",
+        "Queued 1",
+        "Dropped 3 log records",
+        "Written",
+    ]
+
+
+def test_log_pipeline_json(tmp_path):
+    prefix = str(tmp_path / "server")
+    pipeline = LogPipeline(prefix, stream=False, json_format=True)
+    log = make_testing_logger("testing.pipeline.json", pipeline)
+
+    try:
+        raise ValueError("invalid")
+    except ValueError:
+        log.exception("Failed with %s", "error")
+    pipeline.stop()
+
+    (line,) = read_records(prefix, os.getpid())
+    record = json.loads(line)
+    assert record["level"] == "ERROR"
+    assert record["logger"] == "testing.pipeline.json"
+    assert record["message"] == "Failed with error"
+    assert record["pid"] == os.getpid()
+    assert "ValueError: invalid" in record["exception"]
+
+
+def test_log_sampling(tmp_path):
+    prefix = str(tmp_path / "server")
+    pipeline = LogPipeline(prefix, stream=False)
+    log = make_testing_logger("testing.pipeline.sampling", pipeline)
+
+    def request(rate: float, message: str) -> None:
+        sample_request(rate)
+        log.debug(msg=message)
+        log.warning(msg=message)
+
+    # every request runs in a separate context (thread or task)
+    contextvars.copy_context().run(request, 0, "dropped")
+    contextvars.copy_context().run(request, 1, "sampled")
+    log.info(msg="outside of requests")
+    pipeline.stop()
+
+    records = read_records(prefix, os.getpid())
+    assert [record.split("::")[1] for record in records] == [
+        "[WARNING]",
+        "[DEBUG]",
+        "[WARNING]",
+        "[INFO]",
+    ]
+
+
+def log_in_child(pipeline: LogPipeline) -> None:
+    log = logging.getLogger("testing.pipeline.fork")
+    log.info(msg="from the child")
+    pipeline.stop()
+
+
+def test_log_pipeline_fork(tmp_path):
+    prefix = str(tmp_path / "server")
+    pipeline = LogPipeline(prefix, stream=False)
+    log = make_testing_logger("testing.pipeline.fork", pipeline)
+    log.info(msg="from the parent")
+
+    # forked process starts its own writer and logfile
+    child = multiprocessing.get_context("fork").Process(
+        target=log_in_child, args=(pipeline,)
+    )
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+    log.info(msg="from the parent again")
+    pipeline.stop()
+
+    (record,) = read_records(prefix, child.pid)
+    assert record.endswith("from the child")
+    records = read_records(prefix, os.getpid())
+    assert [record.split("::")[-1] for record in records] == [
+        "from the parent",
+        "from the parent again",
+    ]
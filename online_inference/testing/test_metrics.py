@@ -0,0 +1,107 @@
+import json
+import os
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+from prometheus_client.parser import text_string_to_metric_families
+
+from app import AppConfig, make_app, make_asgi_app
+from app.utils.metrics import STAGES
+from . import artifact_present
+from .test_asgi import call
+
+
+def samples(text: str) -> Dict:
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+    }
+
+
+def stage_count(metrics: Dict, stage: str) -> float:
+    key = ("inference_stage_seconds_count", (("stage", stage),))
+    return metrics.get(key, 0)
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_metrics_endpoint(testing_application_config, testing_payload):
+    app = make_app(AppConfig(**testing_application_config))
+    with app.test_client() as c:
+        response = c.get("/metrics")
+        assert response.status_code == 200
+        assert response.content_type.startswith("text/plain")
+        before = samples(response.get_data(as_text=True))
+
+        query_string = {"payload": testing_payload}
+        c.get("/predict", query_string=query_string)
+        c.post("/predict/batch", json=[{"invalid_entry": 0}])
+        # answered from the prediction cache
+        c.get("/predict", query_string=query_string)
+        after = samples(c.get("/metrics").get_data(as_text=True))
+
+    # invalid and cached payloads are not sent to the model
+    for stage, count in zip(STAGES, (3, 2, 1, 3)):
+        assert stage_count(after, stage) - stage_count(before, stage) == count
+
+    def delta(name: str, *labels) -> float:
+        key = name, tuple(labels)
+        return after.get(key, 0) - before.get(key, 0)
+
+    assert delta("inference_payloads_total", ("result", "invalid")) == 1
+    assert delta("inference_payloads_total", ("result", "cached")) == 1
+    assert (
+        delta("inference_payloads_total", ("result", "passed"))
+        + delta("inference_payloads_total", ("result", "outliers"))
+        == 1
+    )
+    rows = len(json.loads(testing_payload))
+    assert delta("inference_request_rows_count") == 2
+    assert delta("inference_request_rows_sum") == 2 * rows
+    endpoint = "endpoint", "predict"
+    assert delta("inference_request_seconds_count", endpoint) == 2
+    assert after[("inference_requests_in_flight", (endpoint,))] == 0
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_asgi_metrics(testing_application_config, testing_payload):
+    app = make_asgi_app(AppConfig(**testing_application_config))
+    status, body = call(app, "GET", "/metrics")
+    assert status == 200
+    before = samples(body.decode())
+
+    call(app, "GET", "/predict", {"payload": testing_payload})
+    _, body = call(app, "GET", "/metrics")
+    after = samples(body.decode())
+    for stage in STAGES:
+        assert stage_count(after, stage) - stage_count(before, stage) == 1
+
+
+def test_multiprocess_metrics(tmp_path):
+    # every process writes its own files, any of them reports the total
+    directory = tmp_path / "metrics"
+    directory.mkdir()
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(directory))
+    observe = (
+        "from app.utils.metrics import BATCH_ROWS, PAYLOADS\n"
+        "PAYLOADS.labels(result='outliers').inc()\n"
+        "BATCH_ROWS.observe(8)\n"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", observe], env=env, check=True)
+
+    report = tmp_path / "report.txt"
+    expose = (
+        "import sys\n"
+        "from app.utils.metrics import exposition\n"
+        "open(sys.argv[1], 'wb').write(exposition()[0])\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", expose, str(report)], env=env, check=True
+    )
+    metrics = samples(report.read_text())
+    outliers = "inference_payloads_total", (("result", "outliers"),)
+    assert metrics[outliers] == 2
+    assert metrics[("inference_batch_rows_sum", ())] == 16
@@ -0,0 +1,249 @@
+import json
+import os
+import time
+from dataclasses import replace
+from os import mkdir, remove
+from os.path import isdir
+from shutil import copyfile
+
+import pytest
+
+from app import AppConfig, make_app, make_asgi_app
+from app.utils.resources import current_resources
+from src.models.compiled import CompiledPipeline
+from . import artifact_present, SAMPLE_PICKLE_PATH, TMP_DIR_NAME
+from . import mocks
+from .test_asgi import call
+
+TOKEN = "secret"
+AUTHORIZATION = dict(Authorization=f"Bearer {TOKEN}")
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+
+@pytest.fixture
+def compiled_artifact() -> str:
+    mkdir(TMP_DIR_NAME) if not isdir(TMP_DIR_NAME) else None
+    path = mocks.testing_compiled_artifact(
+        SAMPLE_PICKLE_PATH, "tmp/reloaded.pkl"
+    )
+    yield path
+    remove(path)
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_reload_endpoint(
+    testing_application_config, testing_payload, compiled_artifact
+):
+    app = make_app(AppConfig(**testing_application_config))
+    with app.test_client() as c:
+        # disabled unless the admin token is set
+        assert c.post("/admin/reload").status_code == 404
+
+    config = AppConfig(**testing_application_config, admin_token=TOKEN)
+    app = make_app(config)
+    old = app.config["ARTIFACT"]
+    with app.test_client() as c:
+        expected = c.get("/predict", query_string={"payload": testing_payload})
+
+        assert c.post("/admin/reload").status_code == 401
+        headers = dict(Authorization="Bearer wrong")
+        assert c.post("/admin/reload", headers=headers).status_code == 401
+        response = c.post(
+            "/admin/reload", json=dict(model="x"), headers=AUTHORIZATION
+        )
+        assert response.status_code == 400
+
+        response = c.post(
+            "/admin/reload",
+            json=dict(artifact_path=compiled_artifact),
+            headers=AUTHORIZATION,
+        )
+        assert response.status_code == 200
+        assert response.json["generation"] == 2
+        assert response.json["artifact_path"] == compiled_artifact
+        assert isinstance(app.config["ARTIFACT"], CompiledPipeline)
+        response = c.get("/predict", query_string={"payload": testing_payload})
+        assert response.json == expected.json
+
+        # invalid resources are rejected, the old ones keep serving
+        response = c.post(
+            "/admin/reload",
+            json=dict(table_schema_path="missing.json"),
+            headers=AUTHORIZATION,
+        )
+        assert response.status_code == 409
+        assert response.json["failures"] == 1
+        assert response.json["table_schema_path"] != "missing.json"
+        assert c.get("/health").status_code == 200
+        response = c.get("/predict", query_string={"payload": testing_payload})
+        assert response.json == expected.json
+    assert app.config["ARTIFACT"] is not old
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_reload_snapshot(testing_application_config, compiled_artifact):
+    app = make_app(AppConfig(**testing_application_config))
+    reloader = app.config["MODEL_RELOADER"]
+
+    with app.app_context():
+        # requests in flight finish with the resources they started with
+        resources = current_resources()
+        assert reloader.reload(artifact_path=compiled_artifact)
+        assert current_resources() is resources
+        assert app.config["RESOURCES"] is not resources
+
+    with app.app_context():
+        assert current_resources().artifact is app.config["ARTIFACT"]
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_reload_watcher(testing_application_config, compiled_artifact):
+    artifact_path = "tmp/watched.pkl"
+    copyfile(SAMPLE_PICKLE_PATH, artifact_path)
+    config = dict(testing_application_config, artifact_path=artifact_path)
+    app = make_app(AppConfig(**config, reload_interval=0.02))
+    reloader = app.config["MODEL_RELOADER"]
+
+    with app.test_client() as c:
+        # the watcher is started by the first request
+        assert c.get("/health").status_code == 200
+    try:
+        time.sleep(0.1)
+        assert reloader.generation == 1
+
+        # files are replaced atomically
+        copyfile(compiled_artifact, f"{artifact_path}.part")
+        os.replace(f"{artifact_path}.part", artifact_path)
+        assert wait_for(lambda: reloader.generation == 2)
+        assert isinstance(app.config["ARTIFACT"], CompiledPipeline)
+
+        # broken artifact is loaded only once
+        with open(artifact_path, "wb") as f:
+            f.write(b"garbage")
+        assert wait_for(lambda: reloader.failures == 1)
+        time.sleep(0.1)
+        assert reloader.failures == 1
+        assert isinstance(app.config["ARTIFACT"], CompiledPipeline)
+    finally:
+        reloader.stop()
+        remove(artifact_path)
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_reload_watcher_remote(testing_application_config, compiled_artifact):
+    resources = {}
+    for path, name in (
+        (SAMPLE_PICKLE_PATH, "/artifact.pkl"),
+        (compiled_artifact, "/compiled.pkl"),
+    ):
+        with open(path, "rb") as f:
+            resources[name] = f.read()
+
+    with mocks.serve_resources(resources) as (base, stats):
+        config = dict(
+            testing_application_config, artifact_path=f"{base}/artifact.pkl"
+        )
+        app = make_app(AppConfig(**config, reload_interval=0.02))
+        reloader = app.config["MODEL_RELOADER"]
+        reloader.ensure_watcher()
+        try:
+            assert wait_for(lambda: stats.get("head", 0) > 3)
+            assert reloader.generation == 1
+
+            resources["/artifact.pkl"] = resources["/compiled.pkl"]
+            assert wait_for(lambda: reloader.generation == 2)
+            assert isinstance(app.config["ARTIFACT"], CompiledPipeline)
+        finally:
+            reloader.stop()
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_asgi_reload(testing_application_config, compiled_artifact):
+    config = AppConfig(**testing_application_config, admin_token=TOKEN)
+    app = make_asgi_app(config)
+
+    status, _ = call(app, "POST", "/admin/reload")
+    assert status == 401
+
+    body = json.dumps(dict(artifact_path=compiled_artifact)).encode()
+    status, response = call(
+        app, "POST", "/admin/reload", body=body, headers=AUTHORIZATION
+    )
+    assert status == 200
+    assert json.loads(response)["generation"] == 2
+    assert isinstance(app.flask_app.config["ARTIFACT"], CompiledPipeline)
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_reload_without_watcher(testing_application_config):
+    with open(SAMPLE_PICKLE_PATH, "rb") as f:
+        resources = {"/artifact.pkl": f.read()}
+
+    with mocks.serve_resources(resources) as (base, stats):
+        config = dict(
+            testing_application_config, artifact_path=f"{base}/artifact.pkl"
+        )
+        app = make_app(AppConfig(**config))
+        assert app.config["MODEL_RELOADER"].generation == 1
+        # version tags are only taken for the watcher
+        assert stats.get("head", 0) == 0
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_reload_shared_locations(
+    testing_application_config, compiled_artifact, tmp_path
+):
+    state = str(tmp_path / "locations.json")
+    config = AppConfig(
+        **testing_application_config,
+        admin_token=TOKEN,
+        reload_state_path=state,
+    )
+    # not shared with the other workers, rejected
+    app = make_app(config)
+    with app.test_client() as c:
+        response = c.post(
+            "/admin/reload",
+            json=dict(artifact_path=compiled_artifact),
+            headers=AUTHORIZATION,
+        )
+        assert response.status_code == 409
+        response = c.post("/admin/reload", headers=AUTHORIZATION)
+        assert response.status_code == 200
+
+    # applications stand for the workers of the same service
+    config = replace(config, reload_interval=0.02)
+    first, second = make_app(config), make_app(config)
+    reloaders = [app.config["MODEL_RELOADER"] for app in (first, second)]
+    for reloader in reloaders:
+        reloader.ensure_watcher()
+    try:
+        with first.test_client() as c:
+            response = c.post(
+                "/admin/reload",
+                json=dict(artifact_path=compiled_artifact),
+                headers=AUTHORIZATION,
+            )
+            assert response.status_code == 200
+
+        assert wait_for(lambda: reloaders[1].generation == 2)
+        assert isinstance(second.config["ARTIFACT"], CompiledPipeline)
+        assert reloaders[1].settings.artifact_path == compiled_artifact
+        time.sleep(0.1)
+        # the worker which handled the request does not reload twice
+        assert reloaders[0].generation == 2
+
+        # workers started later begin with the shared locations
+        third = make_app(replace(config, reload_interval=0))
+        assert isinstance(third.config["ARTIFACT"], CompiledPipeline)
+    finally:
+        for reloader in reloaders:
+            reloader.stop()
@@ -1,9 +1,13 @@
+from os import mkdir, remove
+from os.path import isdir
 from typing import Tuple
 
 import pytest
 
 from app import make_app, AppConfig
-from . import artifact_present
+from app.utils.memory import memory_usage
+from . import artifact_present, SAMPLE_PICKLE_PATH, TMP_DIR_NAME
+from . import mocks
 
 
 def test_app_config(testing_application_config):
@@ -73,3 +77,39 @@ def test_with_tmp_config(config, config_keys):
         response = c.get("/health")
         assert response.status_code == 200
         assert b"Healthy" in response.data
+
+
+def test_memory_usage():
+    usage = memory_usage()
+    assert usage["rss"] > 0
+    for value in usage.values():
+        assert value >= 0
+
+
+@pytest.mark.skipif(not artifact_present, reason="Model pickle not found")
+def test_bundled_startup(testing_application_config, testing_payload):
+    mkdir(TMP_DIR_NAME) if not isdir(TMP_DIR_NAME) else None
+    bundle = mocks.testing_bundle(
+        testing_application_config["table_schema_path"],
+        testing_application_config["feature_stats_path"],
+    )
+    artifact_path = mocks.testing_mapped_artifact(
+        SAMPLE_PICKLE_PATH, "tmp/bundle.mlpkg", bundle
+    )
+
+    # schema and stats come from the artifact, no other resources needed
+    app = make_app(AppConfig(artifact_path=artifact_path))
+    with app.test_client() as c:
+        assert c.get("/health").status_code == 200
+        response = c.get("/predict", query_string={"payload": testing_payload})
+        assert b'{"prediction":[' in response.data
+    assert app.config["TABLE_SCHEMA"].columns == bundle["schema"]["columns"]
+
+    # bundle of unknown version aborts the startup
+    mocks.testing_mapped_artifact(
+        SAMPLE_PICKLE_PATH, artifact_path, dict(bundle, bundle=99)
+    )
+    config = dict(testing_application_config, artifact_path=artifact_path)
+    app = make_app(AppConfig(**config))
+    assert "ARTIFACT" not in app.config
+    remove(artifact_path)
@@ -0,0 +1,148 @@
+import io
+import json
+import time
+
+import pytest
+
+from app import AppConfig, make_app, make_asgi_app
+from app.utils.tracing import (
+    InMemoryExporter,
+    Span,
+    SpanExporter,
+    StdoutExporter,
+    make_exporter,
+    span,
+    start_trace,
+)
+from . import artifact_present
+from .test_asgi import call
+
+# spans are exported in the order they are closed
+STAGES = (
+    "parse",
+    "table_structure_validation",
+    "outlier_validation",
+    "validate",
+    "predict",
+    "serialize",
+)
+
+
+def test_spans():
+    exporter = InMemoryExporter()
+    with span("ignored"):
+        # outside of traced requests
+        pass
+
+    with pytest.raises(ValueError):
+        with start_trace("root", "request", exporter):
+            with span("outer"):
+                with span("inner"):
+                    pass
+            with span("failed"):
+                raise ValueError("invalid")
+
+    inner, outer, failed, root = exporter.find("request")
+    assert (root.name, root.span_id, root.parent_id) == ("root", 0, None)
+    assert outer.parent_id == failed.parent_id == 0
+    assert inner.parent_id == outer.span_id
+    assert failed.error == root.error == "ValueError: invalid"
+    assert inner.duration <= outer.duration <= root.duration
+    assert exporter.find("missing") is None
+
+
+def test_stdout_exporter():
+    stream = io.StringIO()
+    exporter = StdoutExporter(stream, maxsize=1)
+    spans = [Span("root", "request", 0, None)]
+
+    with pytest.raises(TypeError):
+        SpanExporter()
+
+    exporter.export(spans)
+    exporter.stop()
+    (line,) = stream.getvalue().splitlines()
+    assert json.loads(line)["request_id"] == "request"
+
+    # requests do not wait for the writer, spans are dropped instead
+    stream.write = lambda _: time.sleep(0.1)
+    for _ in range(3):
+        exporter.export(spans)
+    exporter.stop()
+    assert exporter.dropped >= 1
+
+
+def test_make_exporter():
+    assert make_exporter(None) is None
+    assert isinstance(make_exporter("memory"), InMemoryExporter)
+    path = "app.utils.tracing:InMemoryExporter"
+    assert isinstance(make_exporter(path), InMemoryExporter)
+    with pytest.raises(ValueError):
+        make_exporter("unknown")
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_traced_requests(testing_application_config, testing_payload):
+    config = AppConfig(**testing_application_config, trace_exporter="memory")
+    app = make_app(config)
+    exporter = app.config["TRACE_EXPORTER"]
+
+    with app.test_client() as c:
+        response = c.get(
+            "/predict",
+            query_string={"payload": testing_payload},
+            headers={"X-Request-ID": "request-1"},
+        )
+        assert response.headers["X-Request-ID"] == "request-1"
+
+        # the id is generated unless set by the client
+        response = c.post("/predict/batch", json=json.loads(testing_payload))
+        generated = response.headers["X-Request-ID"]
+        assert len(generated) == 32
+
+    spans = exporter.find("request-1")
+    root = spans[-1]
+    assert root.name == "predict_handler"
+    assert [s.name for s in spans[:-1]] == list(STAGES)
+    by_name = {s.name: s for s in spans}
+    validate = by_name["validate"].span_id
+    assert by_name["table_structure_validation"].parent_id == validate
+    assert by_name["outlier_validation"].parent_id == validate
+    assert by_name["predict"].parent_id == root.span_id
+    assert sum(s.duration for s in spans if s.parent_id == 0) <= root.duration
+
+    assert exporter.find(generated)[-1].name == "batch_predict_handler"
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_untraced_requests(testing_application_config, testing_payload):
+    app = make_app(AppConfig(**testing_application_config))
+    assert app.config["TRACE_EXPORTER"] is None
+    with app.test_client() as c:
+        response = c.get("/predict", query_string={"payload": testing_payload})
+        assert len(response.headers["X-Request-ID"]) == 32
+
+
+@pytest.mark.skipif(not artifact_present, reason="Requires model artifact")
+def test_asgi_traced_requests(
+    testing_application_config, testing_payload, capsys
+):
+    config = AppConfig(**testing_application_config, trace_exporter="stdout")
+    app = make_asgi_app(config)
+    capsys.readouterr()
+
+    status, _ = call(
+        app,
+        "GET",
+        "/predict",
+        {"payload": testing_payload},
+        headers={"X-Request-ID": "request-2"},
+    )
+    assert status == 200
+    # spans are written by the background thread
+    app.flask_app.config["TRACE_EXPORTER"].stop()
+
+    # spans of the request are written as JSON lines
+    spans = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert {s["request_id"] for s in spans} == {"request-2"}
+    assert [s["name"] for s in spans] == [*STAGES, "predict_handler"]
@@ -6,6 +6,7 @@ import numpy as np
 import pandas as pd
 
 from app.utils.validate import (
+    PayloadValidator,
     TabularDataSchema,
     table_structure_validation,
     outlier_validation,
@@ -68,3 +69,50 @@ def test_outlier_validation(some_stats):
 
     exception_raised = exc_info.value
     assert isinstance(exception_raised, ValueError)
+
+
+def test_payload_validator(table_format):
+    validator = PayloadValidator(TabularDataSchema(**table_format))
+    records = [
+        {"numeric": 1, "categorical": "a"},
+        {"numeric": 2.5, "categorical": "b"},
+        {"numeric": None, "categorical": "c"},
+    ]
+    columns = {
+        "numeric": [1, 2.5, None],
+        "categorical": ["a", "b", "c"],
+    }
+
+    # both layouts produce the same table in the schema order
+    for payload in (records, columns):
+        features, numeric = validator(payload)
+        assert features.columns.tolist() == table_format["columns"]
+        assert features.dtypes["numeric"] == np.float64
+        assert features.dtypes["categorical"] == object
+        assert numeric.shape == (3, 1)
+        assert np.isnan(numeric[2, 0])
+        assert features["categorical"].tolist() == ["a", "b", "c"]
+
+    invalid_payloads = (
+        "not a table",
+        [],
+        [{"numeric": 1}],
+        [{"numeric": 1, "categorical": "a", "extra": 0}],
+        [{"numeric": "1", "categorical": "a"}],
+        [{"numeric": True, "categorical": "a"}],
+        [{"numeric": 1, "categorical": 1}],
+        {"numeric": [1, 2], "categorical": ["a"]},
+        {"numeric": 1, "categorical": "a"},
+        # integers out of the float64 range
+        [{"numeric": 10**400, "categorical": "a"}],
+        {"numeric": [1, -(10**400)], "categorical": ["a", "b"]},
+    )
+    for payload in invalid_payloads:
+        with pytest.raises(ValueError):
+            validator(payload)
+
+
+def test_payload_validator_schema_consistency(table_format):
+    table_format["numeric_columns"] = ["numeric", "categorical"]
+    with pytest.raises(ValueError):
+        PayloadValidator(TabularDataSchema(**table_format))